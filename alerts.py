@@ -0,0 +1,248 @@
+# Regras de alerta avaliadas na ingestão, por padrão de tópico.
+# Regras em JSON (todas as que casarem com o tópico valem):
+#   [
+#     {"name": "Temperatura fora da faixa", "pattern": "casa/+/temp", "type": "threshold", "above": 30, "below": 5},
+#     {"pattern": "casa/+/temp", "type": "rate", "max_rate": 0.5},
+#     {"pattern": "energia/#", "type": "anomaly", "window": 100, "stddevs": 3, "min_samples": 20,
+#      "severity": "critical"}
+#   ]
+# "threshold" dispara acima de "above" e/ou abaixo de "below"; "rate" quando a
+# variação passa de "max_rate" unidades por segundo; "anomaly" quando o valor
+# se afasta mais de "stddevs" desvios padrão da média das últimas "window"
+# amostras. Cada regra gera um alerta ao disparar e outro ao normalizar.
+from collections import deque
+import json
+import math
+import os
+import threading
+import time
+
+from topics import TopicTrie
+
+
+def load_rules(path):
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Erro ao carregar regras de alerta ({path}): {e}")
+        return []
+
+
+class ThresholdCheck:
+    __slots__ = ('above', 'below')
+
+    def __init__(self, rule):
+        self.above = rule.get('above')
+        self.below = rule.get('below')
+
+    def check(self, value, timestamp):
+        if self.above is not None and value > self.above:
+            return f"{value:g} acima de {self.above:g}"
+        if self.below is not None and value < self.below:
+            return f"{value:g} abaixo de {self.below:g}"
+        return None
+
+
+class RateCheck:
+    __slots__ = ('max_rate', 'last')
+
+    def __init__(self, rule):
+        self.max_rate = rule['max_rate']
+        self.last = None
+
+    def check(self, value, timestamp):
+        last, self.last = self.last, (timestamp, value)
+        if last is None or timestamp <= last[0]:
+            return None
+        rate = (value - last[1]) / (timestamp - last[0])
+        if abs(rate) > self.max_rate:
+            return f"variação de {rate:+.3g}/s (máximo {self.max_rate:g}/s)"
+        return None
+
+
+class AnomalyCheck:
+    # Média e desvio padrão da janela por somas acumuladas: O(1) por amostra.
+    # As somas são recalculadas a cada volta completa da janela para não
+    # acumular erro de ponto flutuante.
+    __slots__ = ('stddevs', 'min_samples', 'values', 'total', 'squares', 'removed')
+
+    def __init__(self, rule):
+        self.stddevs = rule.get('stddevs', 3)
+        self.min_samples = rule.get('min_samples', 10)
+        self.values = deque(maxlen=rule.get('window', 100))
+        self.total = 0.0
+        self.squares = 0.0
+        self.removed = 0
+
+    def check(self, value, timestamp):
+        values = self.values
+        count = len(values)
+        message = None
+        if count >= self.min_samples:
+            mean = self.total / count
+            stddev = math.sqrt(max(self.squares / count - mean * mean, 0.0))
+            if stddev > 0 and abs(value - mean) > self.stddevs * stddev:
+                message = f"{value:g} a {(value - mean) / stddev:+.1f}σ da média {mean:g}"
+
+        if count == values.maxlen:
+            oldest = values[0]
+            self.total -= oldest
+            self.squares -= oldest * oldest
+            self.removed += 1
+        values.append(value)
+        self.total += value
+        self.squares += value * value
+        if self.removed >= values.maxlen:
+            self.removed = 0
+            self.total = sum(values)
+            self.squares = sum(v * v for v in values)
+        return message
+
+
+CHECKS = {
+    'threshold': ThresholdCheck,
+    'rate': RateCheck,
+    'anomaly': AnomalyCheck,
+}
+
+
+class AlertRules:
+    # Regras indexadas pela trie de padrões; as verificações de cada tópico
+    # (com o estado das janelas) ficam em cache, criadas na primeira mensagem
+    def __init__(self, rules=()):
+        self.rules = [rule for rule in rules if rule.get('type') in CHECKS]
+        for rule in rules:
+            if rule.get('type') not in CHECKS:
+                print(f"Regra de alerta ignorada (tipo desconhecido): {rule}")
+        self.trie = TopicTrie()
+        for index, rule in enumerate(self.rules):
+            self.trie.add(rule['pattern'], index)
+        self.checks = {}
+
+    def for_topic(self, topic):
+        checks = self.checks.get(topic)
+        if checks is None:
+            # [índice da regra, verificação, disparada?]
+            checks = [[index, CHECKS[self.rules[index]['type']](self.rules[index]), False]
+                      for index in sorted(self.trie.match(topic))]
+            self.checks[topic] = checks
+        return checks
+
+    def evaluate(self, topic, value, timestamp):
+        # Alertas das regras que mudaram de estado com este valor
+        if not self.rules or isinstance(value, str):
+            return []
+        alerts = []
+        for entry in self.for_topic(topic):
+            index, check, firing = entry
+            message = check.check(value, timestamp)
+            if (message is not None) == firing:
+                continue
+            entry[2] = not firing
+            rule = self.rules[index]
+            alerts.append({
+                'rule': rule.get('name') or f"{rule['type']} {rule['pattern']}",
+                'type': rule['type'],
+                'severity': rule.get('severity', 'warning'),
+                'state': 'firing' if message is not None else 'resolved',
+                'topic': topic,
+                'value': value,
+                'timestamp': timestamp,
+                'message': message or 'normalizado',
+            })
+        return alerts
+
+
+class AlertHistory:
+    # Últimos alertas em memória (também guarda as transições online/offline
+    # de liveness.py); com path, também num arquivo JSON lines (recarregado
+    # ao iniciar e reescrito quando passa do dobro do limite). extend() só
+    # guarda em memória: a gravação é da thread de start() (write-behind).
+    def __init__(self, limit=1000, path=None, delay=0.5):
+        self.limit = limit
+        self.alerts = deque(maxlen=limit)
+        self.path = path
+        self.delay = delay
+        self.file_lines = 0
+        self.unsaved = []
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.dirty = threading.Event()
+        self.closed = False
+        self.thread = None
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    lines = [line for line in f if line.strip()]
+                self.file_lines = len(lines)
+                self.alerts.extend(json.loads(line) for line in lines[-limit:])
+            except Exception as e:
+                print(f"Erro ao carregar histórico de alertas ({path}): {e}")
+
+    def start(self):
+        if self.path and self.thread is None:
+            self.thread = threading.Thread(target=self._write_loop, daemon=True)
+            self.thread.start()
+
+    def extend(self, alerts):
+        with self.lock:
+            self.alerts.extend(alerts)
+            if self.path:
+                self.unsaved.extend(alerts)
+        if self.path:
+            self.dirty.set()
+
+    def _write_loop(self):
+        while not self.closed:
+            self.dirty.wait()
+            if self.closed:
+                break
+            # Agrupar alertas em sequência numa única gravação
+            self.dirty.clear()
+            time.sleep(self.delay)
+            self.flush()
+
+    def flush(self):
+        with self.write_lock:
+            with self.lock:
+                alerts, self.unsaved = self.unsaved, []
+                rewrite = alerts and self.file_lines + len(alerts) > 2 * self.limit
+                if rewrite:
+                    alerts = list(self.alerts)
+            if not alerts:
+                return
+            try:
+                if rewrite:
+                    tmp_path = self.path + '.tmp'
+                    with open(tmp_path, 'w') as f:
+                        f.writelines(json.dumps(alert, ensure_ascii=False) + '\n' for alert in alerts)
+                    os.replace(tmp_path, self.path)
+                    self.file_lines = len(alerts)
+                else:
+                    with open(self.path, 'a') as f:
+                        f.writelines(json.dumps(alert, ensure_ascii=False) + '\n' for alert in alerts)
+                    self.file_lines += len(alerts)
+            except OSError as e:
+                print(f"Erro ao salvar histórico de alertas: {e}")
+                if not rewrite:
+                    # Tentar de novo na próxima gravação
+                    with self.lock:
+                        self.unsaved = alerts + self.unsaved
+
+    def close(self):
+        self.closed = True
+        self.dirty.set()
+        if self.path:
+            self.flush()
+
+    def latest(self, limit=100, matches=None):
+        # Mais recentes primeiro; matches filtra por tópico
+        with self.lock:
+            alerts = list(self.alerts)
+        alerts.reverse()
+        if matches is not None:
+            alerts = [alert for alert in alerts if matches(alert['topic'])]
+        return alerts[:limit]
@@ -1,105 +1,923 @@
-from flask import Flask, request, jsonify
-from flask_socketio import SocketIO
+from flask import Flask, Response, request, jsonify
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import paho.mqtt.client as mqtt
-from collections import defaultdict, deque
+from collections import Counter, defaultdict
 import time
 import json
+import hashlib
 import os
+import random
+import subprocess
+import sys
 import threading
-from queue import Queue
-import asyncio
+import atexit
+from itertools import chain, islice
+from ingest import IngestBuffer
+from storage import HistoryStore
+from history import LatestValues, TopicHistory, memory_usage
+from rollups import TIER_WIDTHS, choose_tier, downsample
+from wire import TopicDictionary, encode_frame
+from cluster import BusManager, Cluster, make_bus
+from topics import BrokerSubscriptions, TopicFilter, TopicIndex, TopicTrie, parse_patterns
+from parsers import ParserPool, Parsers, load_rules
+from config_store import ConfigStore
+from assets import AssetStore
+from metrics import DURATION_BUCKETS, LATENCY_BUCKETS, SIZE_BUCKETS, RateMeter, Registry
+from recorder import Recorder, read_records, replay
+from alerts import AlertHistory, AlertRules, load_rules as load_alert_rules
+from export import FORMATS as EXPORT_FORMATS, available as export_available, export_chunks
+from liveness import Liveness, load_rules as load_liveness_rules
+from clients import ClientQueues
+from warm_state import dump as dump_warm_state, load as load_warm_state, snapshot as warm_state_snapshot
 
-app = Flask(__name__)
-socketio = SocketIO(app, async_mode='threading', engineio_logger=False)
+app = Flask(__name__, static_folder=None)
+
+# Modo do servidor: 'threading' (Flask-SocketIO) ou 'asyncio' (ASGI, ver asgi.py)
+SERVER_MODE = os.environ.get('BIFROST_SERVER_MODE', 'threading')
+HTTP_PORT = int(os.environ.get('BIFROST_PORT', 5000))
+
+# Modo cluster: com BIFROST_WORKERS > 1, cada worker recebe parte das mensagens
+# (assinatura compartilhada do MQTT), é dono de uma partição dos tópicos e
+# faz o fan-out do Socket.IO pelo barramento (ver cluster.py)
+WORKER_COUNT = int(os.environ.get('BIFROST_WORKERS', 1))
+WORKER_ID = int(os.environ.get('BIFROST_WORKER_ID', 0))
+CLUSTER_BUS = os.environ.get('BIFROST_CLUSTER_BUS', 'tcp://127.0.0.1:7010')
+MQTT_SHARE_GROUP = os.environ.get('BIFROST_MQTT_SHARE_GROUP', 'bifrost')
+# Processo que só dispara os workers (python app.py com BIFROST_WORKERS > 1)
+IS_LAUNCHER = __name__ == '__main__' and WORKER_COUNT > 1 and 'BIFROST_WORKER_ID' not in os.environ
+cluster = None
+if WORKER_COUNT > 1 and not IS_LAUNCHER:
+    cluster = Cluster(WORKER_ID, WORKER_COUNT, make_bus(CLUSTER_BUS, start_hub=WORKER_ID == 0))
+
+socketio = SocketIO(app, async_mode='threading', engineio_logger=False,
+                    client_manager=BusManager(cluster.bus) if cluster and SERVER_MODE == 'threading' else None)
 
 # Configurações do MQTT
 MQTT_BROKER = "localhost"
 MQTT_PORT = 1883
-MQTT_TOPICS = ["#"]
+# Espera entre tentativas de conexão ao broker: exponencial entre o mínimo e
+# o máximo (s), com jitter
+MQTT_BACKOFF_MIN = float(os.environ.get('BIFROST_MQTT_BACKOFF_MIN', 1))
+MQTT_BACKOFF_MAX = float(os.environ.get('BIFROST_MQTT_BACKOFF_MAX', 60))
+# Filtro de tópicos: aceitos se casarem com algum include e nenhum exclude
+MQTT_INCLUDE = parse_patterns(os.environ.get('BIFROST_MQTT_INCLUDE', '#'))
+MQTT_EXCLUDE = parse_patterns(os.environ.get('BIFROST_MQTT_EXCLUDE', ''))
+# Assinaturas no broker: 'static' (os includes), 'dynamic' (só os padrões
+# que os dashboards assistem) ou 'discovery' (dynamic + janelas periódicas
+# nos includes, admitindo uma amostra por tópico não assistido)
+MQTT_SUBSCRIBE_MODE = os.environ.get('BIFROST_MQTT_SUBSCRIBE_MODE', 'static')
+DISCOVERY_INTERVAL = float(os.environ.get('BIFROST_DISCOVERY_INTERVAL', 300))
+DISCOVERY_WINDOW = float(os.environ.get('BIFROST_DISCOVERY_WINDOW', 5))
 
-# Armazenamento de histórico (tópico: deque de valores)
+# Armazenamento de histórico (tópico: anel compacto de valores)
 HISTORY_LENGTH = 50
-sensor_history = defaultdict(lambda: deque(maxlen=HISTORY_LENGTH))
+sensor_history = defaultdict(lambda: TopicHistory(HISTORY_LENGTH))
+# Segurado pelo dispatcher ao gravar em sensor_history; quem precisa de uma
+# cópia consistente de todos os anéis (estado quente) segura o mesmo lock
+history_lock = threading.Lock()
+# Último valor por tópico (snapshot para clientes que conectam ou reconectam)
+latest_values = LatestValues()
+# Índice hierárquico dos tópicos (busca e navegação: /topics, /topics/children).
+# No cluster, cada worker indexa os tópicos que possui.
+topic_index = TopicIndex(rate_window=float(os.environ.get('BIFROST_TOPIC_RATE_WINDOW', 60)))
+TOPIC_PAGE_LIMIT = int(os.environ.get('BIFROST_TOPIC_PAGE_LIMIT', 1000))
 
-# Buffer para mensagens MQTT
-message_queue = Queue(maxsize=1000)
+# Histórico persistente em disco (segmentos por tópico, retenção por tempo)
+HISTORY_DIR = os.environ.get('BIFROST_HISTORY_DIR', 'history_data')
+HISTORY_RETENTION_DAYS = float(os.environ.get('BIFROST_HISTORY_RETENTION_DAYS', 90))
+HISTORY_QUERY_LIMIT = int(os.environ.get('BIFROST_HISTORY_QUERY_LIMIT', 10000))
+HISTORY_MAX_POINTS = int(os.environ.get('BIFROST_HISTORY_MAX_POINTS', 500))
+HISTORY_BATCH_LIMIT = int(os.environ.get('BIFROST_HISTORY_BATCH_LIMIT', 500))
+# Exportação (/export): registros por página pedida ao worker dono no cluster
+EXPORT_PAGE_SIZE = int(os.environ.get('BIFROST_EXPORT_PAGE_SIZE', 5000))
+history_store = HistoryStore(HISTORY_DIR, retention=HISTORY_RETENTION_DAYS * 86400,
+                             owns=cluster.owns if cluster else None)
+atexit.register(history_store.close)
 
-# Armazenamento de nomes personalizados
-CUSTOM_NAMES_FILE = 'custom_names.json'
-custom_names = {}
+# Estado quente (ver warm_state.py): histórico recente e últimos valores
+# gravados a cada BIFROST_WARM_STATE_INTERVAL s (0 = só ao encerrar) e
+# recarregados ao iniciar; arquivo vazio desativa. No cluster, um arquivo por
+# worker (<arquivo>.w<id>), todos lidos ao iniciar.
+WARM_STATE_FILE = os.environ.get('BIFROST_WARM_STATE_FILE', 'warm_state.bin')
+WARM_STATE_INTERVAL = float(os.environ.get('BIFROST_WARM_STATE_INTERVAL', 60))
 
-# Carregar nomes personalizados se existirem
-if os.path.exists(CUSTOM_NAMES_FILE):
-    try:
-        with open(CUSTOM_NAMES_FILE, 'r') as f:
-            custom_names = json.load(f)
-    except:
-        pass
+# Buffer para mensagens MQTT (não bloqueia a thread de rede do paho)
+# Políticas de estouro: drop-oldest, coalesce ou sample
+message_queue = IngestBuffer(
+    capacity=int(os.environ.get('BIFROST_INGEST_CAPACITY', 10000)),
+    topic_capacity=int(os.environ.get('BIFROST_INGEST_TOPIC_CAPACITY', 100)),
+    policy=os.environ.get('BIFROST_INGEST_POLICY', 'drop-oldest'),
+    sample_every=int(os.environ.get('BIFROST_INGEST_SAMPLE_EVERY', 10)),
+)
+
+# Parsing dos payloads por padrão de tópico (ver parsers.py); lotes grandes
+# podem ser divididos entre processos
+PARSERS_FILE = os.environ.get('BIFROST_PARSERS_FILE', 'parsers.json')
+parser_pool = ParserPool(
+    Parsers(load_rules(PARSERS_FILE)),
+    workers=int(os.environ.get('BIFROST_PARSER_WORKERS', 0)),
+    min_batch=int(os.environ.get('BIFROST_PARSER_POOL_MIN_BATCH', 2000)),
+)
+atexit.register(parser_pool.close)
+
+# Regras de alerta avaliadas na ingestão (ver alerts.py). No cluster, cada
+# worker avalia os tópicos que possui e todos guardam o histórico completo.
+ALERTS_FILE = os.environ.get('BIFROST_ALERTS_FILE', 'alerts.json')
+ALERT_HISTORY_FILE = os.environ.get('BIFROST_ALERT_HISTORY_FILE', 'alerts_history.jsonl')
+alert_rules = AlertRules(load_alert_rules(ALERTS_FILE))
+alert_history = AlertHistory(int(os.environ.get('BIFROST_ALERT_HISTORY', 1000)),
+                             ALERT_HISTORY_FILE if WORKER_ID == 0 else None)
+atexit.register(alert_history.close)
+
+# Tópicos parados: online/offline pelo intervalo esperado de cada tópico,
+# configurado por padrão ou aprendido da cadência (ver liveness.py). No
+# cluster, cada worker acompanha os tópicos que possui.
+LIVENESS_FILE = os.environ.get('BIFROST_LIVENESS_FILE', 'liveness.json')
+LIVENESS_HISTORY_FILE = os.environ.get('BIFROST_LIVENESS_HISTORY_FILE', 'liveness_history.jsonl')
+liveness = Liveness(
+    load_liveness_rules(LIVENESS_FILE),
+    tick=float(os.environ.get('BIFROST_LIVENESS_TICK', 1)),
+    factor=float(os.environ.get('BIFROST_LIVENESS_FACTOR', 3)),
+    min_samples=int(os.environ.get('BIFROST_LIVENESS_MIN_SAMPLES', 5)),
+    min_timeout=float(os.environ.get('BIFROST_LIVENESS_MIN_TIMEOUT', 10)),
+)
+liveness_history = AlertHistory(int(os.environ.get('BIFROST_LIVENESS_HISTORY', 1000)),
+                                LIVENESS_HISTORY_FILE if WORKER_ID == 0 else None)
+atexit.register(liveness_history.close)
+
+# Gravação do fluxo MQTT bruto (ver recorder.py), desativada sem BIFROST_RECORD_DIR
+RECORD_DIR = os.environ.get('BIFROST_RECORD_DIR', '')
+# Modo replay: em vez de conectar ao MQTT, reproduz as gravações de BIFROST_REPLAY_DIR.
+# Velocidade 1 = tempo real, N = N vezes mais rápido, 0 = o mais rápido possível.
+# Timestamps 'now' (teste de carga) ou 'original' (backfill do histórico; rodar
+# antes de voltar a receber mensagens ao vivo, já que o histórico é só append).
+REPLAY_DIR = os.environ.get('BIFROST_REPLAY_DIR', '')
+REPLAY_SPEED = float(os.environ.get('BIFROST_REPLAY_SPEED', 1))
+REPLAY_TIMESTAMPS = os.environ.get('BIFROST_REPLAY_TIMESTAMPS', 'now')
+REPLAY_START = float(os.environ['BIFROST_REPLAY_START']) if os.environ.get('BIFROST_REPLAY_START') else None
+REPLAY_END = float(os.environ['BIFROST_REPLAY_END']) if os.environ.get('BIFROST_REPLAY_END') else None
+REPLAY_LOOP = os.environ.get('BIFROST_REPLAY_LOOP', '') == '1'
+recorder = None
+if RECORD_DIR and not REPLAY_DIR:
+    recorder = Recorder(
+        RECORD_DIR, worker_id=WORKER_ID,
+        segment_bytes=int(float(os.environ.get('BIFROST_RECORD_SEGMENT_MB', 64)) * 1024 * 1024),
+        segment_seconds=float(os.environ.get('BIFROST_RECORD_SEGMENT_SECONDS', 3600)),
+        keep_segments=int(os.environ.get('BIFROST_RECORD_KEEP_SEGMENTS', 168)),
+    )
+    atexit.register(recorder.close)
+
+# Envio em batch: intervalo mínimo entre envios (s) e máximo de tópicos por batch
+BATCH_INTERVAL = float(os.environ.get('BIFROST_BATCH_INTERVAL', 0.05))
+MAX_BATCH_SIZE = int(os.environ.get('BIFROST_MAX_BATCH_SIZE', 500))
+
+# Ritmo por conexão (ver clients.py): clientes lentos saem dos envios por sala
+# e recebem só os últimos valores, num intervalo que acompanha o tempo de ack
+client_queues = ClientQueues(
+    min_interval=BATCH_INTERVAL,
+    max_interval=float(os.environ.get('BIFROST_CLIENT_MAX_INTERVAL', 5)),
+    slow_latency=float(os.environ.get('BIFROST_CLIENT_SLOW_LATENCY', 0.5)),
+    probe_interval=float(os.environ.get('BIFROST_CLIENT_PROBE_INTERVAL', 1)),
+)
+# Clientes lentos de todo o cluster (excluídos dos envios por sala) e o
+# cursor de cada um no latest_values deste worker
+slow_clients = set()
+slow_cursors = {}
+
+# Métricas do caminho quente (GET /metrics, formato Prometheus)
+metrics = Registry()
+ingest_rate = RateMeter(lambda: message_queue.received)
+metrics.counter_callback('bifrost_messages_received_total', 'Mensagens MQTT aceitas na fila de ingestão',
+                         lambda: message_queue.received)
+metrics.gauge_callback('bifrost_messages_per_second', 'Mensagens aceitas por segundo (últimos 10 s)',
+                       ingest_rate.rate)
+metrics.counter_callback('bifrost_messages_dropped_total', 'Mensagens descartadas por estouro da fila',
+                         lambda: message_queue.dropped)
+metrics.counter_callback('bifrost_messages_coalesced_total', 'Mensagens substituídas por uma mais nova do tópico',
+                         lambda: message_queue.coalesced)
+metrics.counter_callback('bifrost_messages_sampled_total', 'Mensagens descartadas pela amostragem sob pressão',
+                         lambda: message_queue.sampled)
+metrics.counter_callback('bifrost_messages_filtered_total', 'Mensagens recusadas pelo filtro de tópicos',
+                         lambda: topic_filter.rejected)
+messages_forwarded = metrics.counter('bifrost_messages_forwarded_total',
+                                     'Mensagens repassadas ao worker dono do tópico')
+forwards_dropped = metrics.counter('bifrost_forwards_dropped_total',
+                                   'Repasses descartados com a fila do barramento cheia')
+metrics.counter_callback('bifrost_history_rejected_total', 'Mensagens anteriores ao último registro do tópico',
+                         lambda: history_store.rejected)
+metrics.gauge_callback('bifrost_queue_depth', 'Mensagens pendentes na fila de ingestão', lambda: message_queue.qsize())
+metrics.gauge_callback('bifrost_queue_capacity', 'Capacidade da fila de ingestão', lambda: message_queue.capacity)
+topic_messages = metrics.labeled_counter(
+    'bifrost_topic_messages_total', 'Mensagens processadas por tópico', 'topic',
+    max_series=int(os.environ.get('BIFROST_METRICS_MAX_TOPICS', 1000)))
+batch_entries = metrics.histogram('bifrost_batch_entries', 'Tópicos por batch enviado', SIZE_BUCKETS)
+emit_seconds = metrics.histogram('bifrost_emit_seconds', 'Duração do envio de um batch ao Socket.IO',
+                                 DURATION_BUCKETS)
+latency_seconds = metrics.histogram('bifrost_ingest_to_emit_seconds',
+                                    'Latência do recebimento MQTT até o envio ao Socket.IO', LATENCY_BUCKETS)
+metrics.gauge_callback('bifrost_topics', 'Tópicos com histórico em memória', lambda: len(sensor_history))
+alerts_raised = metrics.labeled_counter('bifrost_alerts_total', 'Alertas disparados ou normalizados por estado',
+                                        'state')
+metrics.gauge_callback('bifrost_topics_offline', 'Tópicos sem mensagens além do intervalo esperado',
+                       lambda: liveness.offline)
+liveness_transitions = metrics.labeled_counter('bifrost_liveness_transitions_total',
+                                               'Tópicos que ficaram online ou offline', 'state')
+metrics.gauge_callback('bifrost_clients', 'Clientes WebSocket conectados', lambda: len(client_encoding))
+metrics.gauge_callback('bifrost_clients_slow', 'Clientes fora dos envios por sala (ritmo próprio)',
+                       client_queues.slow_count)
+client_demotions = metrics.counter('bifrost_client_demotions_total', 'Clientes que passaram a lentos')
+client_ack_seconds = metrics.histogram('bifrost_client_ack_seconds',
+                                       'Tempo até o ack das sondas e envios por conexão', LATENCY_BUCKETS)
+if recorder is not None:
+    metrics.counter_callback('bifrost_recorded_messages_total', 'Mensagens gravadas em disco',
+                             lambda: recorder.recorded)
+    metrics.counter_callback('bifrost_recorder_dropped_total', 'Mensagens não gravadas (fila cheia ou erro de disco)',
+                             lambda: recorder.dropped)
+
+# Assinaturas dos clientes WebSocket (padrão MQTT -> sids)
+# Cada conjunto de padrões assinados (tópicos exatos ou com + e #) vira uma
+# sala do Socket.IO, separada por codificação (JSON ou binária, ver wire.py):
+# clientes com o mesmo conjunto dividem a sala, e cada cliente recebe os
+# tópicos de todos os seus padrões num único envio, sem repetir os que casam
+# com mais de um padrão
+ROOM_PREFIX = 'topic:'
+BINARY_ROOM_PREFIX = 'topic-bin:'
+subscriptions = defaultdict(set)
+client_subscriptions = {}
+subscriptions_lock = threading.Lock()
+# Codificação de cada cliente, grupo (tupla ordenada dos padrões) de cada
+# cliente e quantos clientes de cada codificação há por grupo
+client_encoding = {}
+client_groups = {}
+group_encodings = defaultdict(Counter)
+# IDs de tópico já definidos para cada grupo com clientes binários (no
+# cluster, cada worker numera seus tópicos em uma sequência própria para os
+# IDs não colidirem)
+topic_dictionary = TopicDictionary(start=WORKER_ID, step=WORKER_COUNT)
+room_topic_ids = {}
+# Grupos dos outros workers do cluster (worker -> [[padrões], codificações])
+# e os padrões desses grupos
+remote_subscriptions = {}
+remote_group_encodings = {}
+remote_patterns = set()
+# Padrões assinados compilados em trie, grupos de cada padrão e cache
+# tópico -> grupos com algum padrão que o casa (refeitos quando mudam)
+subscription_trie = TopicTrie()
+pattern_groups = {}
+topic_rooms = {}
+
+# Envio de eventos aos clientes conforme o modo do servidor:
+# emit_to(evento, dados, sala), sala None = todos (definido ao iniciar o modo);
+# com callback (ack), sala é o sid de um cliente deste worker
+emit_to = None
+
+# Front-end estático gerado por assets.py (static/)
+assets = AssetStore()
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Nomes personalizados (tópico -> nome), gravados em segundo plano; no
+# cluster só o worker 0 grava o arquivo e os demais recebem as alterações
+CUSTOM_NAMES_FILE = 'custom_names.json'
+names_store = ConfigStore(CUSTOM_NAMES_FILE, persist=WORKER_ID == 0)
+atexit.register(names_store.close)
 
 # Cliente MQTT
 client = mqtt.Client()
 
+topic_filter = TopicFilter(MQTT_INCLUDE, MQTT_EXCLUDE)
+# Filtros assinados no broker; no cluster, o broker distribui as mensagens
+# entre os workers do grupo (assinatura compartilhada)
+broker_subscriptions = BrokerSubscriptions(f"$share/{MQTT_SHARE_GROUP}/" if cluster else '')
+# Janela de descoberta aberta e tópicos não assistidos já amostrados nela
+discovery_open = False
+discovery_seen = set()
+
+def broker_patterns():
+    if MQTT_SUBSCRIBE_MODE == 'static':
+        return set(MQTT_INCLUDE)
+    with subscriptions_lock:
+        patterns = subscriptions.keys() | remote_patterns
+    if discovery_open:
+        patterns |= set(MQTT_INCLUDE)
+    return patterns
+
+def sync_broker():
+    broker_subscriptions.set(broker_patterns())
+
+def run_discovery():
+    global discovery_open
+    while True:
+        discovery_seen.clear()
+        discovery_open = True
+        sync_broker()
+        time.sleep(DISCOVERY_WINDOW)
+        discovery_open = False
+        sync_broker()
+        time.sleep(DISCOVERY_INTERVAL)
+
 def on_connect(client, userdata, flags, rc):
     print(f"Conectado ao MQTT Broker com código {rc}")
-    for topic in MQTT_TOPICS:
-        client.subscribe(topic)
+    broker_subscriptions.attach(client.subscribe, client.unsubscribe)
 
-def on_message(client, userdata, msg):
+def on_disconnect(client, userdata, rc):
+    broker_subscriptions.detach()
+
+# Entrada comum das mensagens MQTT (paho no modo threading, cliente assíncrono
+# no modo asyncio, gravações no modo replay); timestamp e wait só vêm do
+# replay. Com wait a fila espera o dispatcher em vez de descartar.
+def ingest_message(topic, payload, timestamp=None, wait=False):
     try:
-        payload = msg.payload.decode()
-        topic = msg.topic
+        if timestamp is None:
+            timestamp = time.time()
+        if recorder is not None:
+            recorder.record(topic, payload, timestamp)
+        
+        if not topic_filter.allows(topic):
+            return
         
-        # Adiciona mensagem à fila
-        message_queue.put((topic, payload, time.time()))
+        # Fora dos modos estáticos, tópicos que ninguém assiste só entram
+        # como amostra de descoberta (uma por janela)
+        if MQTT_SUBSCRIBE_MODE != 'static' and not rooms_for_topic(topic):
+            if not discovery_open or topic in discovery_seen:
+                return
+            discovery_seen.add(topic)
+        
+        payload = payload.decode()
+        
+        # Tópico de outro worker: repassar ao dono pelo barramento
+        if cluster is not None and not cluster.owns(topic):
+            if wait:
+                cluster.send(cluster.owner(topic), 'ingest', [topic, payload, timestamp])
+                messages_forwarded.inc()
+                return
+            # Sem bloquear a thread de rede: a escrita no socket é da thread
+            # do barramento
+            if cluster.forward(cluster.owner(topic), 'ingest', [topic, payload, timestamp]):
+                messages_forwarded.inc()
+            else:
+                forwards_dropped.inc()
+            return
+        
+        if wait:
+            message_queue.put_wait(topic, payload, timestamp)
+        else:
+            # Adiciona mensagem à fila sem bloquear
+            message_queue.put(topic, payload, timestamp)
         
     except Exception as e:
         print(f"Erro ao processar mensagem: {e}")
 
+def on_message(client, userdata, msg):
+    ingest_message(msg.topic, msg.payload)
+
+def replay_message(topic, payload, timestamp=None):
+    ingest_message(topic, payload, timestamp, wait=True)
+
+def reconnect_delay(attempt):
+    # Exponencial limitada com jitter: metade fixa, metade aleatória, para
+    # vários processos não reconectarem ao broker todos juntos
+    delay = min(MQTT_BACKOFF_MAX, MQTT_BACKOFF_MIN * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+# Conexão ao broker em thread própria: o servidor HTTP/Socket.IO sobe sem
+# esperar o broker. Falhas de conexão e quedas tentam de novo com
+# reconnect_delay; on_connect refaz as assinaturas.
+def run_mqtt():
+    attempt = 0
+    while True:
+        try:
+            client.connect(MQTT_BROKER, MQTT_PORT, 60)
+        except OSError as e:
+            delay = reconnect_delay(attempt)
+            attempt += 1
+            print(f"Erro ao conectar ao MQTT Broker {MQTT_BROKER}:{MQTT_PORT}: {e}; nova tentativa em {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        connected = time.monotonic()
+        rc = mqtt.MQTT_ERR_SUCCESS
+        while rc == mqtt.MQTT_ERR_SUCCESS:
+            rc = client.loop(timeout=1.0)
+        # Só uma conexão que durou volta à espera mínima (broker que aceita e
+        # derruba logo continua recuando)
+        if time.monotonic() - connected > MQTT_BACKOFF_MAX:
+            attempt = 0
+        delay = reconnect_delay(attempt)
+        attempt += 1
+        print(f"Conexão MQTT perdida (código {rc}); reconectando em {delay:.1f}s")
+        time.sleep(delay)
+
+# Reproduz as gravações pelo pipeline de ingestão (no cluster, só o worker 0;
+# os tópicos dos demais seguem pelo barramento como mensagens ao vivo)
+def run_replay():
+    if cluster is not None and WORKER_ID != 0:
+        return
+    while True:
+        print(f"Reproduzindo {REPLAY_DIR} (velocidade {REPLAY_SPEED or 'máxima'})")
+        started = time.monotonic()
+        count = replay(read_records(REPLAY_DIR, REPLAY_START, REPLAY_END), replay_message,
+                       speed=REPLAY_SPEED, original_timestamps=REPLAY_TIMESTAMPS == 'original')
+        print(f"Replay concluído: {count} mensagens em {time.monotonic() - started:.1f}s")
+        if not REPLAY_LOOP or not count:
+            break
+
 client.on_connect = on_connect
+client.on_disconnect = on_disconnect
 client.on_message = on_message
-client.connect(MQTT_BROKER, MQTT_PORT, 60)
-client.loop_start()
+sync_broker()
+
+# Grupos (neste e nos demais workers) com algum padrão que casa com o tópico
+def rooms_for_topic(topic):
+    rooms = topic_rooms.get(topic)
+    if rooms is None:
+        with subscriptions_lock:
+            rooms = topic_rooms[topic] = list({group for pattern in subscription_trie.match(topic)
+                                               for group in pattern_groups[pattern]})
+    return rooms
+
+def patterns_changed():
+    # Chamar com subscriptions_lock: recompila a trie dos padrões assinados
+    # e os grupos de cada padrão
+    global subscription_trie, pattern_groups
+    groups = defaultdict(list)
+    for group in group_encodings.keys() | remote_group_encodings.keys():
+        for pattern in group:
+            groups[pattern].append(group)
+    pattern_groups = groups
+    subscription_trie = TopicTrie(groups.keys())
+    topic_rooms.clear()
+
+def room_encodings(group):
+    encodings = group_encodings.get(group)
+    remote = remote_group_encodings.get(group)
+    if remote is None:
+        return encodings
+    return remote + encodings if encodings else remote
+
+# Payloads de um batch como (evento, dados, sala); sala None vai para todos
+def batch_payloads(batch, new_topics):
+    if new_topics:
+        yield 'new_topics', new_topics, None
+
+    room_batches = defaultdict(list)
+    for topic, data in batch.items():
+        for group in rooms_for_topic(topic):
+            room_batches[group].append((topic, data))
+
+    # Um payload por grupo, codificado uma única vez para todos os membros
+    for group, entries in room_batches.items():
+        encodings = room_encodings(group)
+        if not encodings:
+            continue
+        if encodings['json']:
+            yield 'mqtt_batch', entries, room_name(group, 'json')
+        if encodings['binary']:
+            yield 'mqtt_batch', encode_room_frame(group, entries), room_name(group, 'binary')
+
+# Envia a cada sala apenas os tópicos que ela assinou (menos aos clientes lentos)
+def broadcast_batch(batch, new_topics):
+    started = time.perf_counter()
+    skip = list(slow_clients) or None
+    for event, data, room in batch_payloads(batch, new_topics):
+        socketio.emit(event, data, to=room, skip_sid=skip)
+    observe_batch(batch, started)
+
+# Alertas de um lote vão direto a todos os clientes num único evento, sem
+# esperar o batch (o arquivo do histórico é gravado pela thread dele)
+def raise_alerts(alerts):
+    alert_history.extend(alerts)
+    alerts_raised.inc_many([alert['state'] for alert in alerts])
+    if cluster is not None:
+        cluster.broadcast('alerts', {'worker': WORKER_ID, 'alerts': alerts})
+    if emit_to is not None:
+        emit_to('alerts', alerts)
+
+# Transições online/offline: histórico e todos os clientes, uma vez por tick
+def publish_liveness(events):
+    liveness_history.extend(events)
+    liveness_transitions.inc_many([event['state'] for event in events])
+    if cluster is not None:
+        cluster.broadcast('liveness', {'worker': WORKER_ID, 'events': events})
+    if emit_to is not None:
+        emit_to('liveness', events)
+
+# Thread da roda de temporização (liveness.py): só os prazos vencidos são visitados
+def run_liveness():
+    while True:
+        time.sleep(liveness.tick)
+        try:
+            events = liveness.advance()
+            if events:
+                publish_liveness(events)
+        except Exception as e:
+            print(f"Erro na verificação de tópicos parados: {e}")
+
+# Sondas, envios e mudanças de ritmo das conexões deste worker (clients.py)
+def run_client_queues():
+    while True:
+        time.sleep(client_queues.min_interval)
+        try:
+            now = time.monotonic()
+            for action, sid in client_queues.poll(now):
+                if action == 'probe':
+                    send_probe(sid, now)
+                elif action == 'flush':
+                    flush_slow_client(sid, now)
+                elif action == 'demote':
+                    demote_client(sid)
+                else:
+                    promote_client(sid)
+        except Exception as e:
+            print(f"Erro no envio aos clientes: {e}")
+
+def send_probe(sid, sent):
+    def ack(*args):
+        rtt = client_queues.probe_acked(sid, sent, time.monotonic())
+        if rtt is not None:
+            client_ack_seconds.observe(rtt)
+    emit_to('probe', sent, sid, callback=ack)
+
+def client_patterns(sid):
+    with subscriptions_lock:
+        return list(client_subscriptions.get(sid, ()))
+
+# Últimos valores que mudaram desde o envio anterior ao cliente lento, no
+# formato JSON do mqtt_batch (cada worker envia os dos seus tópicos)
+def slow_client_entries(sid, patterns):
+    cursor = slow_cursors.get(sid)
+    if cursor is None:
+        return []
+    seq, values = latest_values.snapshot(patterns, cursor)
+    slow_cursors[sid] = seq
+    return [[topic, {'payload': payload, 'timestamp': timestamp, 'seq': topic_seq}]
+            for topic, payload, timestamp, topic_seq in values]
+
+def flush_slow_client(sid, now):
+    patterns = client_patterns(sid)
+    if cluster is not None:
+        cluster.broadcast('client_flush', {'worker': WORKER_ID, 'sid': sid, 'patterns': patterns})
+    entries = slow_client_entries(sid, patterns)
+    # Marcar o envio antes de emitir: o ack pode chegar antes do emit retornar
+    client_queues.flushed(sid, now, bool(entries))
+    if entries:
+        def ack(*args):
+            rtt = client_queues.flush_acked(sid, now, time.monotonic())
+            if rtt is not None:
+                client_ack_seconds.observe(rtt)
+        emit_to('mqtt_batch', entries, sid, callback=ack)
+
+# Mudança de ritmo, no worker da conexão e (pelo barramento) nos demais
+def set_client_slow(sid, slow, patterns=()):
+    if slow:
+        slow_cursors[sid] = latest_values.seq
+        slow_clients.add(sid)
+        return
+    # Volta às salas antes do último envio, para nada se perder entre os dois
+    slow_clients.discard(sid)
+    entries = slow_client_entries(sid, patterns)
+    slow_cursors.pop(sid, None)
+    if entries and emit_to is not None:
+        emit_to('mqtt_batch', entries, sid)
+
+def demote_client(sid):
+    client_demotions.inc()
+    set_client_slow(sid, True)
+    if cluster is not None:
+        cluster.broadcast('client_mode', {'worker': WORKER_ID, 'sid': sid, 'slow': True, 'patterns': []})
+
+def promote_client(sid):
+    patterns = client_patterns(sid)
+    # Clientes binários perderam as definições de ID enviadas às salas
+    if client_encoding.get(sid) == 'binary':
+        definitions = []
+        for pattern in patterns:
+            definitions += describe_topics(pattern)
+            if cluster is not None:
+                cluster.broadcast('describe', {'worker': WORKER_ID, 'sid': sid, 'pattern': pattern})
+        if definitions:
+            emit_to('topic_ids', definitions, sid)
+    if cluster is not None:
+        cluster.broadcast('client_mode', {'worker': WORKER_ID, 'sid': sid, 'slow': False, 'patterns': patterns})
+    set_client_slow(sid, False, patterns)
+
+# Métricas de um batch enviado (started: time.perf_counter() antes do envio)
+def observe_batch(batch, started):
+    emit_seconds.observe(time.perf_counter() - started)
+    batch_entries.observe(len(batch))
+    now = time.time()
+    latency_seconds.observe_many([now - data['timestamp'] for data in batch.values()])
+
+# Frame binário de um grupo, definindo inline os IDs que ele ainda não conhece
+def encode_room_frame(group, entries):
+    defined = room_topic_ids.setdefault(group, set())
+    definitions = []
+    frame_entries = []
+    for topic, data in entries:
+        topic_id = topic_dictionary.get_id(topic)
+        if topic_id not in defined:
+            defined.add(topic_id)
+            definitions.append((topic_id, topic))
+        frame_entries.append((topic_id, data))
+    return encode_frame(frame_entries, definitions)
+
+def room_name(group, encoding):
+    # Padrões MQTT não podem conter o caractere nulo
+    return (BINARY_ROOM_PREFIX if encoding == 'binary' else ROOM_PREFIX) + '\0'.join(group)
+
+def client_room(sid):
+    # Sala do grupo atual do cliente (None sem assinaturas)
+    group = client_groups.get(sid)
+    return room_name(group, client_encoding.get(sid, 'json')) if group else None
+
+class Batcher:
+    # Acumula o valor mais recente por tópico e controla os prazos de envio.
+    # Usado pelo dispatcher em thread e pelo dispatcher asyncio (asgi.py).
+    def __init__(self):
+        self.batch = {}
+        self.new_topics = []
+        self.last_flush = 0.0
+        self.deadline = None
+
+    def timeout(self):
+        # Quanto esperar por mensagens antes do próximo envio (None = sem prazo)
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def add(self, messages):
+        if not messages:
+            return
+        topic_messages.inc_many([message[0] for message in messages])
+        alerts = []
+        now = time.monotonic()
+        # Valores já convertidos pelo parser do tópico (número ou texto);
+        # campos extraídos de JSON chegam como sub-séries <tópico>/<campo>
+        for topic, value, payload, timestamp in parser_pool.parse(messages):
+            if cluster is not None and not cluster.owns(topic):
+                # Sub-série derivada de outro worker: o dono é o do nome derivado
+                if not cluster.forward(cluster.owner(topic), 'ingest', [topic, payload, timestamp]):
+                    forwards_dropped.inc()
+                continue
+            # Anterior ao último registro do tópico (ex.: replay de um
+            # período já gravado): fica de fora para o histórico seguir ordenado
+            if not history_store.append(topic, timestamp, value):
+                continue
+            with history_lock:
+                if topic not in sensor_history:
+                    self.new_topics.append(topic)
+                sensor_history[topic].append(timestamp, value)
+            topic_index.update(topic, value, timestamp)
+            alerts += alert_rules.evaluate(topic, value, timestamp)
+            liveness.observe(topic, timestamp, now)
+            
+            # Adicionar ao batch mantendo sempre o valor mais recente
+            self.batch[topic] = {
+                'payload': payload,
+                'timestamp': timestamp,
+                'seq': sensor_history[topic].seq
+            }
+            
+            # Primeira mensagem do batch: envia assim que o intervalo
+            # desde o último envio tiver passado
+            if self.deadline is None:
+                self.deadline = max(self.last_flush + BATCH_INTERVAL, time.monotonic())
+        if alerts:
+            raise_alerts(alerts)
+
+    def due(self):
+        if self.deadline is None:
+            return False
+        return time.monotonic() >= self.deadline or len(self.batch) >= MAX_BATCH_SIZE
+
+    def take(self):
+        # No máximo MAX_BATCH_SIZE tópicos por envio; o restante fica para o
+        # próximo envio, já vencido
+        if len(self.batch) > MAX_BATCH_SIZE:
+            batch = {topic: self.batch.pop(topic) for topic in list(islice(self.batch, MAX_BATCH_SIZE))}
+        else:
+            batch, self.batch = self.batch, {}
+        new_topics, self.new_topics = self.new_topics, []
+        latest_values.update(batch)
+        # Manter a cadência alinhada aos prazos, sem acumular atraso
+        now = time.monotonic()
+        self.last_flush = self.deadline if now - self.deadline < BATCH_INTERVAL else now
+        self.deadline = now if self.batch else None
+        return batch, new_topics
 
 # Thread para processar mensagens MQTT
 def process_messages():
-    last_broadcast = time.time()
-    batch = {}
+    batcher = Batcher()
     
     while True:
         try:
-            # Processar todas as mensagens na fila
-            while not message_queue.empty():
-                topic, payload, timestamp = message_queue.get_nowait()
-                
-                try:
-                    # Tentar converter para float se possível
-                    numeric_value = float(payload)
-                    sensor_history[topic].append((timestamp, numeric_value))
-                except ValueError:
-                    # Manter como string se não for numérico
-                    sensor_history[topic].append((timestamp, payload))
-                
-                # Adicionar ao batch
-                if topic not in batch:
-                    batch[topic] = {
-                        'payload': payload,
-                        'timestamp': timestamp
-                    }
-            
-            # Enviar batch a cada 50ms
-            if batch and (time.time() - last_broadcast > 0.05):
-                socketio.emit('mqtt_batch', list(batch.items()))
-                batch = {}
-                last_broadcast = time.time()
-                
-            # Pausa para evitar consumo excessivo de CPU
-            time.sleep(0.01)
+            # Bloquear até chegar mensagem ou vencer o prazo do batch
+            batcher.add(message_queue.get(timeout=batcher.timeout()))
+            if batcher.due():
+                broadcast_batch(*batcher.take())
             
         except Exception as e:
             print(f"Erro no processamento de mensagens: {e}")
 
-# Iniciar thread de processamento
-threading.Thread(target=process_messages, daemon=True).start()
+# Estado de assinaturas compartilhado entre os workers do cluster
+def announce_subscriptions(message=None):
+    if cluster is None:
+        return
+    with subscriptions_lock:
+        state = [[list(group), dict(counts)] for group, counts in group_encodings.items()]
+    cluster.broadcast('subscriptions', {'worker': WORKER_ID, 'groups': state})
+
+def handle_remote_subscriptions(message):
+    if message['worker'] == WORKER_ID:
+        return
+    with subscriptions_lock:
+        remote_subscriptions[message['worker']] = message['groups']
+        merged = defaultdict(Counter)
+        for groups in remote_subscriptions.values():
+            for group, counts in groups:
+                merged[tuple(group)].update(counts)
+        changed = merged.keys() != remote_group_encodings.keys()
+        remote_group_encodings.clear()
+        remote_group_encodings.update(merged)
+        patterns = {pattern for group in merged for pattern in group}
+        broker_changed = patterns != remote_patterns
+        if broker_changed:
+            remote_patterns.clear()
+            remote_patterns.update(patterns)
+        if changed:
+            patterns_changed()
+    if broker_changed:
+        sync_broker()
+
+def describe_topics(pattern):
+    # Definições de ID dos tópicos deste worker que casam com o padrão
+    trie = TopicTrie([pattern])
+    return [(topic_dictionary.get_id(topic), topic)
+            for topic in list(sensor_history) if trie.matches(topic)]
+
+def start_cluster():
+    cluster.handle('http', serve_forwarded)
+    cluster.handle('histories', lambda pairs: collect_histories(history_states(pairs)))
+    cluster.handle('topic_index', query_topic_index)
+    cluster.handle('export', export_page)
+    cluster.handle('liveness', query_liveness)
+    cluster.handle('clients', lambda params: client_queues.describe(time.monotonic()))
+
+    def handle_describe(message):
+        if message['worker'] == WORKER_ID:
+            return
+        definitions = describe_topics(message['pattern'])
+        if definitions:
+            emit_to('topic_ids', definitions, message['sid'])
+
+    def handle_snapshot(message):
+        if message['worker'] != WORKER_ID:
+            emit_to('snapshot', snapshot_for(message['patterns'], message['since']), message['sid'])
+
+    def handle_names(message):
+        if message['worker'] != WORKER_ID:
+            names_store.set_many(message['names'])
+
+    def handle_alerts(message):
+        if message['worker'] != WORKER_ID:
+            alert_history.extend(message['alerts'])
+
+    def handle_liveness(message):
+        if message['worker'] != WORKER_ID:
+            liveness_history.extend(message['events'])
+
+    def handle_client_mode(message):
+        if message['worker'] != WORKER_ID:
+            set_client_slow(message['sid'], message['slow'], message['patterns'])
+
+    def handle_client_flush(message):
+        if message['worker'] != WORKER_ID:
+            entries = slow_client_entries(message['sid'], message['patterns'])
+            if entries:
+                emit_to('mqtt_batch', entries, message['sid'])
+    
+    cluster.on(f'ingest.{WORKER_ID}', lambda message: message_queue.put(*message))
+    cluster.on('subscriptions', handle_remote_subscriptions)
+    cluster.on('subscriptions_sync', announce_subscriptions)
+    cluster.on('describe', handle_describe)
+    cluster.on('names', handle_names)
+    cluster.on('alerts', handle_alerts)
+    cluster.on('liveness', handle_liveness)
+    cluster.on('client_mode', handle_client_mode)
+    cluster.on('client_flush', handle_client_flush)
+    cluster.on('snapshot', handle_snapshot)
+    cluster.broadcast('subscriptions_sync', {'worker': WORKER_ID})
+
+# Tópicos com histórico em disco entram no índice já ao iniciar
+def seed_topic_index():
+    try:
+        for topic in history_store.topics():
+            if cluster is None or cluster.owns(topic):
+                topic_index.add(topic)
+    except OSError as e:
+        print(f"Erro ao carregar tópicos do histórico: {e}")
+
+# Modo threading: paho em thread própria e dispatcher em thread
+def start_threading_mode():
+    global emit_to
+    parser_pool.start()
+    ingest_rate.start()
+    emit_to = lambda event, data, room=None, callback=None: socketio.emit(
+        event, data, to=room, callback=callback, ignore_queue=callback is not None)
+    if cluster is not None:
+        start_cluster()
+    history_store.start()
+    names_store.start()
+    alert_history.start()
+    liveness_history.start()
+    if recorder is not None:
+        recorder.start()
+    threading.Thread(target=seed_topic_index, daemon=True).start()
+    threading.Thread(target=run_liveness, daemon=True).start()
+    threading.Thread(target=run_client_queues, daemon=True).start()
+    start_warm_state()
+    threading.Thread(target=process_messages, daemon=True).start()
+    if REPLAY_DIR:
+        threading.Thread(target=run_replay, daemon=True).start()
+    else:
+        threading.Thread(target=run_mqtt, daemon=True).start()
+    if MQTT_SUBSCRIBE_MODE == 'discovery':
+        threading.Thread(target=run_discovery, daemon=True).start()
+
+def warm_state_files():
+    if cluster is None:
+        return [WARM_STATE_FILE] if os.path.exists(WARM_STATE_FILE) else []
+    directory = os.path.dirname(WARM_STATE_FILE) or '.'
+    prefix = os.path.basename(WARM_STATE_FILE) + '.w'
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.startswith(prefix) and name[len(prefix):].isdigit()]
+
+# Carrega o estado salvo antes de aceitar clientes (no cluster, só os
+# tópicos deste worker, de qualquer arquivo: o número de workers pode mudar)
+def restore_warm_state():
+    started = time.perf_counter()
+    latest = {}
+    for path in warm_state_files():
+        try:
+            for topic, seq, ts, values, text, data in load_warm_state(path):
+                if cluster is not None and not cluster.owns(topic):
+                    continue
+                if seq:
+                    sensor_history[topic].restore(ts, values, text, seq)
+                if data is not None:
+                    latest[topic] = data
+                topic_index.add(topic)
+        except Exception as e:
+            print(f"Erro ao carregar estado salvo ({path}): {e}")
+    if latest or sensor_history:
+        latest_values.update(latest)
+        print(f"Estado restaurado: {len(sensor_history)} tópicos em {(time.perf_counter() - started) * 1000:.0f} ms")
+
+def save_warm_state():
+    path = WARM_STATE_FILE if cluster is None else f"{WARM_STATE_FILE}.w{WORKER_ID}"
+    try:
+        with history_lock:
+            records = warm_state_snapshot(sensor_history, latest_values.items())
+        dump_warm_state(path, records)
+    except Exception as e:
+        print(f"Erro ao gravar estado em {path}: {e}")
+
+def run_warm_state():
+    while True:
+        time.sleep(WARM_STATE_INTERVAL)
+        save_warm_state()
+
+# Chamado uma vez pelo modo que serve (start_threading_mode ou asgi.py),
+# antes de o dispatcher e o MQTT começarem
+def start_warm_state():
+    if not WARM_STATE_FILE:
+        return
+    restore_warm_state()
+    atexit.register(save_warm_state)
+    if WARM_STATE_INTERVAL > 0:
+        threading.Thread(target=run_warm_state, daemon=True).start()
+
+# Modo cluster: um processo por worker, na porta HTTP_PORT + id do worker
+# (colocar um balanceador na frente; os clientes usam só websocket)
+def run_workers():
+    workers = []
+    for worker_id in range(WORKER_COUNT):
+        env = dict(os.environ, BIFROST_WORKER_ID=str(worker_id))
+        workers.append(subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env))
+    try:
+        for worker in workers:
+            worker.wait()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+# Aplica alterações de nomes e as envia a todos os clientes (e workers)
+def update_names(names):
+    changed = names_store.set_many(names)
+    if changed:
+        if cluster is not None:
+            cluster.broadcast('names', {'worker': WORKER_ID, 'names': changed})
+        if emit_to is not None:
+            emit_to('custom_names', {'names': changed})
+    return changed
 
 @app.route('/update_name', methods=['POST'])
 def update_name():
@@ -108,561 +926,530 @@ def update_name():
     new_name = data.get('name')
     
     if topic:
-        custom_names[topic] = new_name
-        # Salvar em arquivo
-        with open(CUSTOM_NAMES_FILE, 'w') as f:
-            json.dump(custom_names, f)
+        update_names({topic: new_name})
         return jsonify(success=True)
     return jsonify(success=False)
 
+# Leitura e gravação em lote dos nomes: GET /names[?topic=...], POST {"names": {...}}
+@app.route('/names', methods=['GET', 'POST'])
+def names():
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        values = data.get('names')
+        if not isinstance(values, dict):
+            return jsonify(error="Campo 'names' deve ser um objeto"), 400
+        return jsonify(changed=update_names(values))
+    topics = request.args.getlist('topic')
+    return jsonify(names=names_store.get_many(topics or None))
+
+# Consulta ao índice local: busca (prefixo/substring) ou filhos de um nível
+def query_topic_index(params):
+    if params['kind'] == 'children':
+        items, cursor = topic_index.children(params['path'], params['after'], params['limit'])
+    else:
+        items, cursor = topic_index.search(params['prefix'], params['query'], params['after'], params['limit'])
+    return {'items': items, 'next': cursor}
+
+# No cluster, junta as páginas de todos os workers (cada um devolve até
+# limit itens depois do cursor, então a página global está na união)
+def gather_topic_index(params, key, cursor, merge=None):
+    if cluster is None:
+        return query_topic_index(params)
+    items = []
+    more = False
+    for worker in range(cluster.worker_count):
+        result = cluster.call(worker, 'topic_index', params)
+        items += result['items']
+        more = more or result['next'] is not None
+    if merge is not None:
+        items = merge(items)
+    items.sort(key=key)
+    more = more or len(items) > params['limit']
+    items = items[:params['limit']]
+    return {'items': items, 'next': cursor(items[-1]) if more else None}
+
+def topic_page_args():
+    limit = max(1, min(request.args.get('limit', 100, type=int), TOPIC_PAGE_LIMIT))
+    return limit, request.args.get('after') or None
+
+# Busca de tópicos: GET /topics?prefix=casa/&q=temp&limit=100&after=<último tópico>
+@app.route('/topics')
+def search_topics():
+    limit, after = topic_page_args()
+    params = {'kind': 'search', 'prefix': request.args.get('prefix', ''), 'query': request.args.get('q', ''),
+              'after': after, 'limit': limit}
+    try:
+        result = gather_topic_index(params, lambda item: item['topic'].split('/'), lambda item: item['topic'])
+    except (TimeoutError, RuntimeError) as e:
+        return jsonify(success=False, error=str(e)), 503
+    return jsonify(topics=result['items'], next=result['next'])
+
+# Filhos de um nível: GET /topics/children?path=casa&limit=100&after=<último nome>
+@app.route('/topics/children')
+def topic_children():
+    limit, after = topic_page_args()
+    params = {'kind': 'children', 'path': request.args.get('path', ''), 'after': after, 'limit': limit}
+    try:
+        result = gather_topic_index(params, lambda item: item['name'], lambda item: item['name'], merge_children)
+    except (TimeoutError, RuntimeError) as e:
+        return jsonify(success=False, error=str(e)), 503
+    return jsonify(path=params['path'], children=result['items'], next=result['next'])
+
+def merge_children(items):
+    # O mesmo nível pode ter tópicos em vários workers: somar as contagens
+    merged = {}
+    for item in items:
+        current = merged.get(item['name'])
+        if current is None:
+            merged[item['name']] = dict(item)
+            continue
+        current['topics'] += item['topics']
+        current['has_children'] = current['has_children'] or item['has_children']
+        if 'topic' in item:
+            current.update({key: value for key, value in item.items() if key not in ('topics', 'has_children')})
+    return list(merged.values())
+
+# Ritmo e atraso de cada conexão WebSocket: GET /clients[?mode=slow]
+@app.route('/clients')
+def clients():
+    mode = request.args.get('mode')
+    if cluster is None:
+        items = client_queues.describe(time.monotonic())
+    else:
+        items = []
+        try:
+            for worker in range(cluster.worker_count):
+                items += [dict(item, worker=worker) for item in cluster.call(worker, 'clients', {})]
+        except (TimeoutError, RuntimeError) as e:
+            return jsonify(success=False, error=str(e)), 503
+    if mode:
+        items = [item for item in items if item['mode'] == mode]
+    return jsonify(clients=items)
+
+# Histórico de alertas, mais recentes primeiro: GET /alerts[?limit=100&topic=casa/#]
+@app.route('/alerts')
+def alerts():
+    limit = request.args.get('limit', 100, type=int)
+    pattern = request.args.get('topic')
+    matches = TopicTrie([pattern]).matches if pattern else None
+    return jsonify(alerts=alert_history.latest(limit, matches))
+
+# Tópicos a exportar: nomes exatos e padrões com + e # (casados com os
+# tópicos que têm histórico em disco, visíveis a todos os workers)
+def export_topics(selectors):
+    topics = {selector for selector in selectors if '+' not in selector and '#' not in selector}
+    patterns = TopicTrie(selector for selector in selectors if selector not in topics)
+    if len(patterns):
+        topics.update(topic for topic in history_store.topics() if patterns.matches(topic))
+    return sorted(topics)
+
+# Página de registros de um tópico: até limit a partir de start, pulando os
+# skip primeiros (os de mesmo timestamp já enviados na página anterior)
+def export_page(params):
+    skip = params['skip']
+    rows = islice(history_store.query(params['topic'], params['start'], params['end']),
+                  skip, skip + params['limit'])
+    return [list(row) for row in rows]
+
+def export_rows(topic, start, end):
+    if cluster is None or cluster.owns(topic):
+        # Leitura direta dos segmentos (mmap), sem segurar o lock da série
+        for ts, value in history_store.query(topic, start, end):
+            yield topic, ts, value
+        return
+    # Tópico de outro worker: só o dono conhece as escritas pendentes e os
+    # segmentos atuais, então os registros vêm dele em páginas
+    skip = 0
+    while True:
+        rows = cluster.call(cluster.owner(topic), 'export', {
+            'topic': topic, 'start': start, 'end': end, 'skip': skip, 'limit': EXPORT_PAGE_SIZE,
+        })
+        for ts, value in rows:
+            yield topic, ts, value
+        if len(rows) < EXPORT_PAGE_SIZE:
+            return
+        last = rows[-1][0]
+        repeated = 0
+        for row in reversed(rows):
+            if row[0] != last:
+                break
+            repeated += 1
+        skip = skip + repeated if last == start else repeated
+        start = last
+
+def stream_export(topics, start, end, fmt):
+    rows = chain.from_iterable(export_rows(topic, start, end) for topic in topics)
+    try:
+        yield from export_chunks(rows, fmt)
+    except (TimeoutError, RuntimeError, OSError) as e:
+        # Os cabeçalhos já foram enviados: a resposta termina incompleta
+        print(f"Erro na exportação do histórico: {e}")
+
+# Exportação do histórico bruto em streaming (memória constante para qualquer intervalo):
+# GET /export?topic=casa/sala/temp&topic=energia/#&from=<ts>&to=<ts>&format=csv|ndjson|parquet
+@app.route('/export')
+def export_history():
+    selectors = request.args.getlist('topic')
+    fmt = request.args.get('format', 'csv')
+    if not selectors:
+        return jsonify(success=False, error="Informe ao menos um 'topic'"), 400
+    if fmt not in EXPORT_FORMATS:
+        return jsonify(success=False, error=f"Formato inválido: {fmt}"), 400
+    if not export_available(fmt):
+        return jsonify(success=False, error=f"Formato {fmt} requer o pacote pyarrow"), 501
+    start = request.args.get('from', type=float)
+    end = request.args.get('to', type=float)
+    try:
+        topics = export_topics(selectors)
+    except OSError as e:
+        return jsonify(success=False, error=str(e)), 500
+    return Response(stream_export(topics, start, end, fmt), mimetype=EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="bifrost-export.{fmt}"',
+        'Cache-Control': 'no-store',
+    })
+
+# Estado online/offline local; nomes exatos são consultados direto, padrões
+# percorrem os tópicos acompanhados
+def query_liveness(params):
+    online = None if params['state'] is None else params['state'] == 'online'
+    patterns = params['topics']
+    if patterns and not any('+' in pattern or '#' in pattern for pattern in patterns):
+        items = [item for item in liveness.lookup(patterns)
+                 if online is None or (item['state'] == 'online') == online]
+        return items[:params['limit']]
+    matches = TopicTrie(patterns).matches if patterns else None
+    return liveness.status(matches, online, params['limit'])
+
+# Estado dos tópicos: GET /liveness[?topic=casa/sala/temp&topic=energia/#&state=offline&limit=1000]
+@app.route('/liveness')
+def liveness_status():
+    state = request.args.get('state')
+    if state not in (None, 'online', 'offline'):
+        return jsonify(success=False, error=f"Estado inválido: {state}"), 400
+    params = {'topics': request.args.getlist('topic'), 'state': state,
+              'limit': max(1, min(request.args.get('limit', TOPIC_PAGE_LIMIT, type=int), TOPIC_PAGE_LIMIT))}
+    if cluster is None:
+        return jsonify(topics=query_liveness(params))
+    items = []
+    try:
+        for worker in range(cluster.worker_count):
+            items += cluster.call(worker, 'liveness', params)
+    except (TimeoutError, RuntimeError) as e:
+        return jsonify(success=False, error=str(e)), 503
+    items.sort(key=lambda item: item['topic'])
+    return jsonify(topics=items[:params['limit']])
+
+# Transições online/offline, mais recentes primeiro: GET /liveness/history[?limit=100&topic=casa/#]
+@app.route('/liveness/history')
+def liveness_events():
+    limit = request.args.get('limit', 100, type=int)
+    pattern = request.args.get('topic')
+    matches = TopicTrie([pattern]).matches if pattern else None
+    return jsonify(events=liveness_history.latest(limit, matches))
+
+# No cluster, consultas sobre tópicos de outro worker são atendidas pelo dono
+def forward_request(topic):
+    try:
+        status, body, headers = cluster.call(cluster.owner(topic), 'http', {
+            'path': request.path,
+            'query': request.query_string.decode(),
+            'headers': {'If-None-Match': request.headers.get('If-None-Match', '')},
+        })
+    except (TimeoutError, RuntimeError) as e:
+        return jsonify(success=False, error=str(e)), 503
+    return Response(body, status=status, headers=headers)
+
+def serve_forwarded(params):
+    with app.test_request_context(params['path'], query_string=params['query'], headers=params['headers']):
+        response = app.full_dispatch_request()
+        headers = {name: value for name, value in response.headers.items()
+                   if name in ('Content-Type', 'ETag', 'Cache-Control')}
+        return [response.status_code, response.get_data(as_text=True), headers]
+
 @app.route('/get_history')
 def get_history():
     topic = request.args.get('topic')
-    if topic in sensor_history:
-        return jsonify(history=list(sensor_history[topic]))
-    return jsonify(history=[])
+    if cluster is not None and topic and not cluster.owns(topic):
+        return forward_request(topic)
+    start = request.args.get('from', type=float)
+    end = request.args.get('to', type=float)
+    resolution = request.args.get('resolution', 'raw')
+    max_points = request.args.get('max_points', type=int)
+    
+    if resolution not in TIER_WIDTHS and resolution not in ('raw', 'auto'):
+        return jsonify(success=False, error=f"Resolução inválida: {resolution}"), 400
+    if not topic:
+        # Sem tópico não há série a consultar (como antes: histórico vazio)
+        return jsonify(history=[], resolution=resolution)
+    
+    # Resolução automática: a faixa de agregados mais fina que cabe em max_points
+    if resolution == 'auto':
+        max_points = max_points or HISTORY_MAX_POINTS
+        end = end if end is not None else time.time()
+        start = start if start is not None else end - 3600
+        resolution = choose_tier(start, end, max_points) or 'raw'
+    
+    if resolution in TIER_WIDTHS:
+        # Agregados: [início do bucket, média, min, max, contagem]
+        max_points = max_points or HISTORY_MAX_POINTS
+        end = end if end is not None else time.time()
+        if start is None:
+            start = end - max_points * TIER_WIDTHS[resolution]
+        history = list(islice(history_store.rollup_query(topic, resolution, start, end), HISTORY_QUERY_LIMIT))
+    elif start is not None or end is not None:
+        # Consulta por intervalo vai direto ao armazenamento em disco
+        limit = min(request.args.get('limit', HISTORY_QUERY_LIMIT, type=int), HISTORY_QUERY_LIMIT)
+        history = list(islice(history_store.query(topic, start, end), limit))
+    elif topic in sensor_history:
+        history = list(sensor_history[topic])
+    else:
+        # Após reinício, o histórico recente ainda está no disco
+        history = history_store.tail(topic, HISTORY_LENGTH)
+    
+    if max_points:
+        history = downsample(history, max_points)
+    return jsonify(history=history, resolution=resolution)
+
+# Estado (tópico, seq, cursor) de cada par pedido
+def history_states(pairs):
+    return [(topic, sensor_history[topic].seq if topic in sensor_history else 0, since)
+            for topic, since in pairs]
+
+def collect_histories(states):
+    histories = {}
+    for topic, seq, since in states:
+        if topic in sensor_history:
+            history = sensor_history[topic].since(since)
+            # reset: o cliente perdeu mais amostras do que o anel guarda
+            reset = since <= 0 or seq - since > len(history)
+        else:
+            history = history_store.tail(topic, HISTORY_LENGTH)
+            reset = True
+        histories[topic] = {'history': history, 'seq': seq, 'reset': reset}
+    return histories
+
+@app.route('/get_histories')
+def get_histories():
+    # Histórico de vários tópicos numa só requisição: ?topic=a&since=12&topic=b&since=40
+    # Cada since vale para o topic imediatamente antes dele (sem since, 0)
+    pairs = []
+    for name, value in request.args.items(multi=True):
+        if name == 'topic':
+            pairs.append([value, 0])
+        elif name == 'since':
+            if not pairs or not value.isdigit():
+                return jsonify(success=False, error=f"since inválido: {value!r}"), 400
+            pairs[-1][1] = int(value)
+    if len(pairs) > HISTORY_BATCH_LIMIT:
+        return jsonify(success=False, error=f"Máximo de {HISTORY_BATCH_LIMIT} tópicos por requisição"), 400
+    pairs = [tuple(pair) for pair in pairs]
+    
+    histories = None
+    if cluster is not None:
+        # Cada worker dono responde pelos seus tópicos
+        by_owner = defaultdict(list)
+        for pair in pairs:
+            by_owner[cluster.owner(pair[0])].append(pair)
+        histories = {}
+        try:
+            for owner, owner_pairs in by_owner.items():
+                histories.update(cluster.call(owner, 'histories', owner_pairs))
+        except (TimeoutError, RuntimeError) as e:
+            return jsonify(success=False, error=str(e)), 503
+        state = [(topic, histories[topic]['seq'], since) for topic, since in pairs]
+    else:
+        state = history_states(pairs)
+    
+    # Sem novas amostras desde a última resposta: 304 sem montar o corpo
+    etag = hashlib.sha1(json.dumps(state).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        if histories is None:
+            histories = collect_histories(state)
+        response = jsonify(histories=histories)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/history_stats')
+def history_stats():
+    # Memória ocupada pelo histórico recente (por tópico com ?detail=1)
+    usage = memory_usage(sensor_history)
+    if not request.args.get('detail'):
+        del usage['per_topic']
+    return jsonify(usage)
+
+# Front-end (ver assets.py): a página é revalidada a cada carga (ETag) e os
+# arquivos com hash no nome ficam em cache por um ano
 @app.route('/')
 def index():
-    html = """
-    <!DOCTYPE html>
-    <html lang="pt-BR">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Bifrost Dashboard</title>
-        <script src="https://cdn.tailwindcss.com"></script>
-        <script src="https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.5.1/socket.io.js"></script>
-        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-        <script>
-            tailwind.config = {
-                theme: {
-                    extend: {
-                        colors: {
-                            primary: '#41BDF5',
-                            secondary: '#0075D4',
-                            accent: '#FF9500',
-                            dark: '#121212',
-                            card: '#1E1E1E',
-                            light: '#2D2D2D'
-                        }
-                    }
-                }
-            }
-        </script>
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&display=swap');
-            :root {
-                --primary: #41BDF5;
-                --secondary: #0075D4;
-                --accent: #FF9500;
-                --dark: #121212;
-                --card: #1E1E1E;
-                --light: #2D2D2D;
-            }
-            body {
-                font-family: 'Poppins', sans-serif;
-                background-color: var(--dark);
-                color: #FFFFFF;
-                margin: 0;
-                padding: 0;
-                overflow-x: hidden;
-            }
-            .sensor-card {
-                background-color: var(--card);
-                border-radius: 16px;
-                transition: all 0.3s ease;
-                box-shadow: 0 4px 20px rgba(0, 0, 0, 0.25);
-                overflow: hidden;
-            }
-            .sensor-card:hover {
-                transform: translateY(-5px);
-                box-shadow: 0 6px 25px rgba(65, 189, 245, 0.2);
-            }
-            .card-header {
-                background-color: rgba(65, 189, 245, 0.15);
-                padding: 16px;
-                border-bottom: 1px solid var(--light);
-            }
-            .chart-container {
-                height: 120px;
-                position: relative;
-            }
-            .pulse {
-                animation: pulse 1s ease;
-            }
-            @keyframes pulse {
-                0% { transform: scale(1); box-shadow: 0 0 0 0 rgba(65, 189, 245, 0.4); }
-                50% { transform: scale(1.02); }
-                100% { transform: scale(1); box-shadow: 0 0 0 10px rgba(65, 189, 245, 0); }
-            }
-            .add-btn {
-                background: linear-gradient(135deg, var(--primary), var(--secondary));
-                transition: all 0.3s;
-            }
-            .add-btn:hover {
-                opacity: 0.9;
-                transform: scale(1.05);
-            }
-            .topic-badge {
-                background-color: rgba(255, 149, 0, 0.15);
-                color: var(--accent);
-                font-size: 0.7rem;
-            }
-            .value-change {
-                transition: all 0.3s ease;
-            }
-        </style>
-    </head>
-    <body class="min-h-screen">
-        <!-- Top Bar -->
-        <div class="bg-card py-4 px-6 border-b border-light flex justify-between items-center">
-            <div class="flex items-center">
-                <div class="w-10 h-10 rounded-lg bg-primary/20 flex items-center justify-center mr-3">
-                    <i class="fas fa-home text-primary"></i>
-                </div>
-                <h1 class="text-2xl font-bold">Bifrost Dashboard</h1>
-            </div>
-            <div class="flex items-center gap-4">
-                <div class="text-sm">
-                    <span id="messageRate">0</span> msg/s
-                </div>
-                <div class="flex items-center">
-                    <div class="w-3 h-3 rounded-full bg-green-500 mr-2"></div>
-                    <span class="text-green-500">Conectado</span>
-                </div>
-            </div>
-        </div>
-        
-        <!-- Main Content -->
-        <div class="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-8">
-            <!-- Input Section -->
-            <div class="bg-card rounded-xl p-6 mb-8 border border-light">
-                <h2 class="text-xl font-semibold mb-4">Adicionar Novo Sensor</h2>
-                <div class="grid grid-cols-1 md:grid-cols-3 gap-4">
-                    <div>
-                        <label class="block text-sm font-medium mb-2 text-gray-400">Tópico MQTT</label>
-                        <input id="topicInput" type="text" placeholder="Ex: sensor/temperatura" 
-                               class="w-full px-4 py-3 bg-light border border-gray-700 rounded-lg text-white focus:outline-none focus:ring-2 focus:ring-primary focus:border-transparent">
-                    </div>
-                    <div>
-                        <label class="block text-sm font-medium mb-2 text-gray-400">Nome Amigável (Opcional)</label>
-                        <input id="friendlyName" type="text" placeholder="Ex: Temperatura Sala" 
-                               class="w-full px-4 py-3 bg-light border border-gray-700 rounded-lg text-white focus:outline-none focus:ring-2 focus:ring-primary focus:border-transparent">
-                    </div>
-                    <div class="flex items-end">
-                        <button onclick="addSensorCard()" class="w-full add-btn text-white font-medium rounded-lg px-6 py-3 flex items-center justify-center gap-2">
-                            <i class="fas fa-plus"></i>
-                            Adicionar Sensor
-                        </button>
-                    </div>
-                </div>
-                
-                <!-- Recent Topics -->
-                <div class="mt-6">
-                    <h3 class="text-lg font-medium mb-3">Tópicos Recentes</h3>
-                    <div id="recentTopics" class="flex flex-wrap gap-2">
-                        <!-- Recent topics will be added here -->
-                    </div>
-                </div>
-            </div>
-            
-            <!-- Cards Grid -->
-            <div id="sensorCards" class="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
-                <!-- Cards will be added here dynamically -->
-            </div>
-            
-            <!-- Empty State -->
-            <div id="emptyState" class="text-center py-16">
-                <div class="mx-auto w-24 h-24 rounded-full bg-card flex items-center justify-center mb-6">
-                    <i class="fas fa-satellite-dish text-4xl text-primary"></i>
-                </div>
-                <h3 class="text-xl font-semibold mb-2">Nenhum sensor adicionado</h3>
-                <p class="text-gray-400 max-w-md mx-auto">
-                    Adicione sensores usando o formulário acima para começar a monitorar
-                </p>
-            </div>
-        </div>
-
-        <script>
-            const socket = io({ transports: ['websocket'] });
-            const sensorCards = {};
-            const recentTopics = new Set();
-            const customNames = {};
-            let messageCount = 0;
-            let lastMessageUpdate = Date.now();
-            
-            // Carregar nomes personalizados do localStorage
-            function loadCustomNames() {
-                const savedNames = localStorage.getItem('customNames');
-                if (savedNames) {
-                    try {
-                        Object.assign(customNames, JSON.parse(savedNames));
-                    } catch (e) {
-                        console.error('Error loading custom names:', e);
-                    }
-                }
-            }
-            
-            // Salvar nomes personalizados no localStorage
-            function saveCustomNames() {
-                localStorage.setItem('customNames', JSON.stringify(customNames));
-            }
-            
-            // Inicializar
-            loadCustomNames();
-            
-            // Atualizar estado vazio
-            function checkEmptyState() {
-                const emptyState = document.getElementById('emptyState');
-                if (Object.keys(sensorCards).length > 0) {
-                    emptyState.classList.add('hidden');
-                } else {
-                    emptyState.classList.remove('hidden');
-                }
-            }
-            
-            // Processar mensagens em batch
-            socket.on('mqtt_batch', (batch) => {
-                messageCount += batch.length;
-                
-                // Atualizar taxa de mensagens a cada segundo
-                const now = Date.now();
-                if (now - lastMessageUpdate > 1000) {
-                    document.getElementById('messageRate').textContent = messageCount;
-                    messageCount = 0;
-                    lastMessageUpdate = now;
-                }
-                
-                // Processar cada mensagem do batch
-                for (const [topic, data] of batch) {
-                    const { payload, timestamp } = data;
-                    
-                    // Adicionar tópico aos recentes
-                    if (!recentTopics.has(topic)) {
-                        recentTopics.add(topic);
-                        updateRecentTopics();
-                    }
-                    
-                    // Atualizar card existente
-                    if (sensorCards[topic]) {
-                        const card = sensorCards[topic];
-                        
-                        // Atualizar valor com animação
-                        const valueElement = card.querySelector('.current-value');
-                        const prevValue = parseFloat(valueElement.textContent) || 0;
-                        const newValue = parseFloat(payload) || payload;
-                        
-                        valueElement.textContent = payload;
-                        
-                        // Adicionar ao histórico do gráfico
-                        if (card.chart) {
-                            const chart = card.chart;
-                            const datasets = chart.data.datasets;
-                            
-                            if (datasets.length > 0) {
-                                const data = datasets[0].data;
-                                data.push(newValue);
-                                
-                                // Manter apenas os últimos pontos
-                                if (data.length > 15) {
-                                    data.shift();
-                                    chart.data.labels.shift();
-                                }
-                                
-                                // Atualizar gráfico na próxima animação
-                                pendingUpdates.add(() => {
-                                    chart.update('none');
-                                });
-                            }
-                        }
-                        
-                        // Atualizar tempo
-                        const timeElement = card.querySelector('.update-time');
-                        timeElement.textContent = 'agora';
-                        
-                        // Efeito visual
-                        if (typeof newValue === 'number') {
-                            const diff = newValue - prevValue;
-                            if (diff !== 0) {
-                                valueElement.classList.add('pulse');
-                                valueElement.classList.remove('text-success', 'text-danger');
-                                valueElement.classList.add(diff > 0 ? 'text-success' : 'text-danger');
-                                
-                                setTimeout(() => {
-                                    valueElement.classList.remove('pulse', 'text-success', 'text-danger');
-                                }, 1000);
-                            }
-                        }
-                    }
-                }
-                
-                // Agendar atualização de UI
-                scheduleUIUpdate();
-            });
-            
-            // Agendador de atualizações de UI
-            let pendingUpdates = new Set();
-            let updateScheduled = false;
-            
-            function scheduleUIUpdate() {
-                if (!updateScheduled) {
-                    updateScheduled = true;
-                    requestAnimationFrame(processUIUpdates);
-                }
-            }
-            
-            function processUIUpdates() {
-                // Executar todas as atualizações pendentes
-                pendingUpdates.forEach(update => update());
-                pendingUpdates.clear();
-                
-                updateScheduled = false;
-            }
-            
-            // Atualizar lista de tópicos recentes
-            function updateRecentTopics() {
-                const container = document.getElementById('recentTopics');
-                container.innerHTML = '';
-                
-                recentTopics.forEach(topic => {
-                    const badge = document.createElement('div');
-                    badge.className = 'topic-badge px-3 py-1.5 rounded-full cursor-pointer hover:bg-accent/25';
-                    badge.textContent = topic;
-                    badge.onclick = () => {
-                        document.getElementById('topicInput').value = topic;
-                    };
-                    container.appendChild(badge);
-                });
-            }
-            
-            // Obter ícone para o tópico
-            function getIconForTopic(topic) {
-                const topicLower = topic.toLowerCase();
-                if (topicLower.includes('temp') || topicLower.includes('temperatura')) {
-                    return 'fa-temperature-high';
-                } else if (topicLower.includes('umid') || topicLower.includes('humidity')) {
-                    return 'fa-droplet';
-                } else if (topicLower.includes('luz') || topicLower.includes('light')) {
-                    return 'fa-lightbulb';
-                } else if (topicLower.includes('press') || topicLower.includes('pressure')) {
-                    return 'fa-gauge-high';
-                } else if (topicLower.includes('gas') || topicLower.includes('fumaca') || topicLower.includes('smoke')) {
-                    return 'fa-smog';
-                } else if (topicLower.includes('door') || topicLower.includes('porta')) {
-                    return 'fa-door-open';
-                } else if (topicLower.includes('motion') || topicLower.includes('movimento')) {
-                    return 'fa-person-walking';
-                }
-                return 'fa-wave-square';
-            }
-            
-            // Criar gráfico otimizado
-            function createChart(canvas, initialData = []) {
-                const ctx = canvas.getContext('2d');
-                
-                // Criar gradient para o gráfico
-                const gradient = ctx.createLinearGradient(0, 0, 0, canvas.height);
-                gradient.addColorStop(0, 'rgba(65, 189, 245, 0.4)');
-                gradient.addColorStop(1, 'rgba(65, 189, 245, 0.05)');
-                
-                const data = {
-                    labels: Array(initialData.length).fill(''),
-                    datasets: [{
-                        label: 'Valor',
-                        data: initialData,
-                        borderColor: '#41BDF5',
-                        backgroundColor: gradient,
-                        borderWidth: 2,
-                        pointRadius: 0,
-                        tension: 0.4,
-                        fill: true
-                    }]
-                };
-                
-                return new Chart(ctx, {
-                    type: 'line',
-                    data: data,
-                    options: {
-                        responsive: true,
-                        maintainAspectRatio: false,
-                        plugins: {
-                            legend: { display: false },
-                            tooltip: { enabled: false }
-                        },
-                        scales: {
-                            x: { 
-                                display: false,
-                                grid: { display: false }
-                            },
-                            y: { 
-                                display: false,
-                                grid: { display: false },
-                                suggestedMin: Math.min(...initialData) - 1,
-                                suggestedMax: Math.max(...initialData) + 1
-                            }
-                        },
-                        interaction: { mode: null },
-                        animation: {
-                            duration: 0,
-                            easing: 'linear'
-                        },
-                        elements: {
-                            point: { radius: 0 }
-                        },
-                        hover: { mode: null }
-                    }
-                });
-            }
-            
-            // Adicionar card de sensor
-            async function addSensorCard() {
-                const topicInput = document.getElementById('topicInput');
-                const friendlyNameInput = document.getElementById('friendlyName');
-                const topic = topicInput.value.trim();
-                const friendlyName = friendlyNameInput.value.trim();
-                
-                if (!topic) {
-                    alert('Por favor, digite um tópico válido');
-                    return;
-                }
-                
-                if (sensorCards[topic]) {
-                    alert('Este sensor já está sendo monitorado');
-                    return;
-                }
-
-                // Salvar nome amigável se fornecido
-                if (friendlyName) {
-                    customNames[topic] = friendlyName;
-                    saveCustomNames();
-                    
-                    // Enviar para o servidor
-                    fetch('/update_name', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ topic, name: friendlyName })
-                    });
-                }
-
-                const icon = getIconForTopic(topic);
-                const cardId = `card-${Date.now()}`;
-                const displayName = friendlyName || customNames[topic] || topic;
-                
-                // Obter histórico do servidor
-                const historyResponse = await fetch(`/get_history?topic=${encodeURIComponent(topic)}`);
-                const historyData = await historyResponse.json();
-                const initialData = historyData.history.map(item => item[1]);
-                
-                const card = document.createElement('div');
-                card.id = cardId;
-                card.className = 'sensor-card';
-                card.innerHTML = `
-                    <div class="card-header flex justify-between items-start">
-                        <div class="flex items-center gap-3">
-                            <div class="w-10 h-10 rounded-lg bg-primary/20 flex items-center justify-center">
-                                <i class="${icon} text-lg text-primary"></i>
-                            </div>
-                            <div>
-                                <h2 class="font-semibold sensor-name" data-topic="${topic}">${displayName}</h2>
-                                <div class="topic-badge px-2 py-0.5 rounded-full inline-block text-xs mt-1">${topic}</div>
-                            </div>
-                        </div>
-                        <div class="flex gap-2">
-                            <button onclick="editName('${topic}')" class="text-gray-400 hover:text-primary">
-                                <i class="fas fa-edit"></i>
-                            </button>
-                            <button onclick="removeCard('${topic}', '${cardId}')" class="text-gray-400 hover:text-red-500">
-                                <i class="fas fa-times"></i>
-                            </button>
-                        </div>
-                    </div>
-                    
-                    <div class="p-5">
-                        <div class="text-3xl font-bold text-center mb-4 current-value">--</div>
-                        <div class="chart-container">
-                            <canvas id="chart-${cardId}"></canvas>
-                        </div>
-                    </div>
-                    
-                    <div class="px-5 py-3 bg-light flex justify-between items-center">
-                        <div class="text-sm text-gray-400">
-                            <i class="fas fa-clock mr-1"></i> Atualizado: <span class="update-time">--:--:--</span>
-                        </div>
-                        <div class="flex items-center">
-                            <span class="w-2 h-2 rounded-full bg-green-500 mr-2"></span>
-                            <span class="text-xs">Online</span>
-                        </div>
-                    </div>
-                `;
-                
-                document.getElementById('sensorCards').appendChild(card);
-                sensorCards[topic] = card;
-                
-                // Inicializar gráfico com os últimos 15 pontos
-                const canvas = card.querySelector(`#chart-${cardId}`);
-                if (canvas) {
-                    const lastValues = initialData.slice(-15);
-                    card.chart = createChart(canvas, lastValues);
-                }
-                
-                // Limpar inputs
-                topicInput.value = '';
-                friendlyNameInput.value = '';
-                checkEmptyState();
-            }
-            
-            // Editar nome
-            function editName(topic) {
-                const card = sensorCards[topic];
-                if (!card) return;
-                
-                const nameElement = card.querySelector('.sensor-name');
-                const currentName = nameElement.textContent;
-                
-                const newName = prompt('Digite o novo nome para este sensor:', currentName);
-                if (newName && newName.trim() !== currentName) {
-                    nameElement.textContent = newName.trim();
-                    customNames[topic] = newName.trim();
-                    saveCustomNames();
-                    
-                    // Enviar para o servidor
-                    fetch('/update_name', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ topic, name: newName.trim() })
-                    });
-                }
-            }
-            
-            // Remover card
-            function removeCard(topic, cardId) {
-                if (sensorCards[topic]) {
-                    const card = document.getElementById(cardId);
-                    if (card) {
-                        // Destruir gráfico antes de remover
-                        if (card.chart) {
-                            card.chart.destroy();
-                        }
-                        card.remove();
-                    }
-                    delete sensorCards[topic];
-                    checkEmptyState();
-                }
-            }
-            
-            // Inicializar estado vazio
-            checkEmptyState();
-        </script>
-    </body>
-    </html>
-    """
-    return html
+    return asset_response('index.html', 'no-cache')
+
+@app.route('/static/<path:filename>')
+def static_asset(filename):
+    cache_control = ASSET_CACHE_CONTROL if assets.built else 'no-cache'
+    return asset_response(filename, cache_control)
+
+def asset_response(name, cache_control):
+    asset = assets.get(name)
+    if asset is None:
+        return jsonify(error='Arquivo não encontrado'), 404
+    if asset.etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        encoding, body = asset.pick(lambda encoding: request.accept_encodings[encoding] > 0)
+        response = Response(body, mimetype=asset.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(asset.etag)
+    response.headers['Cache-Control'] = cache_control
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+# Registro de clientes e assinaturas, compartilhado pelos dois modos de servidor
+def register_client(sid, auth):
+    # Clientes podem pedir frames binários: io({ auth: { encoding: 'binary' } })
+    encoding = auth.get('encoding') if isinstance(auth, dict) else None
+    client_encoding[sid] = 'binary' if encoding == 'binary' else 'json'
+    client_queues.add(sid, client_encoding[sid], time.monotonic())
+
+def update_subscriptions(sid, added=(), removed=()):
+    # Muda os padrões do cliente e o move para o grupo do novo conjunto (a
+    # sala do Socket.IO fica a cargo do chamador, ver client_room). Retorna
+    # as definições de ID dos tópicos conhecidos dos padrões adicionados,
+    # para clientes binários.
+    encoding = client_encoding.get(sid, 'json')
+    with subscriptions_lock:
+        current = client_subscriptions.get(sid, set())
+        patterns = (current | set(added)) - set(removed)
+        changed = patterns != current
+        if changed:
+            new_patterns = False
+            for pattern in patterns - current:
+                new_patterns |= pattern not in subscriptions
+                subscriptions[pattern].add(sid)
+            for pattern in current - patterns:
+                subscribers = subscriptions[pattern]
+                subscribers.discard(sid)
+                if not subscribers:
+                    del subscriptions[pattern]
+                    new_patterns = True
+            if patterns:
+                client_subscriptions[sid] = patterns
+            else:
+                client_subscriptions.pop(sid, None)
+            move_group(sid, tuple(sorted(patterns)), encoding)
+            patterns_changed()
+    if changed:
+        if new_patterns:
+            sync_broker()
+        announce_subscriptions()
+    if encoding != 'binary':
+        return []
+    definitions = []
+    for pattern in added:
+        # Os demais workers enviam ao cliente as definições dos tópicos deles
+        if cluster is not None:
+            cluster.broadcast('describe', {'worker': WORKER_ID, 'sid': sid, 'pattern': pattern})
+        definitions += describe_topics(pattern)
+    return definitions
+
+def move_group(sid, group, encoding):
+    # Chamar com subscriptions_lock
+    old = client_groups.pop(sid, None)
+    if old is not None:
+        counts = group_encodings[old]
+        counts[encoding] -= 1
+        if not counts['binary']:
+            room_topic_ids.pop(old, None)
+        if not +counts:
+            del group_encodings[old]
+    if group:
+        client_groups[sid] = group
+        group_encodings[group][encoding] += 1
+
+# Últimos valores dos padrões assinados. Com cursores ({epoch: seq}, enviados
+# na reconexão), só os tópicos que mudaram depois deles; epoch desconhecido
+# (servidor reiniciado) recebe o snapshot completo.
+def snapshot_for(patterns, since):
+    resync = since is not None
+    since = since if isinstance(since, dict) else {}
+    full = latest_values.epoch not in since
+    seq, values = latest_values.snapshot(patterns, 0 if full else since[latest_values.epoch])
+    return {'epoch': latest_values.epoch, 'seq': seq, 'full': full, 'resync': resync, 'values': values}
+
+def request_snapshot(sid, patterns, since=None):
+    # No cluster, cada worker envia ao cliente o snapshot dos seus tópicos
+    if cluster is not None:
+        cluster.broadcast('snapshot', {'worker': WORKER_ID, 'sid': sid, 'patterns': patterns, 'since': since})
+    return snapshot_for(patterns, since)
+
+def unregister_client(sid):
+    update_subscriptions(sid, removed=client_patterns(sid))
+    client_encoding.pop(sid, None)
+    state = client_queues.remove(sid)
+    if state is not None and state.slow:
+        slow_clients.discard(sid)
+        slow_cursors.pop(sid, None)
+        if cluster is not None:
+            cluster.broadcast('client_mode', {'worker': WORKER_ID, 'sid': sid, 'slow': False, 'patterns': []})
 
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
     print("Cliente WebSocket conectado")
+    register_client(request.sid, auth)
+    emit('custom_names', {'names': names_store.get_many(), 'full': True})
+
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    sid = request.sid
+    patterns = [pattern for pattern in data.get('topics', []) if pattern]
+    room = client_room(sid)
+    definitions = update_subscriptions(sid, added=patterns)
+    switch_room(room, client_room(sid))
+    if definitions:
+        emit('topic_ids', definitions)
+    if patterns:
+        emit('snapshot', request_snapshot(sid, patterns, data.get('since')))
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    sid = request.sid
+    room = client_room(sid)
+    update_subscriptions(sid, removed=data.get('topics', []))
+    switch_room(room, client_room(sid))
+
+def switch_room(old, new):
+    # Entra na nova sala antes de sair da antiga: um batch no meio chega
+    # repetido (o cliente descarta pelo seq), mas nunca se perde
+    if new != old:
+        if new is not None:
+            join_room(new)
+        if old is not None:
+            leave_room(old)
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    unregister_client(request.sid)
+
+if SERVER_MODE == 'threading' and not IS_LAUNCHER:
+    start_threading_mode()
 
 if __name__ == '__main__':
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True, use_reloader=False)
+    port = HTTP_PORT + (WORKER_ID if cluster is not None else 0)
+    if IS_LAUNCHER:
+        run_workers()
+    elif SERVER_MODE == 'asyncio':
+        import uvicorn
+        # asgi.py faz "import app": sem isto o módulo rodaria de novo como
+        # "app", duplicando stores, cluster e handlers de atexit
+        sys.modules['app'] = sys.modules[__name__]
+        import asgi
+        uvicorn.run(asgi.application, host='0.0.0.0', port=port)
+    else:
+        socketio.run(app, host='0.0.0.0', port=port, debug=True, use_reloader=False)
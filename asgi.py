@@ -0,0 +1,180 @@
+# Modo asyncio: servidor Socket.IO ASGI + cliente MQTT assíncrono alimentando
+# um dispatcher asyncio. As rotas HTTP são as mesmas do Flask (via WSGI).
+#   BIFROST_SERVER_MODE=asyncio python app.py
+#   BIFROST_SERVER_MODE=asyncio uvicorn asgi:application
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import socketio
+from asgiref.wsgi import WsgiToAsgi
+
+import app as dashboard
+from cluster import AsyncBusManager
+
+try:
+    import aiomqtt
+except ImportError:
+    aiomqtt = None
+
+sio = socketio.AsyncServer(
+    async_mode='asgi',
+    client_manager=AsyncBusManager(dashboard.cluster.bus) if dashboard.cluster else None,
+)
+tasks = []
+dispatch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dispatch')
+
+
+@sio.event
+async def connect(sid, environ, auth=None):
+    print("Cliente WebSocket conectado")
+    dashboard.register_client(sid, auth)
+    await sio.emit('custom_names', {'names': dashboard.names_store.get_many(), 'full': True}, to=sid)
+
+
+@sio.event
+async def subscribe(sid, data):
+    patterns = [pattern for pattern in data.get('topics', []) if pattern]
+    room = dashboard.client_room(sid)
+    definitions = dashboard.update_subscriptions(sid, added=patterns)
+    await switch_room(sid, room, dashboard.client_room(sid))
+    if definitions:
+        await sio.emit('topic_ids', definitions, to=sid)
+    if patterns:
+        await sio.emit('snapshot', dashboard.request_snapshot(sid, patterns, data.get('since')), to=sid)
+
+
+@sio.event
+async def unsubscribe(sid, data):
+    room = dashboard.client_room(sid)
+    dashboard.update_subscriptions(sid, removed=data.get('topics', []))
+    await switch_room(sid, room, dashboard.client_room(sid))
+
+
+async def switch_room(sid, old, new):
+    # Como app.switch_room: entra na nova sala antes de sair da antiga
+    if new != old:
+        if new is not None:
+            await sio.enter_room(sid, new)
+        if old is not None:
+            await sio.leave_room(sid, old)
+
+
+@sio.event
+async def disconnect(sid, reason=None):
+    dashboard.unregister_client(sid)
+
+
+async def dispatch(ready):
+    # Mesmo batching do modo threading, acordado por evento em vez de
+    # Condition. Parser, histórico, alertas e codificação rodam numa thread
+    # própria (um único worker: o Batcher não é thread-safe); no loop ficam
+    # só os emits.
+    batcher = dashboard.Batcher()
+    loop = asyncio.get_running_loop()
+
+    def step():
+        # Drena todas as mensagens pendentes de uma vez
+        batcher.add(dashboard.message_queue.get(timeout=0))
+        if not batcher.due():
+            return None
+        batch, new_topics = batcher.take()
+        started = time.perf_counter()
+        return batch, started, list(dashboard.batch_payloads(batch, new_topics))
+
+    while True:
+        try:
+            if not dashboard.message_queue.qsize():
+                try:
+                    await asyncio.wait_for(ready.wait(), batcher.timeout())
+                except asyncio.TimeoutError:
+                    pass
+            ready.clear()
+            result = await loop.run_in_executor(dispatch_executor, step)
+            if result is not None:
+                batch, started, payloads = result
+                skip = list(dashboard.slow_clients) or None
+                for event, data, room in payloads:
+                    await sio.emit(event, data, to=room, skip_sid=skip)
+                dashboard.observe_batch(batch, started)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Erro no processamento de mensagens: {e}")
+
+
+async def mqtt_loop():
+    if dashboard.REPLAY_DIR:
+        threading.Thread(target=dashboard.run_replay, daemon=True).start()
+        return
+    if aiomqtt is None:
+        # Sem aiomqtt: paho em thread própria, entregando na mesma fila
+        print("aiomqtt não instalado; usando paho em thread para o MQTT")
+        threading.Thread(target=dashboard.run_mqtt, daemon=True).start()
+        return
+
+    attempt = 0
+    while True:
+        try:
+            async with aiomqtt.Client(dashboard.MQTT_BROKER, dashboard.MQTT_PORT, keepalive=60) as client:
+                print("Conectado ao MQTT Broker")
+                attempt = 0
+                # Assinaturas podem mudar de qualquer thread (ex.: barramento do cluster)
+                loop = asyncio.get_running_loop()
+                dashboard.broker_subscriptions.attach(
+                    lambda topic: asyncio.run_coroutine_threadsafe(client.subscribe(topic), loop),
+                    lambda topic: asyncio.run_coroutine_threadsafe(client.unsubscribe(topic), loop),
+                )
+                async for message in client.messages:
+                    dashboard.ingest_message(str(message.topic), message.payload)
+        except aiomqtt.MqttError as e:
+            dashboard.broker_subscriptions.detach()
+            delay = dashboard.reconnect_delay(attempt)
+            attempt += 1
+            print(f"Conexão MQTT perdida: {e}; reconectando em {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def startup():
+    dashboard.parser_pool.start()
+    dashboard.ingest_rate.start()
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    dashboard.message_queue.set_wakeup(lambda: loop.call_soon_threadsafe(ready.set))
+    dashboard.emit_to = lambda event, data, room=None, callback=None: asyncio.run_coroutine_threadsafe(
+        sio.emit(event, data, to=room, callback=callback, ignore_queue=callback is not None), loop)
+    if dashboard.cluster is not None:
+        dashboard.start_cluster()
+    dashboard.history_store.start()
+    dashboard.names_store.start()
+    dashboard.alert_history.start()
+    dashboard.liveness_history.start()
+    if dashboard.recorder is not None:
+        dashboard.recorder.start()
+    threading.Thread(target=dashboard.seed_topic_index, daemon=True).start()
+    threading.Thread(target=dashboard.run_liveness, daemon=True).start()
+    threading.Thread(target=dashboard.run_client_queues, daemon=True).start()
+    dashboard.start_warm_state()
+    tasks.append(asyncio.create_task(dispatch(ready)))
+    tasks.append(asyncio.create_task(mqtt_loop()))
+    if dashboard.MQTT_SUBSCRIBE_MODE == 'discovery':
+        threading.Thread(target=dashboard.run_discovery, daemon=True).start()
+
+
+async def shutdown():
+    for task in tasks:
+        task.cancel()
+    dashboard.client.loop_stop()
+    dashboard.history_store.close()
+    dashboard.names_store.close()
+    if dashboard.recorder is not None:
+        dashboard.recorder.close()
+
+
+application = socketio.ASGIApp(
+    sio,
+    other_asgi_app=WsgiToAsgi(dashboard.app),
+    on_startup=startup,
+    on_shutdown=shutdown,
+)
@@ -0,0 +1,217 @@
+# Front-end estático: build com nomes por hash de conteúdo e versões
+# pré-comprimidas (gzip/brotli), e o armazenamento usado pelo servidor.
+#   python assets.py --fetch   # baixa as dependências de frontend/vendor.json
+#   python assets.py           # gera static/ a partir de frontend/
+# O CSS é compilado pelo CLI do Tailwind (BIFROST_TAILWIND ou tailwindcss no
+# PATH). Sem static/index.html o servidor usa o modo de desenvolvimento:
+# fontes de frontend/ sem cache e dependências pelos CDNs.
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import subprocess
+import sys
+import urllib.request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(ROOT_DIR, 'frontend')
+BUILD_DIR = os.path.join(ROOT_DIR, 'static')
+VENDOR_FILE = os.path.join(SOURCE_DIR, 'vendor.json')
+TAILWIND_CONFIG = os.path.join(SOURCE_DIR, 'tailwind.config.js')
+TAILWIND_PLAY = 'https://cdn.tailwindcss.com'
+# Arquivos que não ganham com compressão
+COMPRESSED_TYPES = ('.woff2', '.woff', '.png', '.jpg', '.gif', '.ico')
+HASH_LENGTH = 12
+
+CSS_URL = re.compile(r'''url\((['"]?)([^)'"]+)\1\)''')
+# src/href e data-worker (script do Web Worker, ver app.js)
+HTML_REF = re.compile(r'''(src|href|data-worker)="([^"#?:]+)"''')
+SCRIPTS = ('app.js', 'sparklines.js', 'decoder.js')
+
+mimetypes.add_type('font/woff2', '.woff2')
+mimetypes.add_type('text/javascript', '.js')
+
+
+def load_vendor():
+    with open(VENDOR_FILE) as f:
+        return json.load(f)
+
+
+def fetch_vendor(force=False):
+    for path, url in load_vendor().items():
+        target = os.path.join(SOURCE_DIR, path)
+        if os.path.exists(target) and not force:
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        print(f"Baixando {url}")
+        with urllib.request.urlopen(url, timeout=60) as response:
+            data = response.read()
+        with open(target, 'wb') as f:
+            f.write(data)
+
+
+def compile_tailwind(source):
+    command = os.environ.get('BIFROST_TAILWIND') or shutil.which('tailwindcss')
+    if not command:
+        raise SystemExit("CLI do Tailwind não encontrado (defina BIFROST_TAILWIND ou instale tailwindcss)")
+    result = subprocess.run(
+        [command, '-c', TAILWIND_CONFIG, '-i', source, '--minify'],
+        check=True, capture_output=True, cwd=ROOT_DIR,
+    )
+    return result.stdout
+
+
+def content_name(path, data):
+    stem, ext = os.path.splitext(os.path.basename(path))
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def resolve(base, ref):
+    # Caminho de uma referência relativa, a partir do arquivo que a contém
+    return os.path.normpath(os.path.join(os.path.dirname(base), ref)).replace(os.sep, '/')
+
+
+def rewrite_css(path, data, manifest):
+    def replace(match):
+        target = manifest.get(resolve(path, match.group(2)))
+        if target is None:
+            return match.group(0)
+        return f"url({match.group(1)}{target}{match.group(1)})"
+    return CSS_URL.sub(replace, data.decode()).encode()
+
+
+def write_asset(name, data):
+    target = os.path.join(BUILD_DIR, name)
+    with open(target, 'wb') as f:
+        f.write(data)
+    if name.endswith(COMPRESSED_TYPES):
+        return
+    with open(target + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(target + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def build():
+    vendor = load_vendor()
+    missing = [path for path in vendor if not os.path.exists(os.path.join(SOURCE_DIR, path))]
+    if missing:
+        raise SystemExit(f"Dependências ausentes em {SOURCE_DIR}/ (rode com --fetch): {', '.join(missing)}")
+    if brotli is None:
+        print("Módulo brotli não instalado; gerando só versões gzip")
+
+    sources = {path: open(os.path.join(SOURCE_DIR, path), 'rb').read() for path in vendor}
+    sources['fonts.css'] = open(os.path.join(SOURCE_DIR, 'fonts.css'), 'rb').read()
+    sources['app.css'] = compile_tailwind(os.path.join(SOURCE_DIR, 'app.css'))
+    for path in SCRIPTS:
+        sources[path] = open(os.path.join(SOURCE_DIR, path), 'rb').read()
+
+    shutil.rmtree(BUILD_DIR, ignore_errors=True)
+    os.makedirs(BUILD_DIR)
+
+    # Arquivos referenciados antes de quem os referencia (fontes -> CSS)
+    manifest = {}
+    ordered = sorted(sources, key=lambda path: path.endswith('.css'))
+    for path in ordered:
+        data = sources[path]
+        if path.endswith('.css'):
+            data = rewrite_css(path, data, manifest)
+        name = content_name(path, data)
+        manifest[path] = name
+        write_asset(name, data)
+
+    with open(os.path.join(SOURCE_DIR, 'index.html')) as f:
+        html = f.read()
+    html = HTML_REF.sub(
+        lambda match: f'{match.group(1)}="/static/{manifest.get(match.group(2), match.group(2))}"', html)
+    write_asset('index.html', html.encode())
+    with open(os.path.join(BUILD_DIR, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=4)
+    print(f"{len(manifest) + 1} arquivos gerados em {BUILD_DIR}/")
+
+
+def dev_index():
+    # Página das fontes: dependências pelos CDNs e Tailwind compilado no navegador
+    vendor = load_vendor()
+    with open(os.path.join(SOURCE_DIR, 'index.html')) as f:
+        html = f.read()
+    with open(TAILWIND_CONFIG) as f:
+        config = f.read().replace('module.exports =', 'tailwind.config =')
+    html = html.replace(
+        '<link href="app.css" rel="stylesheet">',
+        f'<script src="{TAILWIND_PLAY}"></script>\n    <script>{config}</script>\n'
+        '    <link href="app.css" rel="stylesheet">')
+    return HTML_REF.sub(
+        lambda match: f'{match.group(1)}="{vendor.get(match.group(2)) or "/static/" + match.group(2)}"', html)
+
+
+class Asset:
+    __slots__ = ('data', 'encoded', 'etag', 'mimetype')
+
+    def __init__(self, name, data, encoded=None):
+        self.data = data
+        # Versões pré-comprimidas: {'br': bytes, 'gzip': bytes}
+        self.encoded = encoded or {}
+        self.etag = hashlib.sha1(data).hexdigest()
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    def pick(self, accepts):
+        # (codificação, corpo) conforme o que o cliente aceita
+        for encoding in ('br', 'gzip'):
+            if encoding in self.encoded and accepts(encoding):
+                return encoding, self.encoded[encoding]
+        return None, self.data
+
+
+class AssetStore:
+    # Com build: todos os arquivos de static/ em memória (nomes imutáveis).
+    # Sem build: lê as fontes a cada pedido (modo de desenvolvimento).
+    def __init__(self, build_dir=BUILD_DIR, source_dir=SOURCE_DIR):
+        self.build_dir = build_dir
+        self.source_dir = source_dir
+        self.assets = {}
+        self.built = os.path.exists(os.path.join(build_dir, 'index.html'))
+        if self.built:
+            self.load()
+        else:
+            print(f"Front-end sem build ({build_dir}/); servindo {source_dir}/ em modo de desenvolvimento")
+
+    def load(self):
+        for name in os.listdir(self.build_dir):
+            if name.endswith(('.gz', '.br')) or name == 'manifest.json':
+                continue
+            path = os.path.join(self.build_dir, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            encoded = {}
+            for suffix, encoding in (('.br', 'br'), ('.gz', 'gzip')):
+                if os.path.exists(path + suffix):
+                    with open(path + suffix, 'rb') as f:
+                        encoded[encoding] = f.read()
+            self.assets[name] = Asset(name, data, encoded)
+
+    def get(self, name):
+        if self.built:
+            return self.assets.get(name)
+        if name == 'index.html':
+            return Asset(name, dev_index().encode())
+        path = os.path.normpath(os.path.join(self.source_dir, name))
+        if not path.startswith(os.path.normpath(self.source_dir) + os.sep) or not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as f:
+            return Asset(name, f.read())
+
+
+if __name__ == '__main__':
+    if '--fetch' in sys.argv:
+        fetch_vendor(force='--force' in sys.argv)
+    build()
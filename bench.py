@@ -0,0 +1,283 @@
+# Benchmark offline de carga e latência: o app roda neste processo com o
+# paho substituído por um cliente falso, publicadores sintéticos geram
+# N tópicos x M Hz e clientes Socket.IO reais medem a latência fim a fim.
+#   python bench.py --topics 200 --rate 5 --clients 4 --duration 20 --output atual.json
+#   python bench.py ... --compare base.json
+# O payload de cada mensagem é o instante da publicação (time.time()), então
+# a latência medida no cliente vai da publicação até a entrega do batch.
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import urllib.request
+
+import paho.mqtt.client as mqtt
+
+# Métricas comparadas entre execuções (e se maior é melhor)
+COMPARED = (
+    ('ingest.throughput_per_s', True),
+    ('ingest.dropped', False),
+    ('latency.p50_ms', False),
+    ('latency.p99_ms', False),
+    ('memory.bytes_per_topic', False),
+    ('get_history.p50_ms', False),
+    ('get_history.p99_ms', False),
+    ('get_histories.p50_ms', False),
+)
+
+
+def fake_paho():
+    # Cliente MQTT falso: nenhuma conexão de rede, mensagens via on_message
+    mqtt.Client.connect = lambda self, *args, **kwargs: 0
+    mqtt.Client.connect_async = lambda self, *args, **kwargs: 0
+    mqtt.Client.loop_start = lambda self, *args, **kwargs: None
+    mqtt.Client.loop_stop = lambda self, *args, **kwargs: None
+    mqtt.Client.loop = lambda self, *args, **kwargs: time.sleep(1) or 0
+    mqtt.Client.subscribe = lambda self, *args, **kwargs: (0, 1)
+    mqtt.Client.unsubscribe = lambda self, *args, **kwargs: (0, 1)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summary_ms(values):
+    return {
+        'count': len(values),
+        'p50_ms': _ms(percentile(values, 0.5)),
+        'p99_ms': _ms(percentile(values, 0.99)),
+        'max_ms': _ms(max(values) if values else None),
+    }
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 3)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Publisher:
+    # Publica todos os tópicos a cada 1/rate s, com prazos fixos (sem deriva)
+    def __init__(self, dashboard, topics, rate):
+        self.dashboard = dashboard
+        self.topics = topics
+        self.interval = 1.0 / rate
+        self.published = 0
+        self.late_ticks = 0
+        self.stop = threading.Event()
+
+    def run(self):
+        on_message = self.dashboard.on_message
+        client = self.dashboard.client
+        deadline = time.perf_counter()
+        while not self.stop.is_set():
+            for topic in self.topics:
+                message = types.SimpleNamespace(topic=topic, payload=repr(time.time()).encode())
+                on_message(client, None, message)
+            self.published += len(self.topics)
+            deadline += self.interval
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.late_ticks += 1
+
+
+class BenchClient:
+    def __init__(self, url, patterns):
+        import socketio
+        self.latencies = []
+        self.entries = 0
+        self.sio = socketio.Client()
+        self.sio.on('mqtt_batch', self.on_batch)
+        self.sio.connect(url, transports=['websocket'], auth={'encoding': 'json'})
+        self.sio.emit('subscribe', {'topics': patterns})
+
+    def on_batch(self, batch):
+        now = time.time()
+        self.entries += len(batch)
+        self.latencies.extend(now - float(data['payload']) for _, data in batch)
+
+    def close(self):
+        self.sio.disconnect()
+
+
+def time_requests(url, count):
+    durations = []
+    for _ in range(count):
+        started = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='bifrost-bench-')
+    os.environ.setdefault('BIFROST_HISTORY_DIR', os.path.join(workdir, 'history_data'))
+    os.environ['BIFROST_SERVER_MODE'] = 'threading'
+    os.environ.pop('BIFROST_WORKERS', None)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(workdir)
+    fake_paho()
+    import app as dashboard
+
+    port = free_port()
+    threading.Thread(
+        target=lambda: dashboard.socketio.run(dashboard.app, host='127.0.0.1', port=port,
+                                              allow_unsafe_werkzeug=True, log_output=False),
+        daemon=True,
+    ).start()
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(50):
+        try:
+            urllib.request.urlopen(base_url + '/history_stats').read()
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    topics = [f'bench/{i // 100}/{i}' for i in range(args.topics)]
+    clients = [BenchClient(base_url, [args.pattern]) for _ in range(args.clients)]
+    time.sleep(0.5)
+
+    publishers = [Publisher(dashboard, topics[i::args.publishers], args.rate) for i in range(args.publishers)]
+    threads = [threading.Thread(target=publisher.run, daemon=True) for publisher in publishers]
+    queue = dashboard.message_queue
+    received_before = queue.received
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    for publisher in publishers:
+        publisher.stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    # Esperar o dispatcher esvaziar a fila e enviar o último batch
+    time.sleep(max(0.5, dashboard.BATCH_INTERVAL * 4))
+
+    sample = topics[:args.history_topics]
+    history_durations = []
+    for topic in sample:
+        history_durations += time_requests(f'{base_url}/get_history?topic={topic}', args.history_requests)
+    query = '&'.join(f'topic={topic}&since=0' for topic in sample)
+    histories_durations = time_requests(f'{base_url}/get_histories?{query}', args.history_requests)
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    for client in clients:
+        client.close()
+    published = sum(publisher.published for publisher in publishers)
+    received = queue.received - received_before
+    usage = dashboard.memory_usage(dashboard.sensor_history)
+    dashboard.history_store.close()
+
+    return {
+        'config': {
+            'topics': args.topics,
+            'rate_hz': args.rate,
+            'clients': args.clients,
+            'publishers': args.publishers,
+            'duration_s': args.duration,
+            'batch_interval_s': dashboard.BATCH_INTERVAL,
+            'ingest_policy': queue.policy,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'commit': git_commit(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'ingest': {
+            'published': published,
+            'received': received,
+            'throughput_per_s': round(received / elapsed, 1),
+            'target_per_s': args.topics * args.rate,
+            'late_ticks': sum(publisher.late_ticks for publisher in publishers),
+            'dropped': queue.dropped + queue.sampled,
+            'coalesced': queue.coalesced,
+        },
+        'latency': summary_ms(latencies),
+        'delivered_entries': sum(client.entries for client in clients),
+        'memory': {
+            'topics': usage['topics'],
+            'bytes_per_topic': round(usage['avg_bytes_per_topic'], 1),
+            'total_bytes': usage['total_bytes'],
+        },
+        'get_history': summary_ms(history_durations),
+        'get_histories': summary_ms(histories_durations),
+    }
+
+
+def lookup(result, path):
+    for key in path.split('.'):
+        result = result.get(key) if isinstance(result, dict) else None
+    return result
+
+
+def compare(result, baseline):
+    lines = []
+    if result.get('config') != baseline.get('config'):
+        lines.append(f"Atenção: configurações diferentes (base: {baseline.get('config')})")
+    lines.append(f"{'métrica':<28}{'base':>14}{'atual':>14}{'variação':>12}")
+    for path, higher_is_better in COMPARED:
+        old, new = lookup(baseline, path), lookup(result, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        better = change > 0 if higher_is_better else change < 0
+        flag = '' if abs(change) < 5 else (' melhor' if better else ' pior')
+        lines.append(f"{path:<28}{old:>14}{new:>14}{change:>+11.1f}%{flag}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de ingestão e latência do dashboard')
+    parser.add_argument('--topics', type=int, default=100, help='número de tópicos (N)')
+    parser.add_argument('--rate', type=float, default=5.0, help='mensagens por segundo por tópico (M Hz)')
+    parser.add_argument('--clients', type=int, default=2, help='clientes Socket.IO')
+    parser.add_argument('--pattern', default='bench/#', help='padrão assinado pelos clientes')
+    parser.add_argument('--publishers', type=int, default=1, help='threads publicadoras')
+    parser.add_argument('--duration', type=float, default=10.0, help='duração da carga em segundos')
+    parser.add_argument('--history-topics', type=int, default=10, help='tópicos consultados em /get_history')
+    parser.add_argument('--history-requests', type=int, default=20, help='requisições por tópico consultado')
+    parser.add_argument('--output', help='grava o resultado em JSON neste arquivo')
+    parser.add_argument('--compare', help='resultado JSON de uma execução anterior para comparar')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    result = run(args)
+    text = json.dumps(result, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    if baseline_path:
+        with open(baseline_path) as f:
+            print(compare(result, json.load(f)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+# Ritmo de envio por conexão WebSocket. Clientes rápidos recebem os batches
+# pelas salas do Socket.IO (um payload codificado por sala, a cada
+# BATCH_INTERVAL); uma sonda com ack a cada probe_interval mede o atraso de
+# cada conexão (fila de saída do servidor + rede + cliente). Quem passa de
+# slow_latency vira lento: sai dos envios por sala e passa a receber só o
+# último valor de cada tópico que mudou (a fila da conexão é um cursor no
+# LatestValues, então não cresce), um envio por vez, com ack, num intervalo
+# próprio que acompanha o tempo de ack. Quando os acks voltam a ser rápidos
+# no intervalo mínimo, o cliente volta para as salas.
+import threading
+
+
+class ClientState:
+    __slots__ = ('sid', 'encoding', 'slow', 'interval', 'rtt', 'acks', 'probe_sent', 'flush_sent',
+                 'last_send', 'fast_streak', 'probes', 'flushes', 'demotions', 'connected_at')
+
+    def __init__(self, sid, encoding, now):
+        self.sid = sid
+        self.encoding = encoding
+        self.slow = False
+        self.interval = None
+        self.rtt = None
+        self.acks = 0
+        self.probe_sent = None
+        self.flush_sent = None
+        self.last_send = now
+        self.fast_streak = 0
+        self.probes = 0
+        self.flushes = 0
+        self.demotions = 0
+        self.connected_at = now
+
+
+class ClientQueues:
+    def __init__(self, min_interval=0.05, max_interval=5.0, slow_latency=0.5, probe_interval=1.0,
+                 ack_timeout=10.0, recover_after=20):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.slow_latency = slow_latency
+        self.probe_interval = probe_interval
+        self.ack_timeout = ack_timeout
+        self.recover_after = recover_after
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    def add(self, sid, encoding, now):
+        with self.lock:
+            self.clients[sid] = ClientState(sid, encoding, now)
+
+    def remove(self, sid):
+        with self.lock:
+            return self.clients.pop(sid, None)
+
+    def poll(self, now):
+        # Ações devidas: ('probe', sid), ('demote', sid), ('flush', sid), ('promote', sid)
+        actions = []
+        with self.lock:
+            for client in self.clients.values():
+                if not client.slow:
+                    if client.probe_sent is not None:
+                        # Só clientes que já responderam a uma sonda podem ser
+                        # rebaixados (clientes sem ack ficam nas salas)
+                        if client.acks and now - client.probe_sent > self.slow_latency:
+                            client.slow = True
+                            client.demotions += 1
+                            client.fast_streak = 0
+                            client.interval = min(self.max_interval, max(self.min_interval, now - client.probe_sent))
+                            client.last_send = now
+                            actions.append(('demote', client.sid))
+                        elif now - client.probe_sent > self.ack_timeout:
+                            # Sonda sem ack (perdida, ou cliente que nunca
+                            # respondeu): sondar de novo
+                            client.probe_sent = client.last_send = now
+                            client.probes += 1
+                            actions.append(('probe', client.sid))
+                    elif now - client.last_send >= self.probe_interval:
+                        client.probe_sent = client.last_send = now
+                        client.probes += 1
+                        actions.append(('probe', client.sid))
+                    continue
+                if client.flush_sent is not None:
+                    if now - client.flush_sent < self.ack_timeout:
+                        continue
+                    # Ack perdido: liberar o próximo envio no ritmo mais lento
+                    client.flush_sent = None
+                    client.interval = self.max_interval
+                if now - client.last_send >= client.interval:
+                    if client.fast_streak >= self.recover_after:
+                        client.slow = False
+                        client.probe_sent = None
+                        client.interval = None
+                        actions.append(('promote', client.sid))
+                    else:
+                        actions.append(('flush', client.sid))
+        return actions
+
+    def flushed(self, sid, now, pending):
+        # pending: o envio espera ack antes do próximo
+        with self.lock:
+            client = self.clients.get(sid)
+            if client is None:
+                return
+            client.last_send = now
+            client.flushes += 1
+            if pending:
+                client.flush_sent = now
+            elif client.interval is not None and client.interval <= self.min_interval and \
+                    client.rtt is not None and client.rtt < self.slow_latency / 2:
+                # Nada a enviar: conta como intervalo saudável
+                client.fast_streak += 1
+
+    def _observe(self, client, rtt):
+        client.rtt = rtt if client.rtt is None else client.rtt + 0.2 * (rtt - client.rtt)
+        client.acks += 1
+
+    def probe_acked(self, sid, sent, now):
+        with self.lock:
+            client = self.clients.get(sid)
+            if client is None or client.probe_sent != sent:
+                return None
+            client.probe_sent = None
+            self._observe(client, now - sent)
+            return now - sent
+
+    def flush_acked(self, sid, sent, now):
+        with self.lock:
+            client = self.clients.get(sid)
+            if client is None or client.flush_sent != sent:
+                return None
+            client.flush_sent = None
+            rtt = now - sent
+            self._observe(client, rtt)
+            # Sobe direto ao dobro do ack quando o cliente não acompanha; desce
+            # pela metade a cada ack rápido
+            target = max(self.min_interval, 2 * rtt)
+            if target > client.interval:
+                client.interval = min(self.max_interval, target)
+            else:
+                client.interval = max(target, client.interval / 2)
+            if client.interval <= self.min_interval and client.rtt < self.slow_latency / 2:
+                client.fast_streak += 1
+            else:
+                client.fast_streak = 0
+            return rtt
+
+    def slow_count(self):
+        with self.lock:
+            return sum(1 for client in self.clients.values() if client.slow)
+
+    def describe(self, now):
+        with self.lock:
+            clients = list(self.clients.values())
+        return [{
+            'sid': client.sid,
+            'encoding': client.encoding,
+            'mode': 'slow' if client.slow else 'room',
+            'interval': client.interval if client.slow else self.min_interval,
+            'rtt': client.rtt,
+            'acks': client.acks,
+            'probes': client.probes,
+            'flushes': client.flushes,
+            'demotions': client.demotions,
+            'awaiting_ack': client.flush_sent is not None or client.probe_sent is not None,
+            'connected_for': now - client.connected_at,
+        } for client in clients]
@@ -0,0 +1,357 @@
+# Modo cluster: vários workers compartilham a ingestão (assinatura MQTT
+# compartilhada) e o fan-out do Socket.IO através de um barramento plugável.
+# Cada tópico tem um worker dono (hash do tópico), que guarda seu histórico.
+import asyncio
+import base64
+import itertools
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
+
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+FRAME_LENGTH = struct.Struct('>I')
+CONNECT_RETRIES = 50
+# Frames na fila de saída do SocketBus antes de publish_nowait recusar
+MAX_PENDING_FRAMES = 10000
+# Espera pela confirmação do hub a uma inscrição
+SUBSCRIBE_TIMEOUT = 5.0
+
+
+def _default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(value).decode()}
+    raise TypeError(f"Tipo não serializável no barramento: {type(value).__name__}")
+
+
+def _object_hook(value):
+    if '__bytes__' in value and len(value) == 1:
+        return base64.b64decode(value['__bytes__'])
+    return value
+
+
+def encode_message(message):
+    return json.dumps(message, default=_default).encode()
+
+
+def decode_message(data):
+    return json.loads(data, object_hook=_object_hook)
+
+
+class LocalBus:
+    # Barramento em processo: entrega síncrona aos inscritos (testes, vários
+    # workers no mesmo processo). Mensagens passam por JSON como nos outros.
+    def __init__(self):
+        self.handlers = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel, handler):
+        with self.lock:
+            self.handlers[channel].append(handler)
+
+    def publish(self, channel, message):
+        data = encode_message(message)
+        with self.lock:
+            handlers = list(self.handlers.get(channel, ()))
+        for handler in handlers:
+            handler(decode_message(data))
+
+    def publish_nowait(self, channel, message):
+        self.publish(channel, message)
+        return True
+
+    def close(self):
+        with self.lock:
+            self.handlers.clear()
+
+
+def _send_frame(sock, payload):
+    sock.sendall(FRAME_LENGTH.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Conexão do barramento encerrada")
+        data += chunk
+    return bytes(data)
+
+
+def _recv_frame(sock):
+    length = FRAME_LENGTH.unpack(_recv_exact(sock, FRAME_LENGTH.size))[0]
+    return _recv_exact(sock, length)
+
+
+class BusHub:
+    # Hub do barramento por socket local: repassa cada publicação aos
+    # workers inscritos no canal e confirma cada inscrição (frame 'A') depois
+    # de registrá-la
+    def __init__(self, host, port):
+        self.server = socket.create_server((host, port))
+        self.subscribers = defaultdict(set)
+        self.send_locks = {}
+        self.lock = threading.Lock()
+
+    def serve_forever(self):
+        while True:
+            conn, _ = self.server.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.send_locks[conn] = threading.Lock()
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        try:
+            while True:
+                frame = _recv_frame(conn)
+                op, channel, payload = frame[:1], *frame[1:].split(b'\n', 1)
+                channel = channel.decode()
+                if op == b'S':
+                    with self.lock:
+                        self.subscribers[channel].add(conn)
+                    with self.send_locks[conn]:
+                        _send_frame(conn, b'A' + channel.encode() + b'\n')
+                elif op == b'P':
+                    with self.lock:
+                        targets = list(self.subscribers.get(channel, ()))
+                    for target in targets:
+                        try:
+                            with self.send_locks[target]:
+                                _send_frame(target, b'M' + channel.encode() + b'\n' + payload)
+                        except (OSError, KeyError):
+                            pass
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self.lock:
+                for conns in self.subscribers.values():
+                    conns.discard(conn)
+            self.send_locks.pop(conn, None)
+            conn.close()
+
+
+class SocketBus:
+    # Barramento por socket local (tcp://host:porta). O worker que não
+    # encontrar o hub e puder iniciá-lo sobe um BusHub em thread.
+    # Só a thread de escrita usa sendall: publicações entram numa fila
+    # limitada (publish espera vaga, publish_nowait recusa se cheia).
+    def __init__(self, address, start_hub=False, max_pending=MAX_PENDING_FRAMES):
+        host, port = address.replace('tcp://', '').rsplit(':', 1)
+        self.address = (host, int(port))
+        self.handlers = defaultdict(list)
+        # Inscrições esperando a confirmação do hub, por canal (em ordem)
+        self.acks = defaultdict(list)
+        self.acks_lock = threading.Lock()
+        self.outgoing = queue.Queue(max_pending)
+        self.error = None
+        self.sock = self._connect(start_hub)
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        threading.Thread(target=self._write_loop, daemon=True).start()
+
+    def _connect(self, start_hub):
+        for attempt in range(CONNECT_RETRIES):
+            try:
+                sock = socket.create_connection(self.address)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                return sock
+            except ConnectionRefusedError:
+                if start_hub and attempt == 0:
+                    hub = BusHub(*self.address)
+                    threading.Thread(target=hub.serve_forever, daemon=True).start()
+                    continue
+                time.sleep(0.1 * (attempt + 1))
+        raise ConnectionError(f"Hub do barramento indisponível em {self.address}")
+
+    def subscribe(self, channel, handler):
+        # Só retorna com a inscrição registrada no hub: publicações feitas
+        # depois disso, por qualquer worker, já chegam a este handler.
+        # Não chamar de dentro de um handler (a confirmação vem pela mesma
+        # thread de leitura).
+        self.handlers[channel].append(handler)
+        acked = threading.Event()
+        with self.acks_lock:
+            self.acks[channel].append(acked)
+        self._enqueue(b'S' + channel.encode() + b'\n', True)
+        if not acked.wait(SUBSCRIBE_TIMEOUT):
+            raise ConnectionError(f"Hub do barramento não confirmou a inscrição em {channel}")
+
+    def publish(self, channel, message):
+        self._enqueue(b'P' + channel.encode() + b'\n' + encode_message(message), True)
+
+    def publish_nowait(self, channel, message):
+        # Para a ingestão: nunca espera o socket; False se a fila está cheia
+        return self._enqueue(b'P' + channel.encode() + b'\n' + encode_message(message), False)
+
+    def _enqueue(self, frame, block):
+        while True:
+            if self.error is not None:
+                raise ConnectionError(f"Barramento desconectado: {self.error}")
+            try:
+                self.outgoing.put(frame, block, 1.0)
+                return True
+            except queue.Full:
+                if not block:
+                    return False
+
+    def _write_loop(self):
+        # Junta os frames pendentes num único sendall
+        try:
+            while True:
+                frames = [self.outgoing.get()]
+                while len(frames) < 256:
+                    try:
+                        frames.append(self.outgoing.get_nowait())
+                    except queue.Empty:
+                        break
+                self.sock.sendall(b''.join(FRAME_LENGTH.pack(len(frame)) + frame for frame in frames))
+        except OSError as e:
+            self.error = e
+
+    def _read_loop(self):
+        try:
+            while True:
+                frame = _recv_frame(self.sock)
+                channel, payload = frame[1:].split(b'\n', 1)
+                if frame[:1] == b'A':
+                    with self.acks_lock:
+                        self.acks[channel.decode()].pop(0).set()
+                    continue
+                message = decode_message(payload)
+                for handler in list(self.handlers.get(channel.decode(), ())):
+                    try:
+                        handler(message)
+                    except Exception as e:
+                        print(f"Erro no handler do barramento ({channel.decode()}): {e}")
+        except (ConnectionError, OSError) as e:
+            print(f"Barramento desconectado: {e}")
+
+    def close(self):
+        self.sock.close()
+
+
+def make_bus(address, start_hub=False):
+    if address == 'local':
+        return LocalBus()
+    if address.startswith('tcp://'):
+        return SocketBus(address, start_hub=start_hub)
+    raise ValueError(f"Barramento não suportado: {address}")
+
+
+class BusManager(socketio.PubSubManager):
+    # Fan-out do Socket.IO (modo threading) pelo barramento do cluster
+    name = 'bifrost-bus'
+
+    def __init__(self, bus, channel='socketio'):
+        super().__init__(channel=channel)
+        self.bus = bus
+        self.messages = queue.Queue()
+        bus.subscribe(channel, self.messages.put)
+
+    def _publish(self, data):
+        self.bus.publish(self.channel, data)
+
+    def _listen(self):
+        while True:
+            yield self.messages.get()
+
+
+class AsyncBusManager(AsyncPubSubManager):
+    # Fan-out do Socket.IO (modo asyncio) pelo barramento do cluster
+    name = 'bifrost-bus'
+
+    def __init__(self, bus, channel='socketio'):
+        super().__init__(channel=channel)
+        self.bus = bus
+        self.messages = queue.Queue()
+        bus.subscribe(channel, self.messages.put)
+
+    async def _publish(self, data):
+        self.bus.publish(self.channel, data)
+
+    async def _listen(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            yield await loop.run_in_executor(None, self.messages.get)
+
+
+class Cluster:
+    def __init__(self, worker_id, worker_count, bus, rpc_timeout=5.0):
+        self.worker_id = worker_id
+        self.worker_count = worker_count
+        self.bus = bus
+        self.rpc_timeout = rpc_timeout
+        self.handlers = {}
+        self.pending = {}
+        self.ids = itertools.count()
+        self.node = uuid.uuid4().hex
+        bus.subscribe(f'rpc.{worker_id}', self._handle_request)
+        bus.subscribe(f'reply.{self.node}', self._handle_reply)
+
+    def owner(self, topic):
+        return zlib.crc32(topic.encode()) % self.worker_count
+
+    def owns(self, topic):
+        return self.owner(topic) == self.worker_id
+
+    def on(self, channel, handler):
+        # Mensagens de difusão (ex.: estado de assinaturas) para todos os workers
+        self.bus.subscribe(channel, handler)
+
+    def broadcast(self, channel, message):
+        self.bus.publish(channel, message)
+
+    def send(self, worker, channel, message):
+        self.bus.publish(f'{channel}.{worker}', message)
+
+    def forward(self, worker, channel, message):
+        # Como send, mas sem bloquear (thread de rede do MQTT, dispatcher):
+        # False se o barramento não tem vaga
+        return self.bus.publish_nowait(f'{channel}.{worker}', message)
+
+    def handle(self, method, handler):
+        self.handlers[method] = handler
+
+    def call(self, worker, method, params):
+        # Chamada síncrona a outro worker; levanta TimeoutError sem resposta
+        if worker == self.worker_id:
+            return self.handlers[method](params)
+        request_id = next(self.ids)
+        waiter = self.pending[request_id] = [threading.Event(), None, None]
+        try:
+            self.bus.publish(f'rpc.{worker}', {
+                'id': request_id, 'reply_to': self.node, 'method': method, 'params': params,
+            })
+            if not waiter[0].wait(self.rpc_timeout):
+                raise TimeoutError(f"Worker {worker} não respondeu a {method}")
+        finally:
+            self.pending.pop(request_id, None)
+        if waiter[2] is not None:
+            raise RuntimeError(waiter[2])
+        return waiter[1]
+
+    def _handle_request(self, message):
+        # Atender fora da thread de leitura do barramento (pode fazer I/O)
+        threading.Thread(target=self._answer, args=(message,), daemon=True).start()
+
+    def _answer(self, message):
+        reply = {'id': message['id'], 'result': None, 'error': None}
+        try:
+            reply['result'] = self.handlers[message['method']](message['params'])
+        except Exception as e:
+            reply['error'] = f"{type(e).__name__}: {e}"
+        self.bus.publish(f"reply.{message['reply_to']}", reply)
+
+    def _handle_reply(self, message):
+        waiter = self.pending.get(message['id'])
+        if waiter is not None:
+            waiter[1] = message['result']
+            waiter[2] = message['error']
+            waiter[0].set()
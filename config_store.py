@@ -0,0 +1,106 @@
+# Armazenamento de configuração chave -> valor em arquivo JSON, com escrita
+# em segundo plano (write-behind): alterações são agrupadas por um pequeno
+# atraso e gravadas atomicamente (arquivo temporário + rename)
+import json
+import os
+import threading
+import time
+
+
+class ConfigStore:
+    def __init__(self, path, delay=0.5, persist=True):
+        self.path = path
+        self.delay = delay
+        # No cluster, só um worker grava o arquivo; os demais só leem
+        self.persist = persist
+        self.data = {}
+        self.version = 0
+        self.saved_version = 0
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.dirty = threading.Event()
+        self.closed = False
+        self.thread = None
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Erro ao carregar {self.path}: {e}")
+            return
+        with self.lock:
+            self.data = data
+
+    def start(self):
+        if self.persist and self.thread is None:
+            self.thread = threading.Thread(target=self._write_loop, daemon=True)
+            self.thread.start()
+
+    def get(self, key, default=None):
+        with self.lock:
+            return self.data.get(key, default)
+
+    def get_many(self, keys=None):
+        with self.lock:
+            if keys is None:
+                return dict(self.data)
+            return {key: self.data[key] for key in keys if key in self.data}
+
+    def set(self, key, value):
+        return self.set_many({key: value})
+
+    def set_many(self, values):
+        # Valores vazios removem a chave; retorna só o que mudou
+        changed = {}
+        with self.lock:
+            for key, value in values.items():
+                if value in (None, ''):
+                    if key in self.data:
+                        del self.data[key]
+                        changed[key] = None
+                elif self.data.get(key) != value:
+                    self.data[key] = value
+                    changed[key] = value
+            if changed:
+                self.version += 1
+        if changed and self.persist:
+            self.dirty.set()
+        return changed
+
+    def _write_loop(self):
+        while not self.closed:
+            self.dirty.wait()
+            if self.closed:
+                break
+            # Agrupar alterações em sequência numa única gravação
+            self.dirty.clear()
+            time.sleep(self.delay)
+            self.flush()
+
+    def flush(self):
+        with self.write_lock:
+            with self.lock:
+                if self.version == self.saved_version:
+                    return
+                version = self.version
+                data = json.dumps(self.data, ensure_ascii=False, indent=4)
+            tmp_path = self.path + '.tmp'
+            try:
+                with open(tmp_path, 'w') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                self.saved_version = version
+            except Exception as e:
+                print(f"Erro ao salvar {self.path}: {e}")
+
+    def close(self):
+        self.closed = True
+        self.dirty.set()
+        if self.persist:
+            self.flush()
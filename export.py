@@ -0,0 +1,142 @@
+# Exportação do histórico em streaming: as linhas (tópico, timestamp, valor)
+# chegam de um gerador e saem em blocos de bytes de ~chunk_size, então a
+# memória usada não depende do tamanho do intervalo exportado.
+#   csv      topic,timestamp,value
+#   ndjson   {"topic": ..., "timestamp": ..., "value": ...} por linha
+#   parquet  colunas topic, timestamp, value (números) e text (payloads de
+#            texto), um row group por bloco; requer pyarrow
+import csv
+import io
+import json
+import math
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+CHUNK_SIZE = 64 * 1024
+PARQUET_ROW_GROUP = 65536
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def available(fmt):
+    return fmt in FORMATS and (fmt != 'parquet' or pyarrow is not None)
+
+
+def csv_chunks(rows, chunk_size=CHUNK_SIZE):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator='\n')
+    writer.writerow(('topic', 'timestamp', 'value'))
+    for topic, ts, value in rows:
+        writer.writerow((topic, ts, value))
+        if buf.tell() >= chunk_size:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode()
+
+
+def ndjson_chunks(rows, chunk_size=CHUNK_SIZE):
+    lines = []
+    size = 0
+    for topic, ts, value in rows:
+        # NaN/Infinity não existem em JSON: valores não finitos saem como null
+        if isinstance(value, float) and not math.isfinite(value):
+            value = None
+        line = json.dumps({'topic': topic, 'timestamp': ts, 'value': value},
+                          ensure_ascii=False, allow_nan=False) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield ''.join(lines).encode()
+            lines = []
+            size = 0
+    if lines:
+        yield ''.join(lines).encode()
+
+
+class _Sink:
+    # Arquivo só de escrita para o ParquetWriter: os bytes gravados ficam
+    # aqui até o gerador repassá-los
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def parquet_chunks(rows, row_group=PARQUET_ROW_GROUP):
+    schema = pyarrow.schema([
+        ('topic', pyarrow.string()),
+        ('timestamp', pyarrow.float64()),
+        ('value', pyarrow.float64()),
+        ('text', pyarrow.string()),
+    ])
+    sink = _Sink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression='zstd')
+    columns = ([], [], [], [])
+
+    def write_group():
+        topics, timestamps, values, texts = columns
+        writer.write_table(pyarrow.Table.from_arrays([
+            pyarrow.array(topics, pyarrow.string()),
+            pyarrow.array(timestamps, pyarrow.float64()),
+            pyarrow.array(values, pyarrow.float64()),
+            pyarrow.array(texts, pyarrow.string()),
+        ], schema=schema))
+        for column in columns:
+            column.clear()
+
+    for topic, ts, value in rows:
+        columns[0].append(topic)
+        columns[1].append(ts)
+        if isinstance(value, str):
+            columns[2].append(None)
+            columns[3].append(value)
+        else:
+            columns[2].append(value)
+            columns[3].append(None)
+        if len(columns[0]) >= row_group:
+            write_group()
+            yield sink.take()
+    if columns[0]:
+        write_group()
+    writer.close()
+    yield sink.take()
+
+
+WRITERS = {
+    'csv': csv_chunks,
+    'ndjson': ndjson_chunks,
+    'parquet': parquet_chunks,
+}
+
+
+def export_chunks(rows, fmt):
+    return WRITERS[fmt](rows)
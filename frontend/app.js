@@ -0,0 +1,722 @@
+// JSON por padrão; ?encoding=binary ativa os frames binários (wire.py)
+const wireEncoding = new URLSearchParams(location.search).get('encoding') === 'binary' ? 'binary' : 'json';
+const socket = io({ transports: ['websocket'], auth: { encoding: wireEncoding } });
+// Frames binários são decodificados num Web Worker (decoder.js)
+const decoder = new Worker(document.currentScript.dataset.worker);
+decoder.onmessage = ({ data }) => applyEntries(data.entries);
+// Mini-gráficos de todos os cards num único renderizador (sparklines.js)
+const sparklines = new SparklineRenderer(15);
+const sensorCards = {};
+const customNames = {};
+let messageCount = 0;
+let lastMessageUpdate = Date.now();
+
+// Carregar nomes personalizados do localStorage (cópia local até o
+// servidor enviar a lista ao conectar)
+function loadCustomNames() {
+    const savedNames = localStorage.getItem('customNames');
+    if (savedNames) {
+        try {
+            Object.assign(customNames, JSON.parse(savedNames));
+        } catch (e) {
+            console.error('Error loading custom names:', e);
+        }
+    }
+}
+
+// Salvar nomes personalizados no localStorage
+function saveCustomNames() {
+    localStorage.setItem('customNames', JSON.stringify(customNames));
+}
+
+// Inicializar
+loadCustomNames();
+
+// Atualizar estado vazio
+function checkEmptyState() {
+    const emptyState = document.getElementById('emptyState');
+    if (Object.keys(sensorCards).length > 0) {
+        emptyState.classList.add('hidden');
+    } else {
+        emptyState.classList.remove('hidden');
+    }
+}
+
+// Cursores dos snapshots de últimos valores ({epoch do servidor: seq})
+const snapshotCursors = {};
+
+// Reassinar os tópicos dos cards ao (re)conectar
+let hasConnected = false;
+socket.on('connect', () => {
+    // IDs de tópico valem por conexão; o servidor os reenvia ao assinar
+    decoder.postMessage({ type: 'reset' });
+    const topics = Object.keys(sensorCards);
+    if (topics.length > 0) {
+        // Na reconexão, enviar os cursores para receber só o que mudou
+        socket.emit('subscribe', hasConnected ? { topics, since: snapshotCursors } : { topics });
+        // Transições perdidas enquanto desconectado
+        if (hasConnected) {
+            refreshLiveness(topics);
+        }
+    }
+    hasConnected = true;
+});
+
+// Últimos valores dos tópicos assinados (um snapshot por servidor/worker)
+socket.on('snapshot', ({ epoch, seq, full, resync, values }) => {
+    snapshotCursors[epoch] = seq;
+    const missed = [];
+    for (const [topic, payload, timestamp, topicSeq] of values) {
+        if (resync && full) {
+            patternSeqs.delete(topic);
+        }
+        const card = sensorCards[topic];
+        if (!card || card.pattern) continue;
+        if (resync) {
+            // Servidor reiniciado: os seqs antigos não valem mais
+            if (full) {
+                card.seq = 0;
+            }
+            if (topicSeq > card.seq) {
+                missed.push(topic);
+            }
+        } else if (topicSeq < card.seq) {
+            continue;
+        }
+        showLatestValue(card, payload, timestamp);
+    }
+    // Cards de padrão: o valor mais recente entre os tópicos que casam
+    for (const [topic, payload, timestamp] of values) {
+        for (const card of patternCardsFor(topic)) {
+            if (!(card.latestTimestamp > timestamp)) {
+                card.latestTimestamp = timestamp;
+                showLatestValue(card, payload, timestamp);
+            }
+        }
+    }
+    // Completar os gráficos só dos tópicos que mudaram
+    if (missed.length > 0) {
+        fillMissedHistory(missed);
+    }
+});
+
+function showLatestValue(card, payload, timestamp) {
+    card.valueElement.textContent = payload;
+    card.timeElement.textContent = new Date(timestamp * 1000).toLocaleTimeString();
+}
+
+// Nomes personalizados do servidor: lista completa ao conectar,
+// depois só as alterações (nome null = removido)
+socket.on('custom_names', ({ names, full }) => {
+    if (full) {
+        for (const topic of Object.keys(customNames)) {
+            if (!(topic in names)) {
+                delete customNames[topic];
+            }
+        }
+    }
+    for (const [topic, name] of Object.entries(names)) {
+        if (name === null) {
+            delete customNames[topic];
+        } else {
+            customNames[topic] = name;
+        }
+    }
+    saveCustomNames();
+    for (const [topic, card] of Object.entries(sensorCards)) {
+        card.nameElement.textContent = customNames[topic] || topic;
+    }
+});
+
+// Novos tópicos vistos pelo servidor
+socket.on('new_topics', () => {
+    topicList.topicsChanged();
+});
+
+// Alertas das regras do servidor (alerts.py), um evento por lote: destaque
+// no card enquanto alguma regra estiver disparada e aviso temporário no
+// canto da tela
+socket.on('alerts', (alerts) => {
+    for (const alert of alerts) {
+        const card = sensorCards[alert.topic];
+        if (card) {
+            card.firingAlerts = card.firingAlerts || new Set();
+            if (alert.state === 'firing') {
+                card.firingAlerts.add(alert.rule);
+            } else {
+                card.firingAlerts.delete(alert.rule);
+            }
+            card.classList.toggle('sensor-alert', card.firingAlerts.size > 0);
+        }
+        showAlertToast(alert);
+    }
+});
+
+// Tópicos parados (liveness.py): transições online/offline a cada tick
+socket.on('liveness', (events) => {
+    for (const event of events) {
+        const card = sensorCards[event.topic];
+        if (card) {
+            setLiveness(card, event.state);
+        }
+    }
+});
+
+function setLiveness(card, state) {
+    const online = state === 'online';
+    card.livenessDot.classList.toggle('bg-green-500', online);
+    card.livenessDot.classList.toggle('bg-red-500', state === 'offline');
+    card.livenessDot.classList.toggle('bg-gray-500', !state);
+    card.livenessLabel.textContent = online ? 'Online' : state === 'offline' ? 'Offline' : '--';
+    card.classList.toggle('sensor-offline', state === 'offline');
+}
+
+// Estado atual dos cards (ao criar e ao reconectar)
+async function refreshLiveness(topics) {
+    const params = new URLSearchParams();
+    for (const topic of topics) {
+        params.append('topic', topic);
+    }
+    try {
+        const response = await fetch(`/liveness?${params}`);
+        const data = await response.json();
+        for (const item of data.topics) {
+            const card = sensorCards[item.topic];
+            if (card) {
+                setLiveness(card, item.state);
+            }
+        }
+    } catch (e) {
+        console.error('Error loading liveness:', e);
+    }
+}
+
+function showAlertToast(alert) {
+    const toast = document.createElement('div');
+    const firing = alert.state === 'firing';
+    toast.className = `alert-toast ${firing ? `alert-${alert.severity}` : 'alert-resolved'}`;
+    const title = document.createElement('div');
+    title.className = 'font-semibold';
+    title.textContent = `${firing ? '⚠' : '✓'} ${alert.rule}`;
+    const detail = document.createElement('div');
+    detail.className = 'text-sm text-gray-300';
+    detail.textContent = `${customNames[alert.topic] || alert.topic}: ${alert.message}`;
+    toast.append(title, detail);
+    document.getElementById('alertToasts').appendChild(toast);
+    setTimeout(() => toast.remove(), 8000);
+}
+
+// Dicionário de IDs de tópico do formato binário
+socket.on('topic_ids', (definitions) => {
+    decoder.postMessage({ type: 'topic_ids', definitions });
+});
+
+// Processar mensagens em batch: frames binários vão para o worker, que
+// devolve as entradas decodificadas; em JSON são aplicadas direto. Envios
+// com ack (conexão em ritmo próprio, ver clients.py) são confirmados depois
+// de aplicados: o servidor ajusta o intervalo pelo tempo de ack.
+socket.on('mqtt_batch', (frame, ack) => {
+    if (frame instanceof ArrayBuffer) {
+        decoder.postMessage({ type: 'frame', buffer: frame }, [frame]);
+    } else {
+        for (const [topic, data] of frame) {
+            applyEntry(topic, data.payload, data.seq);
+        }
+        batchApplied(frame.length);
+    }
+    if (ack) ack();
+});
+
+// Sonda de atraso da conexão: responder assim que chegar
+socket.on('probe', (sent, ack) => {
+    if (ack) ack();
+});
+
+// Entradas [tópico, payload, timestamp, seq] decodificadas pelo worker
+function applyEntries(entries) {
+    for (const [topic, payload, , seq] of entries) {
+        applyEntry(topic, payload, seq);
+    }
+    batchApplied(entries.length);
+}
+
+// Último valor de cada card, exibido no próximo quadro de animação
+const pendingValues = new Map();
+
+// Entradas com seq já visto (repetidas na troca de sala ao assinar ou já
+// presentes no histórico inicial do card) são descartadas
+function applyEntry(topic, payload, seq) {
+    const card = sensorCards[topic];
+    if (card && seq > card.seq) {
+        card.seq = seq;
+        pushValue(card, payload);
+    }
+    if (patternCards.size > 0 && seq > (patternSeqs.get(topic) || 0)) {
+        patternSeqs.set(topic, seq);
+        for (const patternCard of patternCardsFor(topic)) {
+            pushValue(patternCard, payload);
+        }
+    }
+}
+
+function pushValue(card, payload) {
+    card.sparkline.push(typeof payload === 'number' ? payload : parseFloat(payload));
+    pendingValues.set(card, payload);
+}
+
+// Cards de padrões MQTT (+ e #): recebem as entradas de todos os tópicos
+// que casam; o último seq de cada tópico entregue a eles fica em patternSeqs
+const patternCards = new Map();
+const patternMatches = new Map();
+const patternSeqs = new Map();
+
+function isPattern(topic) {
+    return topic.includes('+') || topic.includes('#');
+}
+
+// Mesmas regras do TopicTrie do servidor (curingas no primeiro nível não
+// casam com tópicos $...)
+function topicMatches(pattern, topic) {
+    const patternLevels = pattern.split('/');
+    const topicLevels = topic.split('/');
+    if (topic.startsWith('$') && (patternLevels[0] === '+' || patternLevels[0] === '#')) {
+        return false;
+    }
+    for (let i = 0; i < patternLevels.length; i++) {
+        if (patternLevels[i] === '#') return true;
+        if (i >= topicLevels.length) return false;
+        if (patternLevels[i] !== '+' && patternLevels[i] !== topicLevels[i]) return false;
+    }
+    return patternLevels.length === topicLevels.length;
+}
+
+function patternCardsFor(topic) {
+    let cards = patternMatches.get(topic);
+    if (cards === undefined) {
+        cards = [];
+        for (const [pattern, card] of patternCards) {
+            if (topicMatches(pattern, topic)) {
+                cards.push(card);
+            }
+        }
+        patternMatches.set(topic, cards);
+    }
+    return cards;
+}
+
+function batchApplied(count) {
+    messageCount += count;
+
+    // Atualizar taxa de mensagens a cada segundo
+    const now = Date.now();
+    if (now - lastMessageUpdate > 1000) {
+        document.getElementById('messageRate').textContent = messageCount;
+        messageCount = 0;
+        lastMessageUpdate = now;
+    }
+    scheduleUIUpdate();
+}
+
+// Atualizar valor do card com efeito visual
+function renderValue(card, payload) {
+    const valueElement = card.valueElement;
+    const newValue = typeof payload === 'number' ? payload : parseFloat(payload);
+    valueElement.textContent = payload;
+    card.timeElement.textContent = 'agora';
+
+    if (Number.isFinite(newValue)) {
+        const diff = newValue - card.lastNumber;
+        card.lastNumber = newValue;
+        if (diff !== 0) {
+            valueElement.classList.add('pulse');
+            valueElement.classList.remove('text-success', 'text-danger');
+            valueElement.classList.add(diff > 0 ? 'text-success' : 'text-danger');
+
+            clearTimeout(card.pulseTimer);
+            card.pulseTimer = setTimeout(() => {
+                valueElement.classList.remove('pulse', 'text-success', 'text-danger');
+            }, 1000);
+        }
+    }
+}
+
+// Buscar o histórico de vários tópicos numa só requisição.
+// Com cursores, o servidor devolve apenas as amostras posteriores.
+async function fetchHistories(topics, cursors = {}) {
+    const params = new URLSearchParams();
+    for (const topic of topics) {
+        params.append('topic', topic);
+        params.append('since', cursors[topic] || 0);
+    }
+    const response = await fetch(`/get_histories?${params}`);
+    const data = await response.json();
+    return data.histories;
+}
+
+// Completar os gráficos com o que chegou enquanto estávamos desconectados
+async function fillMissedHistory(topics) {
+    const cursors = {};
+    for (const topic of topics) {
+        cursors[topic] = sensorCards[topic].seq || 0;
+    }
+    const histories = await fetchHistories(topics, cursors);
+
+    for (const [topic, entry] of Object.entries(histories)) {
+        const card = sensorCards[topic];
+        if (!card) continue;
+
+        // Descartar o que já chegou pelo socket (seq de cada ponto)
+        const firstSeq = entry.seq - entry.history.length + 1;
+        if (entry.reset) {
+            card.sparkline.clear();
+        }
+        entry.history.forEach((item, i) => {
+            if (firstSeq + i > card.seq) {
+                card.sparkline.push(Number(item[1]));
+            }
+        });
+        card.seq = Math.max(card.seq, entry.seq);
+    }
+    scheduleUIUpdate();
+}
+
+// Agendador de atualizações de UI (uma por quadro de animação)
+let updateScheduled = false;
+
+function scheduleUIUpdate() {
+    if (!updateScheduled) {
+        updateScheduled = true;
+        requestAnimationFrame(processUIUpdates);
+    }
+}
+
+function processUIUpdates() {
+    for (const [card, payload] of pendingValues) {
+        renderValue(card, payload);
+    }
+    pendingValues.clear();
+    if (topicList.changed) {
+        topicList.render();
+    }
+    updateScheduled = false;
+}
+
+// Lista de tópicos do servidor (GET /topics, busca por substring), virtualizada:
+// só as linhas visíveis existem no DOM e a página seguinte é buscada ao rolar
+const TOPIC_ROW_HEIGHT = 32;
+const TOPIC_PAGE_SIZE = 100;
+const topicList = {
+    container: document.getElementById('topicList'),
+    spacer: document.getElementById('topicListSpacer'),
+    rows: [],
+    shown: [],
+    next: null,
+    filter: '',
+    loading: false,
+    generation: 0,
+    changed: false,
+    filterTimer: null,
+    refreshTimer: null,
+
+    async load(reset) {
+        const generation = reset ? ++this.generation : this.generation;
+        const params = new URLSearchParams({ q: this.filter, limit: TOPIC_PAGE_SIZE });
+        if (!reset && this.next) {
+            params.set('after', this.next);
+        }
+        this.loading = true;
+        try {
+            const response = await fetch(`/topics?${params}`);
+            const data = await response.json();
+            // Filtro mudou durante a requisição: resposta descartada
+            if (generation !== this.generation) return;
+            if (reset) {
+                this.shown = [];
+            }
+            this.shown.push(...data.topics);
+            this.next = data.next;
+            this.changed = true;
+            scheduleUIUpdate();
+        } catch (e) {
+            console.error('Error loading topics:', e);
+        } finally {
+            if (generation === this.generation) {
+                this.loading = false;
+            }
+        }
+    },
+
+    setFilter(text) {
+        clearTimeout(this.filterTimer);
+        this.filterTimer = setTimeout(() => {
+            this.filter = text.trim();
+            this.container.scrollTop = 0;
+            this.load(true);
+        }, 200);
+    },
+
+    // Tópicos novos no servidor: recarregar só se a lista inteira já está
+    // carregada (senão eles aparecem ao rolar ou filtrar)
+    topicsChanged() {
+        if (this.next !== null || this.refreshTimer) return;
+        this.refreshTimer = setTimeout(() => {
+            this.refreshTimer = null;
+            this.load(true);
+        }, 2000);
+    },
+
+    render() {
+        this.changed = false;
+        this.spacer.style.height = `${this.shown.length * TOPIC_ROW_HEIGHT}px`;
+        const first = Math.floor(this.container.scrollTop / TOPIC_ROW_HEIGHT);
+        const count = Math.ceil(this.container.clientHeight / TOPIC_ROW_HEIGHT) + 1;
+        while (this.rows.length < count) {
+            const row = document.createElement('div');
+            row.className = 'topic-row topic-badge';
+            this.container.appendChild(row);
+            this.rows.push(row);
+        }
+        this.rows.forEach((row, i) => {
+            const item = this.shown[first + i];
+            if (item === undefined) {
+                row.hidden = true;
+                return;
+            }
+            row.hidden = false;
+            row.style.transform = `translateY(${(first + i) * TOPIC_ROW_HEIGHT}px)`;
+            if (row.textContent !== item.topic) {
+                row.textContent = item.topic;
+            }
+            row.title = `${item.type || '--'} · ${item.rate} msg/s · ${item.count} mensagens`;
+        });
+        // Perto do fim do que foi carregado: buscar a próxima página
+        if (this.next && !this.loading && first + count >= this.shown.length - 20) {
+            this.load(false);
+        }
+    }
+};
+
+topicList.container.addEventListener('scroll', () => topicList.render(), { passive: true });
+topicList.container.addEventListener('click', (event) => {
+    const row = event.target.closest('.topic-row');
+    if (row) {
+        document.getElementById('topicInput').value = row.textContent;
+    }
+});
+document.getElementById('topicFilter').addEventListener('input', (event) => topicList.setFilter(event.target.value));
+
+// Obter ícone para o tópico
+function getIconForTopic(topic) {
+    const topicLower = topic.toLowerCase();
+    if (topicLower.includes('temp') || topicLower.includes('temperatura')) {
+        return 'fa-temperature-high';
+    } else if (topicLower.includes('umid') || topicLower.includes('humidity')) {
+        return 'fa-droplet';
+    } else if (topicLower.includes('luz') || topicLower.includes('light')) {
+        return 'fa-lightbulb';
+    } else if (topicLower.includes('press') || topicLower.includes('pressure')) {
+        return 'fa-gauge-high';
+    } else if (topicLower.includes('gas') || topicLower.includes('fumaca') || topicLower.includes('smoke')) {
+        return 'fa-smog';
+    } else if (topicLower.includes('door') || topicLower.includes('porta')) {
+        return 'fa-door-open';
+    } else if (topicLower.includes('motion') || topicLower.includes('movimento')) {
+        return 'fa-person-walking';
+    }
+    return 'fa-wave-square';
+}
+
+// Tópicos monitorados, salvos para restaurar os cards ao recarregar
+function saveSensorTopics() {
+    localStorage.setItem('sensorTopics', JSON.stringify(Object.keys(sensorCards)));
+}
+
+// Adicionar card de sensor
+async function addSensorCard() {
+    const topicInput = document.getElementById('topicInput');
+    const friendlyNameInput = document.getElementById('friendlyName');
+    const topic = topicInput.value.trim();
+    const friendlyName = friendlyNameInput.value.trim();
+
+    if (!topic) {
+        alert('Por favor, digite um tópico válido');
+        return;
+    }
+
+    if (sensorCards[topic]) {
+        alert('Este sensor já está sendo monitorado');
+        return;
+    }
+
+    // Salvar nome amigável se fornecido
+    if (friendlyName) {
+        customNames[topic] = friendlyName;
+        saveCustomNames();
+
+        // Enviar para o servidor
+        fetch('/update_name', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ topic, name: friendlyName })
+        });
+    }
+
+    // Obter histórico do servidor
+    const histories = await fetchHistories([topic]);
+    createSensorCard(topic, histories[topic]);
+    refreshLiveness([topic]);
+    saveSensorTopics();
+
+    // Receber apenas as atualizações deste tópico
+    socket.emit('subscribe', { topics: [topic] });
+
+    // Limpar inputs
+    topicInput.value = '';
+    friendlyNameInput.value = '';
+}
+
+// Restaurar os cards salvos com uma única requisição de histórico
+async function restoreSensorCards() {
+    let topics = [];
+    try {
+        topics = JSON.parse(localStorage.getItem('sensorTopics') || '[]');
+    } catch (e) {
+        console.error('Error loading sensor topics:', e);
+    }
+    if (topics.length === 0) return;
+
+    const histories = await fetchHistories(topics);
+    for (const topic of topics) {
+        if (!sensorCards[topic]) {
+            createSensorCard(topic, histories[topic]);
+        }
+    }
+    refreshLiveness(topics);
+    if (socket.connected) {
+        socket.emit('subscribe', { topics });
+    }
+}
+
+// Criar o card de um tópico a partir do seu histórico
+function createSensorCard(topic, entry) {
+    const icon = getIconForTopic(topic);
+    const cardId = `card-${Date.now()}-${Object.keys(sensorCards).length}`;
+    const displayName = customNames[topic] || topic;
+    const initialData = entry.history.map(item => Number(item[1]));
+
+    const card = document.createElement('div');
+    card.id = cardId;
+    card.className = 'sensor-card';
+    // Só marcação fixa no template: tópico e nome vêm do broker e de outros
+    // usuários e entram como texto (textContent), nunca como HTML
+    card.innerHTML = `
+        <div class="card-header flex justify-between items-start">
+            <div class="flex items-center gap-3">
+                <div class="w-10 h-10 rounded-lg bg-primary/20 flex items-center justify-center">
+                    <i class="${icon} text-lg text-primary"></i>
+                </div>
+                <div>
+                    <h2 class="font-semibold sensor-name"></h2>
+                    <div class="topic-badge px-2 py-0.5 rounded-full inline-block text-xs mt-1"></div>
+                </div>
+            </div>
+            <div class="flex gap-2">
+                <button class="text-gray-400 hover:text-primary edit-name">
+                    <i class="fas fa-edit"></i>
+                </button>
+                <button class="text-gray-400 hover:text-red-500 remove-card">
+                    <i class="fas fa-times"></i>
+                </button>
+            </div>
+        </div>
+
+        <div class="p-5">
+            <div class="text-3xl font-bold text-center mb-4 current-value">--</div>
+            <div class="chart-container">
+                <canvas class="sparkline"></canvas>
+            </div>
+        </div>
+
+        <div class="px-5 py-3 bg-light flex justify-between items-center">
+            <div class="text-sm text-gray-400">
+                <i class="fas fa-clock mr-1"></i> Atualizado: <span class="update-time">--:--:--</span>
+            </div>
+            <div class="flex items-center">
+                <span class="w-2 h-2 rounded-full bg-gray-500 mr-2 liveness-dot"></span>
+                <span class="text-xs liveness-label">--</span>
+            </div>
+        </div>
+    `;
+    card.querySelector('.sensor-name').textContent = displayName;
+    card.querySelector('.topic-badge').textContent = topic;
+    card.querySelector('.edit-name').addEventListener('click', () => editName(topic));
+    card.querySelector('.remove-card').addEventListener('click', () => removeCard(topic, cardId));
+
+    document.getElementById('sensorCards').appendChild(card);
+    sensorCards[topic] = card;
+    card.pattern = isPattern(topic);
+    if (card.pattern) {
+        patternCards.set(topic, card);
+        patternMatches.clear();
+    }
+    card.seq = entry.seq;
+    card.lastNumber = 0;
+    // Referências guardadas: o caminho quente não consulta o DOM
+    card.nameElement = card.querySelector('.sensor-name');
+    card.valueElement = card.querySelector('.current-value');
+    card.timeElement = card.querySelector('.update-time');
+    card.livenessDot = card.querySelector('.liveness-dot');
+    card.livenessLabel = card.querySelector('.liveness-label');
+
+    // Inicializar gráfico com os últimos pontos
+    card.sparkline = sparklines.add(card.querySelector('.sparkline'), initialData);
+
+    checkEmptyState();
+}
+
+// Editar nome
+function editName(topic) {
+    const card = sensorCards[topic];
+    if (!card) return;
+
+    const nameElement = card.nameElement;
+    const currentName = nameElement.textContent;
+
+    const newName = prompt('Digite o novo nome para este sensor:', currentName);
+    if (newName && newName.trim() !== currentName) {
+        nameElement.textContent = newName.trim();
+        customNames[topic] = newName.trim();
+        saveCustomNames();
+
+        // Enviar para o servidor
+        fetch('/update_name', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ topic, name: newName.trim() })
+        });
+    }
+}
+
+// Remover card
+function removeCard(topic, cardId) {
+    if (sensorCards[topic]) {
+        const card = document.getElementById(cardId);
+        if (card) {
+            sparklines.remove(card.sparkline);
+            pendingValues.delete(card);
+            card.remove();
+        }
+        delete sensorCards[topic];
+        if (patternCards.delete(topic)) {
+            patternMatches.clear();
+        }
+        saveSensorTopics();
+        socket.emit('unsubscribe', { topics: [topic] });
+        checkEmptyState();
+    }
+}
+
+// Inicializar estado vazio
+checkEmptyState();
+restoreSensorCards();
+topicList.load(true);
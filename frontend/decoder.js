@@ -0,0 +1,76 @@
+// Web Worker: decodifica os frames binários do mqtt_batch (formato descrito
+// em wire.py) fora da thread principal. Recebe do app.js:
+//   { type: 'frame', buffer }        frame transferido (ArrayBuffer)
+//   { type: 'topic_ids', definitions } definições [id, tópico] da assinatura
+//   { type: 'reset' }                 nova conexão: IDs deixam de valer
+// e responde com { entries: [[tópico, payload, timestamp, seq], ...] }.
+const topicNames = new Map();
+const textDecoder = new TextDecoder();
+
+function decodeFrame(buffer) {
+    const view = new DataView(buffer);
+    let offset = 0;
+    const version = view.getUint8(offset);
+    // Versão 2: timestamp absoluto (f64) por entrada em vez do delta em µs
+    const wide = version === 2;
+    if (version !== 1 && !wide) {
+        console.error('Unsupported frame version:', version);
+        return [];
+    }
+    const base = view.getFloat64(offset + 1, true);
+    const definitionCount = view.getUint16(offset + 9, true);
+    const entryCount = view.getUint32(offset + 11, true);
+    offset += 15;
+
+    for (let i = 0; i < definitionCount; i++) {
+        const id = view.getUint32(offset, true);
+        const length = view.getUint16(offset + 4, true);
+        offset += 6;
+        topicNames.set(id, textDecoder.decode(new Uint8Array(buffer, offset, length)));
+        offset += length;
+    }
+
+    const entries = [];
+    for (let i = 0; i < entryCount; i++) {
+        const id = view.getUint32(offset, true);
+        const seq = view.getUint32(offset + 4, true);
+        let timestamp;
+        if (wide) {
+            timestamp = view.getFloat64(offset + 8, true);
+            offset += 16;
+        } else {
+            timestamp = base + view.getInt32(offset + 8, true) / 1e6;
+            offset += 12;
+        }
+        const kind = view.getUint8(offset);
+        offset += 1;
+
+        let payload;
+        if (kind === 0) {
+            payload = view.getFloat64(offset, true);
+            offset += 8;
+        } else {
+            const length = view.getUint16(offset, true);
+            payload = textDecoder.decode(new Uint8Array(buffer, offset + 2, length));
+            offset += 2 + length;
+        }
+
+        const topic = topicNames.get(id);
+        if (topic !== undefined) {
+            entries.push([topic, payload, timestamp, seq]);
+        }
+    }
+    return entries;
+}
+
+self.onmessage = ({ data }) => {
+    if (data.type === 'frame') {
+        self.postMessage({ entries: decodeFrame(data.buffer) });
+    } else if (data.type === 'topic_ids') {
+        for (const [id, topic] of data.definitions) {
+            topicNames.set(id, topic);
+        }
+    } else if (data.type === 'reset') {
+        topicNames.clear();
+    }
+};
@@ -0,0 +1,156 @@
+// Renderizador único dos mini-gráficos dos cards: cada linha guarda os
+// últimos valores num anel (Float64Array) e só as linhas alteradas e
+// visíveis são redesenhadas, uma vez por quadro de animação.
+class Sparkline {
+    constructor(renderer, canvas, capacity) {
+        this.renderer = renderer;
+        this.canvas = canvas;
+        this.ctx = canvas.getContext('2d');
+        this.values = new Float64Array(capacity);
+        this.start = 0;
+        this.length = 0;
+        this.visible = true;
+        this.stale = false;
+        this.width = 0;
+        this.height = 0;
+        this.gradient = null;
+    }
+
+    push(value) {
+        if (!Number.isFinite(value)) return;
+        const capacity = this.values.length;
+        this.values[(this.start + this.length) % capacity] = value;
+        if (this.length < capacity) {
+            this.length++;
+        } else {
+            this.start = (this.start + 1) % capacity;
+        }
+        this.renderer.markDirty(this);
+    }
+
+    clear() {
+        this.start = 0;
+        this.length = 0;
+        this.renderer.markDirty(this);
+    }
+
+    resize() {
+        const ratio = window.devicePixelRatio || 1;
+        const width = Math.round(this.canvas.clientWidth * ratio);
+        const height = Math.round(this.canvas.clientHeight * ratio);
+        if (width === this.width && height === this.height) return;
+        this.canvas.width = this.width = width;
+        this.canvas.height = this.height = height;
+        this.gradient = this.ctx.createLinearGradient(0, 0, 0, height);
+        this.gradient.addColorStop(0, 'rgba(65, 189, 245, 0.4)');
+        this.gradient.addColorStop(1, 'rgba(65, 189, 245, 0.05)');
+    }
+
+    draw() {
+        this.resize();
+        const { ctx, width, height, values, start, length } = this;
+        ctx.clearRect(0, 0, width, height);
+        if (length < 2 || width === 0) return;
+
+        const capacity = values.length;
+        let min = Infinity;
+        let max = -Infinity;
+        for (let i = 0; i < length; i++) {
+            const value = values[(start + i) % capacity];
+            if (value < min) min = value;
+            if (value > max) max = value;
+        }
+        // Margem vertical; série constante fica centralizada
+        const padding = max > min ? (max - min) * 0.1 : 1;
+        min -= padding;
+        max += padding;
+
+        const lineWidth = 2 * (window.devicePixelRatio || 1);
+        const step = width / (length - 1);
+        const scale = (height - lineWidth) / (max - min);
+        const y = (i) => height - lineWidth / 2 - (values[(start + i) % capacity] - min) * scale;
+
+        // Curva suave pelos pontos médios entre amostras
+        ctx.beginPath();
+        ctx.moveTo(0, y(0));
+        for (let i = 1; i < length - 1; i++) {
+            ctx.quadraticCurveTo(i * step, y(i), (i + 0.5) * step, (y(i) + y(i + 1)) / 2);
+        }
+        ctx.lineTo(width, y(length - 1));
+        ctx.lineWidth = lineWidth;
+        ctx.strokeStyle = '#41BDF5';
+        ctx.stroke();
+
+        ctx.lineTo(width, height);
+        ctx.lineTo(0, height);
+        ctx.closePath();
+        ctx.fillStyle = this.gradient;
+        ctx.fill();
+    }
+}
+
+class SparklineRenderer {
+    constructor(capacity = 15) {
+        this.capacity = capacity;
+        this.dirty = new Set();
+        this.scheduled = false;
+        this.lines = new WeakMap();
+        // Cards fora da tela não são desenhados até voltarem a aparecer
+        this.visibility = new IntersectionObserver((entries) => {
+            for (const entry of entries) {
+                const line = this.lines.get(entry.target);
+                if (!line) continue;
+                line.visible = entry.isIntersecting;
+                if (line.visible && line.stale) {
+                    line.stale = false;
+                    this.markDirty(line);
+                }
+            }
+        });
+        this.sizes = new ResizeObserver((entries) => {
+            for (const entry of entries) {
+                const line = this.lines.get(entry.target);
+                if (line) this.markDirty(line);
+            }
+        });
+    }
+
+    add(canvas, initialValues = []) {
+        const line = new Sparkline(this, canvas, this.capacity);
+        this.lines.set(canvas, line);
+        this.visibility.observe(canvas);
+        this.sizes.observe(canvas);
+        for (const value of initialValues.slice(-this.capacity)) {
+            line.push(value);
+        }
+        this.markDirty(line);
+        return line;
+    }
+
+    remove(line) {
+        this.visibility.unobserve(line.canvas);
+        this.sizes.unobserve(line.canvas);
+        this.lines.delete(line.canvas);
+        this.dirty.delete(line);
+    }
+
+    markDirty(line) {
+        this.dirty.add(line);
+        if (!this.scheduled) {
+            this.scheduled = true;
+            requestAnimationFrame(() => this.render());
+        }
+    }
+
+    render() {
+        this.scheduled = false;
+        for (const line of this.dirty) {
+            if (line.visible) {
+                line.draw();
+            } else {
+                line.stale = true;
+            }
+        }
+        this.dirty.clear();
+    }
+}
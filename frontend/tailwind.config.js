@@ -0,0 +1,17 @@
+// Configuração do Tailwind usada por assets.py (CLI) e pelo modo de
+// desenvolvimento (Tailwind no navegador)
+module.exports = {
+    content: ['./frontend/index.html', './frontend/app.js'],
+    theme: {
+        extend: {
+            colors: {
+                primary: '#41BDF5',
+                secondary: '#0075D4',
+                accent: '#FF9500',
+                dark: '#121212',
+                card: '#1E1E1E',
+                light: '#2D2D2D'
+            }
+        }
+    }
+}
@@ -0,0 +1,145 @@
+# Histórico recente em memória: anel de capacidade fixa sobre array('d')
+# contíguos (timestamps e valores), com caminho separado para texto
+from array import array
+from collections import deque
+import heapq
+import sys
+import threading
+import uuid
+
+from topics import TopicTrie
+
+
+class TopicHistory:
+    __slots__ = ('capacity', 'ts', 'values', 'head', 'count', 'text', 'seq')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # Arrays alocados só quando chega o primeiro valor numérico
+        self.ts = None
+        self.values = None
+        self.head = 0
+        self.count = 0
+        self.text = None
+        # Total de amostras já recebidas (cursor para consultas incrementais)
+        self.seq = 0
+
+    def append(self, timestamp, value):
+        self.seq += 1
+        if isinstance(value, str):
+            if self.text is None:
+                self.text = deque(maxlen=self.capacity)
+            self.text.append((timestamp, value))
+            return
+        if self.ts is None:
+            self.ts = array('d', bytes(8 * self.capacity))
+            self.values = array('d', bytes(8 * self.capacity))
+        head = self.head
+        self.ts[head] = timestamp
+        self.values[head] = value
+        self.head = (head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def __len__(self):
+        return min(self.count + (len(self.text) if self.text else 0), self.capacity)
+
+    def numeric(self):
+        # Timestamps e valores numéricos em ordem, como array('d') (cópia em C, sem listas)
+        if not self.count:
+            return array('d'), array('d')
+        if self.count < self.capacity:
+            return self.ts[:self.count], self.values[:self.count]
+        head = self.head
+        return self.ts[head:] + self.ts[:head], self.values[head:] + self.values[:head]
+
+    def __iter__(self):
+        ts, values = self.numeric()
+        numeric = zip(ts, values)
+        if not self.text:
+            return numeric
+        if not self.count:
+            return iter(self.text)
+        # Tópico com valores mistos: intercalar por tempo e manter os mais recentes
+        merged = list(heapq.merge(numeric, self.text, key=lambda item: item[0]))
+        return iter(merged[-self.capacity:])
+
+    def since(self, cursor):
+        # Amostras recebidas depois do cursor (limitadas à capacidade do anel)
+        missed = self.seq - cursor
+        if missed <= 0:
+            return []
+        items = list(self)
+        return items[-missed:] if missed < len(items) else items
+
+    def text_items(self):
+        return list(self.text) if self.text else []
+
+    def restore(self, ts, values, text, seq):
+        # Estado salvo por warm_state.py (em ordem cronológica); guarda os
+        # mais recentes se a capacidade diminuiu
+        count = min(len(ts), self.capacity)
+        if count:
+            self.ts = array('d', bytes(8 * self.capacity))
+            self.values = array('d', bytes(8 * self.capacity))
+            self.ts[:count] = ts[len(ts) - count:]
+            self.values[:count] = values[len(values) - count:]
+            self.count = count
+            self.head = count % self.capacity
+        if text:
+            self.text = deque(text, maxlen=self.capacity)
+        self.seq = seq
+
+    def nbytes(self):
+        size = sys.getsizeof(self)
+        if self.ts is not None:
+            size += sys.getsizeof(self.ts) + sys.getsizeof(self.values)
+        if self.text is not None:
+            size += sys.getsizeof(self.text)
+            size += sum(sys.getsizeof(item) + sys.getsizeof(item[0]) + sys.getsizeof(item[1]) for item in self.text)
+        return size
+
+
+def memory_usage(histories):
+    # Bytes totais e por tópico de um dicionário {tópico: TopicHistory}
+    per_topic = {topic: history.nbytes() for topic, history in list(histories.items())}
+    total = sum(per_topic.values())
+    return {
+        'topics': len(per_topic),
+        'total_bytes': total,
+        'avg_bytes_per_topic': total / len(per_topic) if per_topic else 0,
+        'per_topic': per_topic,
+    }
+
+
+class LatestValues:
+    # Último valor de cada tópico com número de sequência global. O epoch
+    # identifica o processo: cursores de outra execução (ou worker) não valem.
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def update(self, batch):
+        # batch: {tópico: {'payload', 'timestamp', 'seq'}}
+        with self.lock:
+            for topic, data in batch.items():
+                self.seq += 1
+                self.values[topic] = (self.seq, data)
+
+    def items(self):
+        # [(tópico, dados)] de todos os tópicos
+        with self.lock:
+            return [(topic, data) for topic, (_, data) in self.values.items()]
+
+    def snapshot(self, patterns, since=0):
+        # [tópico, payload, timestamp, seq do tópico] dos tópicos que casam com
+        # os padrões e mudaram depois do cursor global since
+        trie = TopicTrie(patterns)
+        with self.lock:
+            seq = self.seq
+            items = [(topic, data) for topic, (changed, data) in self.values.items() if changed > since]
+        values = [[topic, data['payload'], data['timestamp'], data['seq']]
+                  for topic, data in items if trie.matches(topic)]
+        return seq, values
@@ -0,0 +1,173 @@
+# Buffer de ingestão MQTT que nunca bloqueia a thread de rede do paho
+from collections import deque
+import threading
+import time
+
+# Políticas de estouro
+DROP_OLDEST = 'drop-oldest'
+COALESCE = 'coalesce'
+SAMPLE = 'sample'
+POLICIES = (DROP_OLDEST, COALESCE, SAMPLE)
+
+
+class IngestBuffer:
+    # Anel limitado por tópico + ordem de chegada entre tópicos.
+    # put() só faz operações O(1) dentro do lock e nunca espera o consumidor;
+    # put_wait() (replay) espera vaga em vez de descartar.
+    def __init__(self, capacity=10000, topic_capacity=100, policy=DROP_OLDEST, sample_every=10):
+        if policy not in POLICIES:
+            raise ValueError(f"Política de ingestão inválida: {policy}")
+        self.capacity = capacity
+        self.topic_capacity = topic_capacity
+        self.policy = policy
+        self.sample_every = max(1, sample_every)
+        self._rings = {}
+        self._order = deque()
+        self._size = 0
+        self._waiting = 0
+        self._wakeup = None
+        self._sample_counts = {}
+        lock = threading.Lock()
+        self._cond = threading.Condition(lock)
+        # Produtores de put_wait esperando o consumidor liberar vaga
+        self._space = threading.Condition(lock)
+        self.received = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.sampled = 0
+
+    def set_wakeup(self, callback):
+        # Chamado quando a fila deixa de estar vazia (ex.: acordar um loop asyncio)
+        self._wakeup = callback
+
+    def qsize(self):
+        return self._size
+
+    def stats(self):
+        return {
+            'depth': self._size,
+            'capacity': self.capacity,
+            'policy': self.policy,
+            'received': self.received,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'sampled': self.sampled,
+        }
+
+    def put(self, topic, payload, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        item = (topic, payload, timestamp)
+        with self._cond:
+            self.received += 1
+            was_empty = not self._size
+            ring = self._rings.get(topic)
+            pressure = self._size >= self.capacity
+
+            if self.policy == SAMPLE and self._size >= self.capacity // 2:
+                # Sob pressão, aceitar apenas 1 a cada N mensagens do tópico
+                count = self._sample_counts.get(topic, 0) + 1
+                self._sample_counts[topic] = count
+                if count % self.sample_every:
+                    self.sampled += 1
+                    return False
+
+            if ring is None:
+                ring = self._rings[topic] = deque()
+
+            if self.policy == COALESCE and ring and (pressure or len(ring) >= self.topic_capacity):
+                # Substituir a pendência mais recente do tópico pela nova
+                ring[-1] = item
+                self.coalesced += 1
+                self._notify()
+                return True
+
+            # O tópico continua em _order enquanto tinha pendências antes deste
+            # put, mesmo que o descarte abaixo esvazie o anel
+            queued = bool(ring)
+            if len(ring) >= self.topic_capacity:
+                ring.popleft()
+                self._size -= 1
+                self.dropped += 1
+            elif pressure:
+                self._drop_oldest()
+                # _drop_oldest tira o tópico de _order quando esvazia o anel
+                queued = bool(ring)
+
+            if not queued:
+                self._order.append(topic)
+            ring.append(item)
+            self._size += 1
+            self._notify()
+        if was_empty and self._wakeup is not None:
+            self._wakeup()
+        return True
+
+    def put_wait(self, topic, payload, timestamp=None, timeout=None):
+        # Com contrapressão: bloqueia até haver vaga no anel do tópico e no
+        # total, sem descartar nem coalescer. False se o prazo vencer.
+        if timestamp is None:
+            timestamp = time.time()
+        with self._cond:
+            if not self._space.wait_for(lambda: self._has_room(topic), timeout):
+                return False
+            self.received += 1
+            was_empty = not self._size
+            ring = self._rings.get(topic)
+            if ring is None:
+                ring = self._rings[topic] = deque()
+            if not ring:
+                self._order.append(topic)
+            ring.append((topic, payload, timestamp))
+            self._size += 1
+            self._notify()
+        if was_empty and self._wakeup is not None:
+            self._wakeup()
+        return True
+
+    def _has_room(self, topic):
+        ring = self._rings.get(topic)
+        return self._size < self.capacity and (ring is None or len(ring) < self.topic_capacity)
+
+    def _drop_oldest(self):
+        # Descarta a mensagem mais antiga do tópico que está há mais tempo na fila
+        while self._order:
+            ring = self._rings[self._order[0]]
+            if ring:
+                ring.popleft()
+                self._size -= 1
+                self.dropped += 1
+                if not ring:
+                    self._order.popleft()
+                return
+            self._order.popleft()
+
+    def _notify(self):
+        if self._waiting:
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        # Retorna todas as mensagens pendentes (lista vazia se o prazo vencer)
+        with self._cond:
+            if not self._size:
+                if timeout is not None and timeout <= 0:
+                    return []
+                self._waiting += 1
+                try:
+                    self._cond.wait_for(lambda: self._size, timeout)
+                finally:
+                    self._waiting -= 1
+                if not self._size:
+                    return []
+
+            items = []
+            rings = self._rings
+            for topic in self._order:
+                items.extend(rings.pop(topic))
+            self._order.clear()
+            self._size = 0
+            if rings:
+                rings.clear()
+            self._sample_counts.clear()
+            self._space.notify_all()
+            return items
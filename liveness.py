@@ -0,0 +1,224 @@
+# Detecção de tópicos parados (online/offline) com uma roda de temporização
+# hierárquica: cada mensagem custa O(1) (só atualiza o último horário visto)
+# e cada tick custa O(vencidos), sem varrer todos os tópicos.
+# Intervalo esperado por padrão de tópico em JSON (vale a primeira regra que casar):
+#   [
+#     {"pattern": "casa/+/temp", "interval": 60},
+#     {"pattern": "energia/#", "interval": 5, "timeout": 30}
+#   ]
+# Sem regra, o intervalo é aprendido da cadência das mensagens (média móvel
+# exponencial dos intervalos, a partir de min_samples intervalos medidos).
+# O tópico fica offline quando passa "timeout" (padrão: factor × intervalo,
+# nunca menos que min_timeout) sem mensagens, e volta a online na próxima.
+import json
+import math
+import os
+import threading
+import time
+
+from topics import TopicTrie
+
+
+def load_rules(path):
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Erro ao carregar intervalos de tópicos ({path}): {e}")
+        return []
+
+
+class TimerWheel:
+    # Níveis de 64 posições; uma posição do nível k cobre 64^k ticks. Quando
+    # o nível de baixo completa uma volta, a posição seguinte do nível de cima
+    # desce (cascata) e cada entrada é reinserida no nível que lhe cabe.
+    BITS = 6
+    SLOTS = 1 << BITS
+
+    def __init__(self, tick=1.0, levels=4, now=0.0):
+        self.tick = tick
+        self.levels = [[[] for _ in range(self.SLOTS)] for _ in range(levels)]
+        self.current = int(now / tick)
+        self.horizon = 1 << (self.BITS * levels)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def schedule(self, key, deadline):
+        # deadline em segundos, no mesmo relógio de advance
+        self._insert(key, max(math.ceil(deadline / self.tick), self.current + 1))
+        self.size += 1
+
+    def _insert(self, key, when):
+        # Além do último nível, a entrada espera na posição mais distante e é
+        # reinserida (com o prazo real) ao descer
+        slot_when = max(min(when, self.current + self.horizon - 1), self.current)
+        delta = slot_when - self.current
+        level = 0
+        while delta >= 1 << (self.BITS * (level + 1)):
+            level += 1
+        self.levels[level][(slot_when >> (self.BITS * level)) & (self.SLOTS - 1)].append((when, key))
+
+    def advance(self, now):
+        # Chaves cujo prazo venceu até now
+        target = int(now / self.tick)
+        mask = self.SLOTS - 1
+        expired = []
+        while self.current < target:
+            self.current += 1
+            t = self.current
+            level = 1
+            while level < len(self.levels) and not t & ((1 << (self.BITS * level)) - 1):
+                level += 1
+            for k in range(level - 1, 0, -1):
+                index = (t >> (self.BITS * k)) & mask
+                slot = self.levels[k][index]
+                if slot:
+                    self.levels[k][index] = []
+                    for when, key in slot:
+                        self._insert(key, when)
+            slot = self.levels[0][t & mask]
+            if slot:
+                self.levels[0][t & mask] = []
+                expired.extend(key for _, key in slot)
+        self.size -= len(expired)
+        return expired
+
+
+class TopicState:
+    __slots__ = ('last_seen', 'timestamp', 'interval', 'samples', 'timeout', 'fixed', 'online', 'scheduled')
+
+    def __init__(self, now, timestamp):
+        self.last_seen = now
+        self.timestamp = timestamp
+        self.interval = None
+        self.samples = 0
+        self.timeout = None
+        self.fixed = False
+        self.online = True
+        self.scheduled = False
+
+
+class Liveness:
+    # observe() é chamado pelo dispatcher a cada mensagem; advance() por uma
+    # thread a cada tick, devolvendo as transições (online e offline) desde
+    # o último tick. Horários internos em time.monotonic(); os eventos levam
+    # o timestamp de parede das mensagens.
+    def __init__(self, rules=(), tick=1.0, factor=3.0, min_samples=5, min_timeout=10.0, alpha=0.2):
+        self.rules = [rule for rule in rules if rule.get('pattern') and rule.get('interval')]
+        for rule in rules:
+            if not (rule.get('pattern') and rule.get('interval')):
+                print(f"Intervalo de tópico ignorado (sem pattern/interval): {rule}")
+        self.trie = TopicTrie()
+        for index, rule in enumerate(self.rules):
+            self.trie.add(rule['pattern'], index)
+        self.tick = tick
+        self.factor = factor
+        self.min_samples = min_samples
+        self.min_timeout = min_timeout
+        self.alpha = alpha
+        self.topics = {}
+        self.wheel = TimerWheel(tick, now=time.monotonic())
+        self.pending = []
+        self.offline = 0
+        self.lock = threading.Lock()
+
+    def _new_state(self, topic, now, timestamp):
+        state = TopicState(now, timestamp)
+        matches = self.trie.match(topic)
+        if matches:
+            rule = self.rules[min(matches)]
+            state.fixed = True
+            state.interval = rule['interval']
+            state.timeout = rule.get('timeout') or max(rule['interval'] * self.factor, self.min_timeout)
+        return state
+
+    def observe(self, topic, timestamp, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            state = self.topics.get(topic)
+            if state is None:
+                state = self.topics[topic] = self._new_state(topic, now, timestamp)
+            elif not state.online:
+                # O intervalo até a volta não conta para a cadência
+                state.online = True
+                self.offline -= 1
+                state.last_seen = now
+                state.timestamp = timestamp
+                self.pending.append(self._event(topic, state, 'online', timestamp))
+            else:
+                # Cadência pelo instante de recebimento de cada mensagem, não
+                # pelo relógio do lote (mensagens de um mesmo lote chegam
+                # aqui juntas); now só marca o prazo
+                gap = timestamp - state.timestamp
+                if not state.fixed and gap >= 0:
+                    state.interval = gap if state.interval is None else state.interval + self.alpha * (gap - state.interval)
+                    state.samples += 1
+                    if state.samples >= self.min_samples:
+                        state.timeout = max(state.interval * self.factor, self.min_timeout)
+                state.last_seen = now
+                state.timestamp = timestamp
+            # Prazo preguiçoso: a roda não é mexida a cada mensagem; no
+            # vencimento, advance() confere o último horário visto
+            if state.timeout is not None and not state.scheduled:
+                state.scheduled = True
+                self.wheel.schedule(topic, now + state.timeout)
+
+    def advance(self, now=None):
+        now = time.monotonic() if now is None else now
+        wall = time.time()
+        with self.lock:
+            events, self.pending = self.pending, []
+            for topic in self.wheel.advance(now):
+                state = self.topics.get(topic)
+                if state is None:
+                    continue
+                deadline = state.last_seen + state.timeout
+                if deadline > now:
+                    self.wheel.schedule(topic, deadline)
+                    continue
+                state.scheduled = False
+                state.online = False
+                self.offline += 1
+                events.append(self._event(topic, state, 'offline', wall))
+        return events
+
+    def _event(self, topic, state, online, timestamp):
+        return {
+            'topic': topic,
+            'state': online,
+            'timestamp': timestamp,
+            'last_seen': state.timestamp,
+            'interval': state.interval,
+        }
+
+    def _describe(self, topic, state):
+        return {
+            'topic': topic,
+            'state': 'online' if state.online else 'offline',
+            'last_seen': state.timestamp,
+            'interval': state.interval,
+            'timeout': state.timeout,
+            'learned': not state.fixed,
+        }
+
+    def status(self, matches=None, online=None, limit=None):
+        # Estado atual dos tópicos; matches filtra por tópico, online por estado
+        with self.lock:
+            items = list(self.topics.items())
+        result = []
+        for topic, state in items:
+            if online is not None and state.online != online:
+                continue
+            if matches is not None and not matches(topic):
+                continue
+            result.append(self._describe(topic, state))
+        result.sort(key=lambda item: item['topic'])
+        return result[:limit] if limit is not None else result
+
+    def lookup(self, topics):
+        with self.lock:
+            return [self._describe(topic, self.topics[topic]) for topic in topics if topic in self.topics]
@@ -0,0 +1,187 @@
+# Métricas do caminho quente no formato texto do Prometheus (/metrics).
+# Escritas com lock próprio por métrica (sem contenção na prática: cada
+# métrica tem um único escritor) e lidas só na coleta.
+from bisect import bisect_left
+from collections import deque
+import threading
+import time
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DURATION_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+# Rótulo que agrega os tópicos além do limite de séries por tópico
+OTHER_TOPICS = '_other'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+    return str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self):
+        yield self.name, '', self.value
+
+
+class LabeledCounter:
+    # Contador por valor de rótulo (ex.: tópico), limitado a max_series séries
+    kind = 'counter'
+
+    def __init__(self, name, help, label, max_series=1000):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.max_series = max_series
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, label_value, amount=1):
+        with self.lock:
+            values = self.values
+            if label_value not in values and len(values) >= self.max_series:
+                label_value = OTHER_TOPICS
+            values[label_value] = values.get(label_value, 0) + amount
+
+    def inc_many(self, label_values):
+        # Vários incrementos com um único lock (ex.: tópicos de um lote)
+        with self.lock:
+            values = self.values
+            for label_value in label_values:
+                if label_value not in values and len(values) >= self.max_series:
+                    label_value = OTHER_TOPICS
+                values[label_value] = values.get(label_value, 0) + 1
+
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        for label_value, value in items:
+            yield self.name, f'{{{self.label}="{_escape(label_value)}"}}', value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def observe_many(self, values):
+        buckets = self.buckets
+        with self.lock:
+            counts = self.counts
+            for value in values:
+                counts[bisect_left(buckets, value)] += 1
+                self.sum += value
+                self.count += 1
+
+    def samples(self):
+        with self.lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            yield f'{self.name}_bucket', f'{{le="{_number(float(bound))}"}}', cumulative
+        yield f'{self.name}_sum', '', total
+        yield f'{self.name}_count', '', count
+
+
+class Callback:
+    # Valor lido na coleta (ex.: contadores já mantidos por outro objeto)
+    def __init__(self, name, help, kind, read):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.read = read
+
+    def samples(self):
+        yield self.name, '', self.read()
+
+
+class RateMeter:
+    # Taxa por segundo de um contador crescente na janela dos últimos segundos
+    def __init__(self, read, window=10):
+        self.read = read
+        self.samples = deque(maxlen=window + 1)
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._sample_loop, daemon=True)
+            self.thread.start()
+
+    def _sample_loop(self):
+        while True:
+            self.samples.append((time.monotonic(), self.read()))
+            time.sleep(1)
+
+    def rate(self):
+        samples = list(self.samples)
+        if len(samples) < 2:
+            return 0.0
+        (start, first), (end, last) = samples[0], samples[-1]
+        return (last - first) / (end - start) if end > start else 0.0
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help):
+        return self.add(Counter(name, help))
+
+    def labeled_counter(self, name, help, label, max_series=1000):
+        return self.add(LabeledCounter(name, help, label, max_series))
+
+    def histogram(self, name, help, buckets):
+        return self.add(Histogram(name, help, buckets))
+
+    def counter_callback(self, name, help, read):
+        return self.add(Callback(name, help, 'counter', read))
+
+    def gauge_callback(self, name, help, read):
+        return self.add(Callback(name, help, 'gauge', read))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_number(value)}')
+        return '\n'.join(lines) + '\n'
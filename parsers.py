@@ -0,0 +1,226 @@
+# Estágio de parsing dos payloads MQTT, configurado por padrão de tópico.
+# Regras em JSON (lista, a primeira que casar com o tópico vale):
+#   [
+#     {"pattern": "Umidade-MQTT/#", "json": {"umidade": "sensor.umidade", "temp": "dados.0.t"}},
+#     {"pattern": "casa/+/temp", "unit": "°C"},
+#     {"pattern": "casa/+/energia", "unit": true},
+#     {"pattern": "casa/+/porta", "map": {"aberta": 1, "fechada": 0}},
+#     {"pattern": "casa/+/luz", "map": "boolean"}
+#   ]
+# "json" extrai campos (caminho com pontos, índices numéricos para listas) em
+# sub-séries <tópico>/<nome>; o payload bruto só é mantido com "keep_raw": true.
+# "unit" remove a unidade (texto exato ou qualquer sufixo não numérico com true)
+# e "map" converte textos (ou booleanos) em números.
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import os
+
+from topics import TopicTrie
+
+BOOLEAN_MAP = {
+    'true': 1.0, 'false': 0.0, 'on': 1.0, 'off': 0.0,
+    'yes': 1.0, 'no': 0.0, 'sim': 1.0, 'não': 0.0, 'nao': 0.0,
+    'ligado': 1.0, 'desligado': 0.0,
+}
+
+
+def load_rules(path):
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Erro ao carregar regras de parsing ({path}): {e}")
+        return []
+
+
+def parse_number(text):
+    # Valor padrão: número quando possível, texto caso contrário
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _strip_unit(unit):
+    if isinstance(unit, str):
+        def strip(text):
+            text = text.strip()
+            if text.endswith(unit):
+                text = text[:-len(unit)]
+            return text
+        return strip
+
+    def strip(text):
+        # Qualquer sufixo não numérico: "21.5 °C", "230V", "45 %"
+        text = text.rstrip()
+        end = len(text)
+        while end and not (text[end - 1].isdigit() or text[end - 1] == '.'):
+            end -= 1
+        return text[:end] if end else text
+    return strip
+
+
+def _converter(rule):
+    # Conversão de um valor textual conforme "unit" e "map"
+    strip = _strip_unit(rule['unit']) if rule.get('unit') else None
+    mapping = rule.get('map')
+    if mapping == 'boolean':
+        mapping = BOOLEAN_MAP
+    elif mapping:
+        mapping = {str(key).strip().lower(): float(value) for key, value in mapping.items()}
+
+    def convert(text):
+        try:
+            return float(text)
+        except ValueError:
+            pass
+        if mapping:
+            mapped = mapping.get(text.strip().lower())
+            if mapped is not None:
+                return mapped
+        if strip is not None:
+            try:
+                return float(strip(text))
+            except ValueError:
+                pass
+        return text
+    return convert
+
+
+def _json_path(path):
+    return tuple(int(key) if key.isdigit() else key for key in path.split('.') if key)
+
+
+def _extract(document, path):
+    for key in path:
+        if isinstance(key, int):
+            if not isinstance(document, list) or key >= len(document):
+                return None
+        elif not isinstance(document, dict):
+            return None
+        document = document[key] if isinstance(key, int) else document.get(key)
+        if document is None:
+            return None
+    return document
+
+
+def compile_rule(rule):
+    # Função payload -> [(sufixo do tópico ou None, valor, payload)]
+    convert = _converter(rule)
+    fields = rule.get('json')
+    if not fields:
+        def parse(payload):
+            value = convert(payload)
+            return [(None, value, payload)]
+        return parse
+
+    fields = [(name, _json_path(path)) for name, path in fields.items()]
+    keep_raw = rule.get('keep_raw', False)
+
+    def parse(payload):
+        try:
+            document = json.loads(payload)
+        except ValueError:
+            document = None
+        if not isinstance(document, (dict, list)):
+            # Não é um documento JSON (ex.: sub-série já extraída e
+            # reencaminhada ao worker dono): valor simples, mesmo com keep_raw
+            return [(None, convert(payload), payload)]
+        parsed = [(None, payload, payload)] if keep_raw else []
+        for name, path in fields:
+            value = _extract(document, path)
+            if value is None or isinstance(value, (dict, list)):
+                continue
+            if isinstance(value, bool):
+                value = 1.0 if value else 0.0
+            elif isinstance(value, (int, float)):
+                value = float(value)
+            else:
+                value = convert(str(value))
+            parsed.append((name, value, value if isinstance(value, str) else str(value)))
+        return parsed
+    return parse
+
+
+def _parse_default(payload):
+    return [(None, parse_number(payload), payload)]
+
+
+class Parsers:
+    # Regras compiladas uma vez; o parser de cada tópico fica em cache,
+    # então o caminho quente é uma consulta ao dict por mensagem
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+        self.compiled = [compile_rule(rule) for rule in self.rules]
+        self.trie = TopicTrie()
+        for index, rule in enumerate(self.rules):
+            self.trie.add(rule['pattern'], index)
+        self.cache = {}
+
+    def for_topic(self, topic):
+        parse = self.cache.get(topic)
+        if parse is None:
+            indexes = self.trie.match(topic)
+            parse = self.compiled[min(indexes)] if indexes else _parse_default
+            self.cache[topic] = parse
+        return parse
+
+    def parse(self, messages):
+        # [(tópico, payload, ts)] -> [(tópico, valor, payload, ts)]
+        parsed = []
+        for topic, payload, timestamp in messages:
+            for suffix, value, text in self.for_topic(topic)(payload):
+                parsed.append((topic if suffix is None else f"{topic}/{suffix}", value, text, timestamp))
+        return parsed
+
+
+_worker_parsers = None
+
+
+def _init_worker(rules):
+    global _worker_parsers
+    _worker_parsers = Parsers(rules)
+
+
+def _parse_chunk(messages):
+    return _worker_parsers.parse(messages)
+
+
+class ParserPool:
+    # Com volume alto, divide o lote entre processos (workers=0 desativa).
+    # Usa fork e é iniciado antes das threads do servidor.
+    def __init__(self, parsers, workers=0, min_batch=2000):
+        self.parsers = parsers
+        self.workers = workers
+        self.min_batch = min_batch
+        self.executor = None
+
+    def start(self):
+        if self.workers <= 0 or self.executor is not None:
+            return
+        self.executor = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker,
+            initargs=(self.parsers.rules,),
+        )
+        # Criar os processos agora, não no primeiro lote grande
+        self.executor.submit(int).result()
+
+    def parse(self, messages):
+        if self.executor is None or len(messages) < self.min_batch:
+            return self.parsers.parse(messages)
+        size = -(-len(messages) // self.workers)
+        chunks = [messages[i:i + size] for i in range(0, len(messages), size)]
+        parsed = []
+        for part in self.executor.map(_parse_chunk, chunks):
+            parsed += part
+        return parsed
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
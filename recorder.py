@@ -0,0 +1,208 @@
+# Gravação e reprodução do fluxo MQTT bruto. A gravação entra numa fila em
+# memória (não bloqueia a thread de rede) e uma thread grava em segmentos
+# gzip append-only, rotacionados por tamanho e idade. A reprodução devolve as
+# mensagens ao pipeline de ingestão em tempo real, N vezes mais rápido ou o
+# mais rápido possível.
+#   python recorder.py recordings/               # resumo dos segmentos
+#   python recorder.py recordings/ --dump        # tópico e payload de cada registro
+from collections import deque
+import gzip
+import heapq
+import os
+import struct
+import sys
+import threading
+import time
+
+# Registro: timestamp de recebimento, tamanho do tópico, tamanho do payload
+HEADER = struct.Struct('<dHI')
+SEGMENT_SUFFIX = '.mqtt.gz'
+
+
+def segment_name(start, worker_id):
+    return f"{int(start * 1000):016d}-w{worker_id}{SEGMENT_SUFFIX}"
+
+
+def list_segments(directory):
+    # {worker: [caminhos em ordem de início]}
+    segments = {}
+    if not os.path.isdir(directory):
+        return segments
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(SEGMENT_SUFFIX):
+            continue
+        worker = name[:-len(SEGMENT_SUFFIX)].rpartition('-w')[2]
+        segments.setdefault(worker, []).append(os.path.join(directory, name))
+    return segments
+
+
+class Recorder:
+    def __init__(self, directory, worker_id=0, segment_bytes=64 * 1024 * 1024, segment_seconds=3600,
+                 keep_segments=168, capacity=100000, flush_interval=0.5):
+        self.directory = directory
+        self.worker_id = worker_id
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.keep_segments = keep_segments
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.pending = deque()
+        self.recorded = 0
+        self.dropped = 0
+        self.file = None
+        self.gzip = None
+        self.segment_start = None
+        self.write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, topic, payload, timestamp):
+        # Chamado na thread de rede: só enfileira (descarta se o disco não acompanhar)
+        if len(self.pending) >= self.capacity:
+            self.dropped += 1
+            return
+        self.pending.append((timestamp, topic, payload))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self.write_lock:
+            pending = self.pending
+            if not pending:
+                return 0
+            chunk = bytearray()
+            count = 0
+            first_ts = pending[0][0]
+            while pending:
+                timestamp, topic, payload = pending.popleft()
+                topic = topic.encode()
+                chunk += HEADER.pack(timestamp, len(topic), len(payload))
+                chunk += topic
+                chunk += payload
+                count += 1
+            try:
+                self._rotate(first_ts)
+                self.gzip.write(chunk)
+                # Sync flush: o que já foi gravado é legível mesmo após uma queda
+                self.gzip.flush()
+                self.recorded += count
+            except OSError as e:
+                self.dropped += count
+                print(f"Erro ao gravar mensagens em {self.directory}: {e}")
+            return count
+
+    def _rotate(self, timestamp):
+        if self.gzip is not None:
+            if (self.file.tell() < self.segment_bytes
+                    and timestamp < self.segment_start + self.segment_seconds):
+                return
+            self._close_segment()
+        self.segment_start = timestamp
+        self.file = open(os.path.join(self.directory, segment_name(timestamp, self.worker_id)), 'ab')
+        self.gzip = gzip.GzipFile(fileobj=self.file, mode='ab', compresslevel=6)
+        self._enforce_retention()
+
+    def _close_segment(self):
+        try:
+            self.gzip.close()
+            self.file.close()
+        except OSError as e:
+            print(f"Erro ao fechar segmento de gravação: {e}")
+        self.gzip = None
+        self.file = None
+
+    def _enforce_retention(self):
+        segments = list_segments(self.directory).get(str(self.worker_id), [])
+        for path in segments[:-self.keep_segments] if self.keep_segments else []:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Erro ao remover segmento de gravação {path}: {e}")
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        with self.write_lock:
+            if self.gzip is not None:
+                self._close_segment()
+
+
+def read_segment(path):
+    # Gera (timestamp, tópico, payload); um segmento interrompido por uma
+    # queda termina no último registro completo
+    try:
+        with gzip.open(path, 'rb') as f:
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return
+                timestamp, topic_length, payload_length = HEADER.unpack(header)
+                data = f.read(topic_length + payload_length)
+                if len(data) < topic_length + payload_length:
+                    return
+                yield timestamp, data[:topic_length].decode(), data[topic_length:]
+    except EOFError:
+        # Segmento ainda aberto (ou interrompido): sem o final do gzip
+        return
+    except OSError as e:
+        print(f"Erro ao ler segmento de gravação {path}: {e}")
+
+
+def _read_worker(paths, start, end):
+    for path in paths:
+        for record in read_segment(path):
+            if start is not None and record[0] < start:
+                continue
+            if end is not None and record[0] > end:
+                return
+            yield record
+
+
+def read_records(directory, start=None, end=None):
+    # Registros de todos os workers intercalados por timestamp
+    streams = [_read_worker(paths, start, end) for paths in list_segments(directory).values()]
+    return heapq.merge(*streams, key=lambda record: record[0])
+
+
+def replay(records, ingest, speed=1.0, original_timestamps=False, stop=None):
+    # speed: 1 = tempo real, N = N vezes mais rápido, 0 = sem espera.
+    # Com original_timestamps as mensagens mantêm o instante gravado (backfill
+    # do histórico); sem, entram com o instante atual (teste de carga).
+    count = 0
+    first_ts = None
+    started = time.monotonic()
+    for timestamp, topic, payload in records:
+        if stop is not None and stop.is_set():
+            break
+        if speed > 0:
+            if first_ts is None:
+                first_ts = timestamp
+            delay = started + (timestamp - first_ts) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        ingest(topic, payload, timestamp if original_timestamps else None)
+        count += 1
+    return count
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        raise SystemExit("Uso: python recorder.py <diretório> [--dump]")
+    directory = sys.argv[1]
+    if '--dump' in sys.argv:
+        for timestamp, topic, payload in read_records(directory):
+            print(f"{timestamp:.6f} {topic} {payload.decode(errors='replace')}")
+    else:
+        for worker, paths in sorted(list_segments(directory).items()):
+            for path in paths:
+                records = list(read_segment(path))
+                span = f"{records[0][0]:.3f} .. {records[-1][0]:.3f}" if records else "vazio"
+                print(f"w{worker} {os.path.basename(path)}: {len(records)} registros, {span}")
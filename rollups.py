@@ -0,0 +1,141 @@
+# Agregados incrementais por faixa de tempo (min/max/soma/contagem) e
+# redução de pontos para consultas de períodos longos
+import math
+import struct
+
+# Registro de agregado: início do bucket, min, max, soma, contagem
+ROLLUP_RECORD = struct.Struct('<ddddq')
+
+# (nome, largura do bucket em s, duração do segmento em s, multiplicador da retenção)
+TIERS = (
+    ('1s', 1, 86400, 1),
+    ('1m', 60, 30 * 86400, 4),
+    ('1h', 3600, 365 * 86400, 40),
+)
+TIER_WIDTHS = {name: width for name, width, _, _ in TIERS}
+
+
+class Bucket:
+    __slots__ = ('start', 'min', 'max', 'sum', 'count')
+
+    def __init__(self, start, value):
+        self.start = start
+        self.min = value
+        self.max = value
+        self.sum = value
+        self.count = 1
+
+    def add(self, value):
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.sum += value
+        self.count += 1
+
+    def row(self):
+        return (self.start, self.min, self.max, self.sum, self.count)
+
+
+class Rollups:
+    # Buckets abertos de um tópico; ao virar o bucket, o anterior é gravado
+    __slots__ = ('series', 'open')
+
+    def __init__(self, series):
+        # series: {nome da faixa: Series com ROLLUP_RECORD}
+        self.series = series
+        self.open = {}
+
+    def add(self, timestamp, value):
+        if value != value or value in (math.inf, -math.inf):
+            return
+        for name, width, _, _ in TIERS:
+            start = timestamp - timestamp % width
+            bucket = self.open.get(name)
+            if bucket is None or start > bucket.start:
+                if bucket is not None:
+                    self.series[name].append(*bucket.row())
+                self.open[name] = Bucket(start, value)
+            else:
+                bucket.add(value)
+
+    def flush_open(self):
+        # Grava buckets abertos (ex.: no desligamento)
+        for name, bucket in self.open.items():
+            self.series[name].append(*bucket.row())
+        self.open.clear()
+
+
+def merge_rows(rows):
+    # Funde buckets repetidos (mesmo início), ex.: bucket reaberto após reinício
+    current = None
+    for row in rows:
+        if current is not None and row[0] == current[0]:
+            current = (current[0], min(current[1], row[1]), max(current[2], row[2]),
+                       current[3] + row[3], current[4] + row[4])
+            continue
+        if current is not None:
+            yield current
+        current = row
+    if current is not None:
+        yield current
+
+
+def choose_tier(start, end, max_points):
+    # Faixa mais fina cujo número de buckets cabe em max_points (None = dados brutos)
+    span = end - start
+    if span <= max_points:
+        return None
+    for name, width, _, _ in TIERS:
+        if span / width <= max_points:
+            return name
+    return TIERS[-1][0]
+
+
+def lttb(points, threshold):
+    # Largest-Triangle-Three-Buckets sobre [(ts, valor), ...] numéricos
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Média do próximo bucket
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        avg_len = avg_end - avg_start
+        avg_x = avg_y = 0.0
+        for j in range(avg_start, avg_end):
+            avg_x += points[j][0]
+            avg_y += points[j][1]
+        avg_x /= avg_len
+        avg_y /= avg_len
+
+        # Ponto do bucket atual que forma o maior triângulo
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        ax, ay = points[a][0], points[a][1]
+        max_area = -1.0
+        chosen = range_start
+        for j in range(range_start, range_end):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                chosen = j
+        sampled.append(points[chosen])
+        a = chosen
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def downsample(rows, max_points):
+    # LTTB quando a série é numérica; amostragem uniforme caso contrário
+    if len(rows) <= max_points:
+        return rows
+    if all(not isinstance(row[1], str) for row in rows):
+        return lttb(rows, max_points)
+    step = len(rows) / max_points
+    return [rows[int(i * step)] for i in range(max_points)]
@@ -0,0 +1,567 @@
+# Armazenamento persistente de histórico: um diretório por tópico com
+# segmentos append-only de registros de tamanho fixo, lidos via mmap
+import bisect
+import hashlib
+import itertools
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from urllib.parse import quote, unquote
+
+from rollups import ROLLUP_RECORD, TIERS, Rollups, merge_rows
+
+# Registro bruto: timestamp, valor numérico, offset do texto no .txt (-1 se numérico)
+RAW_RECORD = struct.Struct('<ddq')
+TEXT_LENGTH = struct.Struct('<I')
+SEGMENT_SUFFIX = '.seg'
+TEXT_SUFFIX = '.txt'
+TOPIC_FILE = 'topic'
+TIER_SPANS = {name: span for name, _, span, _ in TIERS}
+
+
+class _Timestamps:
+    # Visão dos timestamps de um segmento mapeado, para busca binária sem cópia
+    __slots__ = ('buf', 'size')
+
+    def __init__(self, buf, size):
+        self.buf = buf
+        self.size = size
+
+    def __len__(self):
+        return len(self.buf) // self.size
+
+    def __getitem__(self, i):
+        return struct.unpack_from('<d', self.buf, i * self.size)[0]
+
+
+class Segment:
+    # committed: bytes já gravados e visíveis às leituras (o flush grava fora
+    # do lock da série e só então avança este limite)
+    __slots__ = ('start', 'path', 'committed')
+
+    def __init__(self, start, path, committed=0):
+        self.start = start
+        self.path = path
+        self.committed = committed
+
+    @property
+    def text_path(self):
+        return self.path[:-len(SEGMENT_SUFFIX)] + TEXT_SUFFIX
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+
+class Series:
+    # Série de um tópico. Escritas ficam pendentes em memória e vão para o
+    # disco em lote no flush; leituras combinam segmentos e pendências.
+    # lock protege o estado em memória (pendências, lista de segmentos) e
+    # nunca é segurado durante I/O do flush; io_lock serializa as escritas
+    # em disco (flush, retenção, compactação).
+    def __init__(self, directory, record=RAW_RECORD, segment_span=86400, unique=False):
+        self.directory = directory
+        self.record = record
+        self.segment_span = segment_span
+        # Série bruta: um registro por instante. Agregados podem repetir o
+        # início do bucket (bucket reaberto após reinício, ver merge_rows).
+        self.unique = unique
+        self.lock = threading.RLock()
+        self.io_lock = threading.Lock()
+        self.pending = []
+        # Pendências em gravação pelo flush, ainda visíveis às leituras
+        self.flushing = []
+        self.last_ts = None
+        self._segments = None
+        # Leituras em andamento e segmentos fora da lista (compactação,
+        # retenção) cujos arquivos só são removidos quando elas terminam
+        self.readers = 0
+        self.retired = []
+
+    @property
+    def segments(self):
+        if self._segments is None:
+            self._segments = self._load_segments()
+        return self._segments
+
+    def _load_segments(self):
+        segments = []
+        if not os.path.isdir(self.directory):
+            return segments
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            start, _, generation = name[:-len(SEGMENT_SUFFIX)].partition('-')
+            try:
+                found.append((int(start) / 1000.0, int(generation or 0), os.path.join(self.directory, name)))
+            except ValueError:
+                continue
+        found.sort()
+        # Compactação interrompida antes de remover os originais: a fusão
+        # (geração > 0) substitui o segmento de mesmo início e já contém os
+        # seguintes até o seu último registro
+        merged_until = None
+        for start, generation, path in found:
+            segment = Segment(start, path)
+            if segments and segments[-1].start == start:
+                _remove_segment(segments[-1])
+                segments[-1] = segment
+            elif merged_until is not None and start <= merged_until:
+                _remove_segment(segment)
+                continue
+            else:
+                segments.append(segment)
+            merged_until = self._last_timestamp(segment) if generation else None
+
+        if segments:
+            # Descartar registro parcial deixado por uma queda no meio da escrita
+            last = segments[-1]
+            size = last.size()
+            whole = size - size % self.record.size
+            if whole != size:
+                with open(last.path, 'r+b') as f:
+                    f.truncate(whole)
+            self.last_ts = self._last_timestamp(last)
+        for segment in segments:
+            segment.committed = segment.size()
+        return segments
+
+    def _last_timestamp(self, segment):
+        size = segment.size()
+        if size < self.record.size:
+            return None
+        with open(segment.path, 'rb') as f:
+            f.seek(size - self.record.size)
+            return struct.unpack('<d', f.read(8))[0]
+
+    def append(self, timestamp, *values):
+        with self.lock:
+            if self._segments is None:
+                # last_ts vem do disco: carregar antes do primeiro registro,
+                # senão a carga sobrescreveria o last_ts deste append
+                self._segments = self._load_segments()
+            # Registros precisam estar ordenados para a busca binária: o que
+            # vier antes do último gravado fica de fora (False), sem mudar o
+            # instante do registro
+            if self.last_ts is not None and (timestamp < self.last_ts or
+                                             self.unique and timestamp == self.last_ts):
+                return False
+            self.last_ts = timestamp
+            self.pending.append((timestamp,) + values)
+            return True
+
+    def _new_segment(self, start):
+        os.makedirs(self.directory, exist_ok=True)
+        segment = Segment(start, os.path.join(self.directory, segment_name(start)))
+        with self.lock:
+            self.segments.append(segment)
+        return segment
+
+    def flush(self):
+        with self.io_lock:
+            with self.lock:
+                if not self.pending:
+                    return 0
+                pending, self.pending = self.pending, []
+                self.flushing = pending
+                segments = self.segments
+            # Grava fora do lock: append no dispatcher não espera o disco
+            written = []
+            writing = None
+            count = len(pending)
+            i = 0
+            try:
+                while i < count:
+                    segment = segments[-1] if segments else None
+                    if segment is None or pending[i][0] >= segment.start + self.segment_span:
+                        segment = self._new_segment(pending[i][0])
+                    end_ts = segment.start + self.segment_span
+                    j = i
+                    while j < count and pending[j][0] < end_ts:
+                        j += 1
+                    written.append(segment)
+                    writing = segment
+                    self._write(segment, pending[i:j])
+                    writing = None
+                    i = j
+            except OSError:
+                # Segmento de volta ao tamanho confirmado, sem registro
+                # parcial no meio do arquivo
+                if writing is not None and os.path.exists(writing.path):
+                    try:
+                        os.truncate(writing.path, writing.committed)
+                    except OSError:
+                        pass
+                raise
+            finally:
+                with self.lock:
+                    for segment in written:
+                        segment.committed = segment.size()
+                    self.flushing = []
+                    # O que não foi gravado volta para a frente das
+                    # pendências; o próximo flush tenta de novo
+                    if i < count:
+                        self.pending = pending[i:] + self.pending
+            return count
+
+    def _write(self, segment, rows):
+        record = self.record
+        if record is RAW_RECORD:
+            text_rows = []
+            text_offset = None
+            packed = bytearray()
+            for ts, value in rows:
+                if isinstance(value, str):
+                    if text_offset is None:
+                        text_offset = os.path.getsize(segment.text_path) if os.path.exists(segment.text_path) else 0
+                    data = value.encode()
+                    packed += record.pack(ts, math.nan, text_offset)
+                    text_rows.append(TEXT_LENGTH.pack(len(data)) + data)
+                    text_offset += TEXT_LENGTH.size + len(data)
+                else:
+                    packed += record.pack(ts, value, -1)
+            if text_rows:
+                with open(segment.text_path, 'ab') as f:
+                    f.write(b''.join(text_rows))
+        else:
+            packed = b''.join(record.pack(*row) for row in rows)
+        with open(segment.path, 'ab') as f:
+            f.write(packed)
+
+    def _decode(self, buf, offset, text_buf):
+        row = self.record.unpack_from(buf, offset)
+        if self.record is RAW_RECORD:
+            ts, value, text_offset = row
+            if text_offset >= 0 and text_buf is not None:
+                length = TEXT_LENGTH.unpack_from(text_buf, text_offset)[0]
+                start = text_offset + TEXT_LENGTH.size
+                value = text_buf[start:start + length].decode(errors='replace')
+            return ts, value
+        return row
+
+    def _scan(self, segment, start, end, last=None, size=None):
+        # size: bytes a considerar (padrão: os já confirmados pelo flush)
+        size = segment.committed if size is None else size
+        if size < self.record.size:
+            return
+        rec_size = self.record.size
+        with open(segment.path, 'rb') as f, mmap.mmap(f.fileno(), size - size % rec_size, access=mmap.ACCESS_READ) as buf:
+            timestamps = _Timestamps(buf, rec_size)
+            lo = 0 if start is None else bisect.bisect_left(timestamps, start)
+            hi = len(timestamps) if end is None else bisect.bisect_right(timestamps, end)
+            if last is not None:
+                lo = max(lo, hi - last)
+            if lo >= hi:
+                return
+            text_buf = None
+            text_file = None
+            if self.record is RAW_RECORD and os.path.exists(segment.text_path) and os.path.getsize(segment.text_path):
+                text_file = open(segment.text_path, 'rb')
+                text_buf = mmap.mmap(text_file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for i in range(lo, hi):
+                    yield self._decode(buf, i * rec_size, text_buf)
+            finally:
+                if text_buf is not None:
+                    text_buf.close()
+                    text_file.close()
+
+    def query(self, start=None, end=None):
+        # Gera registros com start <= ts <= end, em ordem, sem carregar arquivos inteiros
+        with self.lock:
+            segments = [(segment, segment.committed) for segment in self.segments]
+            pending = self.flushing + self.pending
+            self.readers += 1
+        try:
+            if segments:
+                starts = [s.start for s, _ in segments]
+                first = 0 if start is None else max(0, bisect.bisect_right(starts, start) - 1)
+                last = len(segments) if end is None else bisect.bisect_right(starts, end)
+                for segment, size in segments[first:last]:
+                    yield from self._scan(segment, start, end, size=size)
+        finally:
+            self._release()
+        for row in pending:
+            if (start is None or row[0] >= start) and (end is None or row[0] <= end):
+                yield row
+
+    def tail(self, count):
+        # Últimos registros, lendo segmentos do fim para o começo
+        with self.lock:
+            segments = [(segment, segment.committed) for segment in self.segments]
+            rows = (self.flushing + self.pending)[-count:]
+            self.readers += 1
+        try:
+            for segment, size in reversed(segments):
+                if len(rows) >= count:
+                    break
+                rows = list(self._scan(segment, None, None, last=count - len(rows), size=size)) + rows
+        finally:
+            self._release()
+        return rows[-count:] if count else []
+
+    def _release(self):
+        # Fim de uma leitura: a última remove os arquivos aposentados
+        with self.lock:
+            self.readers -= 1
+            if self.readers or not self.retired:
+                return
+            retired, self.retired = self.retired, []
+        for segment in retired:
+            _remove_segment(segment)
+
+    def _retire(self, segments):
+        # Segmentos já fora da lista: remove agora ou depois da última leitura
+        with self.lock:
+            self.retired += segments
+            if self.readers:
+                return
+            retired, self.retired = self.retired, []
+        for segment in retired:
+            _remove_segment(segment)
+
+    def enforce_retention(self, cutoff):
+        # Remove segmentos inteiramente anteriores ao corte
+        with self.io_lock:
+            with self.lock:
+                segments = self.segments
+                expired = 0
+                while expired < len(segments):
+                    if expired + 1 < len(segments):
+                        if segments[expired + 1].start > cutoff:
+                            break
+                    elif self.pending or self.last_ts is None or self.last_ts >= cutoff:
+                        break
+                    expired += 1
+                removed = segments[:expired]
+                del segments[:expired]
+            self._retire(removed)
+            return expired
+
+    def compact(self, min_size, max_size):
+        # Funde segmentos fechados pequenos e vizinhos em um só. A fusão vai
+        # para arquivos novos sem segurar o lock da série (append e leituras
+        # seguem); só a troca na lista é feita sob o lock, e os arquivos
+        # antigos saem quando as leituras que os usam terminam.
+        with self.io_lock:
+            with self.lock:
+                segments = list(self.segments)
+            groups = []
+            i = 0
+            while i < len(segments) - 2:
+                group = [segments[i]]
+                total = segments[i].size()
+                j = i + 1
+                # O último segmento continua aberto para escrita
+                while j < len(segments) - 1 and total < max_size and segments[j].size() < min_size:
+                    if group[0].size() >= min_size:
+                        break
+                    group.append(segments[j])
+                    total += segments[j].size()
+                    j += 1
+                if len(group) > 1:
+                    groups.append(group)
+                i = j
+            merges = [(group, self._merge(group)) for group in groups]
+            if not merges:
+                return 0
+            with self.lock:
+                segments = self.segments
+                for group, merged in merges:
+                    i = segments.index(group[0])
+                    segments[i:i + len(group)] = [merged]
+            self._retire([segment for group, _ in merges for segment in group])
+            return sum(len(group) - 1 for group, _ in merges)
+
+    def _merge(self, group):
+        # Grava a fusão num segmento novo (geração seguinte, mesmo início);
+        # os arquivos do grupo ficam intactos para as leituras em andamento
+        rows = [row for segment in group for row in self._scan(segment, None, None)]
+        start = group[0].start
+        generation = 1
+        while os.path.exists(os.path.join(self.directory, segment_name(start, generation))):
+            generation += 1
+        merged = Segment(start, os.path.join(self.directory, segment_name(start, generation)))
+        tmp = Segment(start, merged.path[:-len(SEGMENT_SUFFIX)] + '.tmp' + SEGMENT_SUFFIX)
+        _remove_segment(tmp)
+        self._write(tmp, rows)
+        # Texto antes dos registros: o segmento só aparece completo
+        if os.path.exists(tmp.text_path):
+            os.replace(tmp.text_path, merged.text_path)
+        os.replace(tmp.path, merged.path)
+        merged.committed = merged.size()
+        return merged
+
+
+def segment_name(start, generation=0):
+    # Geração > 0: segmento refeito pela compactação
+    name = f"{int(start * 1000):016d}"
+    return (f"{name}-{generation}" if generation else name) + SEGMENT_SUFFIX
+
+
+def _remove_segment(segment):
+    _remove(segment.path)
+    _remove(segment.text_path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def topic_dirname(topic):
+    name = quote(topic, safe='')
+    if len(name) > 200 or name in ('', '.', '..'):
+        return hashlib.sha1(topic.encode()).hexdigest()
+    return name
+
+
+class HistoryStore:
+    def __init__(self, root, segment_span=86400, retention=90 * 86400,
+                 flush_interval=2.0, maintenance_interval=3600,
+                 compact_min_size=64 * 1024, compact_max_size=8 * 1024 * 1024, owns=None):
+        self.root = root
+        # No cluster, só o worker dono do tópico faz a manutenção dos arquivos
+        self.owns = owns
+        self.segment_span = segment_span
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.maintenance_interval = maintenance_interval
+        self.compact_min_size = compact_min_size
+        self.compact_max_size = compact_max_size
+        # (tópico, faixa) -> Series; faixa None é a série bruta
+        self.series = {}
+        self.rollups = {}
+        self.rejected = 0
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(root, exist_ok=True)
+
+    def get_series(self, topic, tier=None, create=True):
+        key = (topic, tier)
+        series = self.series.get(key)
+        if series is None:
+            topic_dir = os.path.join(self.root, topic_dirname(topic))
+            directory = topic_dir if tier is None else os.path.join(topic_dir, tier)
+            if not create and not os.path.isdir(topic_dir):
+                return None
+            with self.lock:
+                series = self.series.get(key)
+                if series is None:
+                    if tier is None:
+                        series = Series(directory, segment_span=self.segment_span, unique=True)
+                    else:
+                        series = Series(directory, ROLLUP_RECORD, TIER_SPANS[tier])
+                    if create and not os.path.isdir(topic_dir):
+                        os.makedirs(topic_dir, exist_ok=True)
+                        if topic_dirname(topic) != quote(topic, safe=''):
+                            with open(os.path.join(topic_dir, TOPIC_FILE), 'w') as f:
+                                f.write(topic)
+                    self.series[key] = series
+        return series
+
+    def _topic_for_dir(self, name):
+        topic_file = os.path.join(self.root, name, TOPIC_FILE)
+        if os.path.exists(topic_file):
+            with open(topic_file) as f:
+                return f.read()
+        return unquote(name)
+
+    def topics(self):
+        return [self._topic_for_dir(name) for name in os.listdir(self.root)
+                if os.path.isdir(os.path.join(self.root, name))]
+
+    def append(self, topic, timestamp, value):
+        # False se o registro é anterior ao último gravado do tópico (ex.:
+        # replay sobre um período já no histórico); não entra nos agregados
+        if not self.get_series(topic).append(timestamp, value):
+            self.rejected += 1
+            return False
+        if not isinstance(value, str):
+            rollups = self.rollups.get(topic)
+            if rollups is None:
+                rollups = self.rollups[topic] = Rollups(
+                    {name: self.get_series(topic, name) for name in TIER_SPANS})
+            rollups.add(timestamp, value)
+        return True
+
+    def query(self, topic, start=None, end=None):
+        series = self.get_series(topic, create=False)
+        if series is None:
+            return iter(())
+        return series.query(start, end)
+
+    def rollup_query(self, topic, tier, start=None, end=None):
+        # Gera (início do bucket, min, max, média, contagem), incluindo o bucket aberto
+        series = self.get_series(topic, tier, create=False)
+        if series is None:
+            return
+        rows = series.query(start, end)
+        rollups = self.rollups.get(topic)
+        bucket = rollups.open.get(tier) if rollups is not None else None
+        if bucket is not None and (start is None or bucket.start >= start) and (end is None or bucket.start <= end):
+            rows = itertools.chain(rows, [bucket.row()])
+        for ts, low, high, total, count in merge_rows(rows):
+            yield ts, total / count, low, high, count
+
+    def tail(self, topic, count):
+        series = self.get_series(topic, create=False)
+        if series is None:
+            return []
+        return series.tail(count)
+
+    def flush(self):
+        written = 0
+        for series in list(self.series.values()):
+            try:
+                written += series.flush()
+            except OSError as e:
+                print(f"Erro ao gravar histórico em {series.directory}: {e}")
+        return written
+
+    def maintenance(self, now=None):
+        now = now or time.time()
+        for name in os.listdir(self.root):
+            directory = os.path.join(self.root, name)
+            if not os.path.isdir(directory):
+                continue
+            topic = self._topic_for_dir(name)
+            if self.owns is not None and not self.owns(topic):
+                continue
+            retentions = [(None, self.retention)]
+            retentions += [(tier, self.retention * factor) for tier, _, _, factor in TIERS]
+            for tier, retention in retentions:
+                series = self.get_series(topic, tier)
+                try:
+                    series.enforce_retention(now - retention)
+                    series.compact(self.compact_min_size, self.compact_max_size)
+                except OSError as e:
+                    print(f"Erro na manutenção do histórico em {series.directory}: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        next_maintenance = time.monotonic()
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if time.monotonic() >= next_maintenance:
+                self.maintenance()
+                next_maintenance = time.monotonic() + self.maintenance_interval
+
+    def close(self):
+        self._stop.set()
+        for rollups in list(self.rollups.values()):
+            rollups.flush_open()
+        self.flush()
@@ -0,0 +1,26 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# Módulos do painel ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def dashboard(tmp_path_factory):
+    # app.py sobe no modo threading ao ser importado: rodar num diretório
+    # temporário (arquivos de configuração e estado são relativos) e em modo
+    # replay com diretório vazio, para não conectar ao broker
+    directory = tmp_path_factory.mktemp('dashboard')
+    (directory / 'replay').mkdir()
+    cwd = os.getcwd()
+    os.chdir(directory)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('BIFROST_REPLAY_DIR', str(directory / 'replay'))
+        patch.setenv('BIFROST_INGEST_CAPACITY', '50')
+        patch.setenv('BIFROST_INGEST_TOPIC_CAPACITY', '10')
+        module = importlib.import_module('app')
+    yield module
+    os.chdir(cwd)
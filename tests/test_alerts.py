@@ -0,0 +1,40 @@
+import json
+
+from alerts import AlertHistory, AlertRules
+
+
+def test_threshold_fires_once_and_resolves():
+    rules = AlertRules([{'name': 'quente', 'pattern': 'casa/+/temp', 'type': 'threshold', 'above': 30}])
+    assert rules.evaluate('casa/sala/temp', 25.0, 1.0) == []
+    fired = rules.evaluate('casa/sala/temp', 31.0, 2.0)
+    assert [(alert['rule'], alert['state']) for alert in fired] == [('quente', 'firing')]
+    assert rules.evaluate('casa/sala/temp', 32.0, 3.0) == []
+    assert [alert['state'] for alert in rules.evaluate('casa/sala/temp', 20.0, 4.0)] == ['resolved']
+    assert rules.evaluate('casa/sala/umidade', 99.0, 5.0) == []
+
+
+def test_history_writes_behind_extend(tmp_path):
+    path = str(tmp_path / 'alerts.jsonl')
+    history = AlertHistory(limit=2, path=path)
+    history.extend([{'topic': 'a', 'n': 1}, {'topic': 'b', 'n': 2}])
+    # extend não toca no arquivo: a gravação é do flush (thread de start())
+    assert not (tmp_path / 'alerts.jsonl').exists()
+    history.flush()
+    history.extend([{'topic': 'a', 'n': 3}, {'topic': 'a', 'n': 4}, {'topic': 'a', 'n': 5}])
+    history.close()
+    # Passou do dobro do limite: arquivo reescrito só com os últimos
+    with open(path) as f:
+        assert [json.loads(line)['n'] for line in f] == [4, 5]
+    assert [alert['n'] for alert in AlertHistory(limit=2, path=path).latest()] == [5, 4]
+    assert history.latest(matches=lambda topic: topic == 'b') == []
+
+
+def test_batch_alerts_go_out_in_one_event(dashboard, monkeypatch):
+    monkeypatch.setattr(dashboard, 'alert_rules', AlertRules([
+        {'name': 'alto', 'pattern': 'lote-alerta/#', 'type': 'threshold', 'above': 10},
+    ]))
+    emitted = []
+    monkeypatch.setattr(dashboard, 'emit_to', lambda event, data, room=None, callback=None: emitted.append((event, data)))
+    dashboard.Batcher().add([('lote-alerta/a', '11', 1000.0), ('lote-alerta/b', '12', 1000.0)])
+    assert [(event, [alert['topic'] for alert in data]) for event, data in emitted] == [
+        ('alerts', ['lote-alerta/a', 'lote-alerta/b'])]
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from ingest import IngestBuffer
+
+
+@pytest.fixture
+def asgi(dashboard, monkeypatch):
+    module = pytest.importorskip('asgi')
+    emitted = []
+
+    async def emit(event, data, to=None, skip_sid=None, **kwargs):
+        emitted.append((event, data, to))
+
+    async def room_change(sid, room):
+        pass
+
+    monkeypatch.setattr(module.sio, 'emit', emit)
+    monkeypatch.setattr(module.sio, 'enter_room', room_change)
+    monkeypatch.setattr(module.sio, 'leave_room', room_change)
+    # Fila própria: a do modo threading já tem consumidor
+    monkeypatch.setattr(dashboard, 'message_queue', IngestBuffer(capacity=50, topic_capacity=10))
+    module.emitted = emitted
+    return module
+
+
+def test_dispatch_emits_subscribed_topics(asgi, dashboard):
+    async def scenario():
+        await asgi.connect('asgi-sid', {})
+        await asgi.subscribe('asgi-sid', {'topics': ['asgi/#']})
+        ready = asyncio.Event()
+        dashboard.message_queue.set_wakeup(ready.set)
+        task = asyncio.create_task(asgi.dispatch(ready))
+        dashboard.ingest_message('asgi/sala/temp', b'21.5')
+        dashboard.ingest_message('outro/topico', b'1')
+        for _ in range(200):
+            if any(event == 'mqtt_batch' for event, _, _ in asgi.emitted):
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asgi.disconnect('asgi-sid')
+
+    asyncio.run(scenario())
+    batches = [(data, room) for event, data, room in asgi.emitted if event == 'mqtt_batch']
+    assert len(batches) == 1
+    entries, room = batches[0]
+    assert [topic for topic, _ in entries] == ['asgi/sala/temp']
+    assert room == dashboard.room_name(('asgi/#',), 'json')
+    assert 'asgi-sid' not in dashboard.client_subscriptions
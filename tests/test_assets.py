@@ -0,0 +1,52 @@
+import gzip
+
+from assets import AssetStore, content_name
+
+
+def build_dir(tmp_path):
+    directory = tmp_path / 'static'
+    directory.mkdir()
+    (directory / 'index.html').write_bytes(b'<html></html>')
+    script = b'console.log(1)'
+    name = content_name('app.js', script)
+    (directory / name).write_bytes(script)
+    (directory / (name + '.gz')).write_bytes(gzip.compress(script))
+    (directory / 'manifest.json').write_text('{}')
+    return directory, name
+
+
+def test_built_store_loads_precompressed_assets(tmp_path):
+    directory, name = build_dir(tmp_path)
+    store = AssetStore(str(directory), str(tmp_path))
+    assert store.built
+    assert sorted(store.assets) == sorted(['index.html', name])
+    asset = store.get(name)
+    assert asset.mimetype == 'text/javascript'
+    assert asset.pick(lambda encoding: encoding == 'gzip')[0] == 'gzip'
+    assert asset.pick(lambda encoding: False) == (None, b'console.log(1)')
+
+
+def test_dev_store_stays_inside_source_dir(tmp_path):
+    source = tmp_path / 'frontend'
+    source.mkdir()
+    (source / 'app.js').write_bytes(b'1')
+    (tmp_path / 'segredo.txt').write_bytes(b'x')
+    store = AssetStore(str(tmp_path / 'static'), str(source))
+    assert not store.built
+    assert store.get('app.js').data == b'1'
+    assert store.get('../segredo.txt') is None
+
+
+def test_static_route_caches_and_revalidates(dashboard, tmp_path, monkeypatch):
+    directory, name = build_dir(tmp_path)
+    monkeypatch.setattr(dashboard, 'assets', AssetStore(str(directory), str(tmp_path)))
+    client = dashboard.app.test_client()
+    response = client.get(f'/static/{name}', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Cache-Control'] == dashboard.ASSET_CACHE_CONTROL
+    assert gzip.decompress(response.data) == b'console.log(1)'
+    etag = response.headers['ETag']
+    assert client.get(f'/static/{name}', headers={'If-None-Match': etag}).status_code == 304
+    page = client.get('/')
+    assert page.headers['Cache-Control'] == 'no-cache' and page.data == b'<html></html>'
+    assert client.get('/static/nada.js').status_code == 404
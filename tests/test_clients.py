@@ -0,0 +1,36 @@
+from clients import ClientQueues
+
+
+def test_unacked_first_probe_is_retried():
+    queues = ClientQueues(probe_interval=1.0, ack_timeout=10.0)
+    queues.add('s1', 'json', 0.0)
+    assert queues.poll(1.0) == [('probe', 's1')]
+    # Sem ack: nem rebaixado nem sondado de novo antes do prazo
+    assert queues.poll(5.0) == []
+    assert queues.poll(11.5) == [('probe', 's1')]
+    # O ack da sonda perdida não conta
+    assert queues.probe_acked('s1', 1.0, 11.6) is None
+    assert queues.probe_acked('s1', 11.5, 11.7) is not None
+    assert queues.clients['s1'].acks == 1
+
+
+def test_slow_ack_demotes_then_fast_acks_promote():
+    queues = ClientQueues(min_interval=0.05, slow_latency=0.5, probe_interval=1.0, recover_after=2)
+    queues.add('s1', 'json', 0.0)
+    assert queues.poll(1.0) == [('probe', 's1')]
+    queues.probe_acked('s1', 1.0, 1.1)
+    assert queues.poll(2.1) == [('probe', 's1')]
+    # Segunda sonda demora mais que slow_latency
+    assert queues.poll(2.7) == [('demote', 's1')]
+    assert queues.slow_count() == 1
+    now = 2.7
+    for _ in range(10):
+        now += 1.0
+        actions = queues.poll(now)
+        if actions == [('promote', 's1')]:
+            break
+        assert actions == [('flush', 's1')]
+        queues.flushed('s1', now, True)
+        queues.flush_acked('s1', now, now + 0.01)
+    assert actions == [('promote', 's1')]
+    assert queues.slow_count() == 0
@@ -0,0 +1,63 @@
+import queue
+import socket
+
+from cluster import Cluster, LocalBus, SocketBus
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_local_cluster_call_and_forward():
+    bus = LocalBus()
+    workers = [Cluster(worker_id, 2, bus) for worker_id in range(2)]
+    received = []
+    workers[1].on('ingest.1', received.append)
+    workers[1].handle('echo', lambda params: params['x'] * 2)
+    assert workers[0].call(1, 'echo', {'x': 21}) == 42
+    assert workers[0].forward(1, 'ingest', ['t', '1', 1.0])
+    assert received == [['t', '1', 1.0]]
+
+
+def test_socket_bus_round_trip_through_writer_thread():
+    address = f'tcp://127.0.0.1:{free_port()}'
+    first = SocketBus(address, start_hub=True)
+    second = SocketBus(address)
+    received = queue.Queue()
+    second.subscribe('ingest.1', received.put)
+    workers = [Cluster(0, 2, first), Cluster(1, 2, second)]
+    workers[1].handle('ping', lambda params: 'pong')
+    assert workers[0].call(1, 'ping', {}) == 'pong'
+    for i in range(100):
+        assert workers[0].forward(1, 'ingest', ['t', str(i), float(i), b'\x00'])
+    messages = [received.get(timeout=5) for _ in range(100)]
+    assert [message[1] for message in messages] == [str(i) for i in range(100)]
+    assert messages[0][3] == b'\x00'
+    first.close()
+    second.close()
+
+
+def test_publish_nowait_refuses_when_queue_is_full():
+    address = f'tcp://127.0.0.1:{free_port()}'
+    bus = SocketBus(address, start_hub=True)
+    # Fila cheia que a thread de escrita (esperando na fila original) não esvazia
+    bus.outgoing = queue.Queue(1)
+    bus.outgoing.put(b'ocupado')
+    assert bus.publish_nowait('canal', {'x': 1}) is False
+    bus.close()
+
+
+def test_subscribe_returns_after_hub_registration():
+    address = f'tcp://127.0.0.1:{free_port()}'
+    first = SocketBus(address, start_hub=True)
+    second = SocketBus(address)
+    for round in range(20):
+        received = queue.Queue()
+        # Sem espera: a confirmação do hub garante a entrega da publicação seguinte
+        second.subscribe(f'canal.{round}', received.put)
+        first.publish(f'canal.{round}', {'round': round})
+        assert received.get(timeout=5) == {'round': round}
+    first.close()
+    second.close()
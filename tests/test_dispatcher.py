@@ -0,0 +1,25 @@
+def test_take_never_exceeds_max_batch_size(dashboard, monkeypatch):
+    monkeypatch.setattr(dashboard, 'MAX_BATCH_SIZE', 3)
+    batcher = dashboard.Batcher()
+    batcher.add([(f'limite/{i}', str(i), 1000.0 + i) for i in range(7)])
+    assert batcher.due()
+    sizes = []
+    topics = []
+    while batcher.due():
+        batch, _ = batcher.take()
+        sizes.append(len(batch))
+        topics += batch
+    assert sizes == [3, 3, 1]
+    assert topics == [f'limite/{i}' for i in range(7)]
+    assert batcher.deadline is None
+
+
+def test_batch_keeps_latest_value_per_topic(dashboard):
+    batcher = dashboard.Batcher()
+    batcher.add([('coalesce/a', '1', 1000.0), ('coalesce/a', '2', 1001.0), ('coalesce/b', '3', 1001.5)])
+    batch, new_topics = batcher.take()
+    assert batch['coalesce/a']['payload'] == '2'
+    assert (batch['coalesce/a']['seq'], batch['coalesce/b']['seq']) == (2, 1)
+    assert new_topics == ['coalesce/a', 'coalesce/b']
+    _, values = dashboard.latest_values.snapshot(['coalesce/#'])
+    assert {topic: payload for topic, payload, _, _ in values} == {'coalesce/a': '2', 'coalesce/b': '3'}
@@ -0,0 +1,48 @@
+import io
+import json
+
+import pytest
+
+from export import csv_chunks, export_chunks, ndjson_chunks
+
+ROWS = [('casa/sala', 1000.0, 21.5), ('casa/sala', 1001.0, float('nan')), ('casa/porta', 1002.0, 'aberta')]
+
+
+def test_csv_is_streamed_in_chunks():
+    rows = [('casa/sala', float(i), float(i)) for i in range(1000)]
+    chunks = list(csv_chunks(iter(rows), chunk_size=1024))
+    assert len(chunks) > 1 and all(len(chunk) < 2048 for chunk in chunks)
+    lines = b''.join(chunks).decode().splitlines()
+    assert lines[0] == 'topic,timestamp,value'
+    assert lines[1] == 'casa/sala,0.0,0.0' and len(lines) == 1001
+
+
+def test_ndjson_writes_non_finite_as_null():
+    lines = b''.join(ndjson_chunks(iter(ROWS))).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {'topic': 'casa/sala', 'timestamp': 1000.0, 'value': 21.5},
+        {'topic': 'casa/sala', 'timestamp': 1001.0, 'value': None},
+        {'topic': 'casa/porta', 'timestamp': 1002.0, 'value': 'aberta'},
+    ]
+
+
+def test_parquet_splits_numbers_and_text():
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+    data = b''.join(export_chunks(iter(ROWS), 'parquet'))
+    table = pyarrow.parquet.read_table(io.BytesIO(data))
+    assert table.column('topic').to_pylist() == ['casa/sala', 'casa/sala', 'casa/porta']
+    assert table.column('value').to_pylist()[0] == 21.5
+    assert table.column('text').to_pylist() == [None, None, 'aberta']
+
+
+def test_export_endpoint(dashboard):
+    dashboard.Batcher().add([('exporta/sala', str(i), 2000.0 + i) for i in range(3)])
+    client = dashboard.app.test_client()
+    response = client.get('/export?topic=exporta/%2B&format=ndjson&from=2001')
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'bifrost-export.ndjson' in response.headers['Content-Disposition']
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(row['topic'], row['value']) for row in rows] == [('exporta/sala', 1.0), ('exporta/sala', 2.0)]
+    assert client.get('/export?topic=exporta/sala&format=xml').status_code == 400
+    assert client.get('/export').status_code == 400
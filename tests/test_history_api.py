@@ -0,0 +1,15 @@
+def test_get_histories_pairs_cursors_positionally(dashboard):
+    batcher = dashboard.Batcher()
+    batcher.add([(topic, str(i), 1000.0 + i) for i in range(3) for topic in ('hist/a', 'hist/b')])
+    client = dashboard.app.test_client()
+    # since só depois do segundo tópico: vale para ele, não para o primeiro
+    body = client.get('/get_histories?topic=hist/a&topic=hist/b&since=2').json
+    first, second = body['histories']['hist/a'], body['histories']['hist/b']
+    assert (len(first['history']), first['reset']) == (3, True)
+    assert (second['history'], second['reset']) == ([[1002.0, 2.0]], False)
+
+
+def test_get_histories_rejects_bad_cursor(dashboard):
+    client = dashboard.app.test_client()
+    assert client.get('/get_histories?topic=hist/a&since=abc').status_code == 400
+    assert client.get('/get_histories?since=3&topic=hist/a').status_code == 400
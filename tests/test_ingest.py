@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from ingest import COALESCE, DROP_OLDEST, SAMPLE, IngestBuffer
+
+
+def topics(items):
+    return [(topic, payload) for topic, payload, _ in items]
+
+
+def test_topic_capacity_one_keeps_latest():
+    buf = IngestBuffer(capacity=10, topic_capacity=1)
+    buf.put('a', b'1')
+    buf.put('a', b'2')
+    assert list(buf._order) == ['a']
+    assert topics(buf.get(timeout=0)) == [('a', b'2')]
+    assert buf.dropped == 1
+    # O buffer continua utilizável depois do descarte
+    buf.put('a', b'3')
+    assert topics(buf.get(timeout=0)) == [('a', b'3')]
+
+
+def test_drop_oldest_evicts_across_topics():
+    buf = IngestBuffer(capacity=2, topic_capacity=10, policy=DROP_OLDEST)
+    buf.put('a', b'1')
+    buf.put('b', b'1')
+    buf.put('c', b'1')
+    assert topics(buf.get(timeout=0)) == [('b', b'1'), ('c', b'1')]
+    assert buf.dropped == 1
+    assert buf.qsize() == 0
+
+
+def test_drop_oldest_same_topic_reenters_order():
+    buf = IngestBuffer(capacity=1, topic_capacity=10, policy=DROP_OLDEST)
+    buf.put('a', b'1')
+    buf.put('a', b'2')
+    assert list(buf._order) == ['a']
+    assert topics(buf.get(timeout=0)) == [('a', b'2')]
+
+
+def test_coalesce_replaces_latest_pending():
+    buf = IngestBuffer(capacity=10, topic_capacity=2, policy=COALESCE)
+    for payload in (b'1', b'2', b'3', b'4'):
+        buf.put('a', payload)
+    assert topics(buf.get(timeout=0)) == [('a', b'1'), ('a', b'4')]
+    assert buf.coalesced == 2
+    assert buf.dropped == 0
+
+
+def test_coalesce_under_global_pressure():
+    buf = IngestBuffer(capacity=2, topic_capacity=10, policy=COALESCE)
+    buf.put('a', b'1')
+    buf.put('b', b'1')
+    buf.put('a', b'2')
+    assert topics(buf.get(timeout=0)) == [('a', b'2'), ('b', b'1')]
+
+
+def test_sample_keeps_one_in_n_under_pressure():
+    buf = IngestBuffer(capacity=4, topic_capacity=100, policy=SAMPLE, sample_every=3)
+    buf.put('a', b'0')
+    buf.put('a', b'1')
+    for i in range(2, 8):
+        buf.put('a', str(i).encode())
+    items = topics(buf.get(timeout=0))
+    assert items[:2] == [('a', b'0'), ('a', b'1')]
+    assert buf.sampled + buf.dropped + len(items) == 8
+    assert buf.sampled == 4
+
+
+def test_get_times_out_empty():
+    assert IngestBuffer().get(timeout=0.01) == []
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        IngestBuffer(policy='block')
+
+
+def test_put_wait_blocks_instead_of_dropping():
+    buf = IngestBuffer(capacity=2, topic_capacity=10)
+    assert buf.put_wait('a', b'1')
+    assert buf.put_wait('b', b'1')
+    assert not buf.put_wait('a', b'2', timeout=0.01)
+    producer = threading.Thread(target=buf.put_wait, args=('a', b'3'))
+    producer.start()
+    assert topics(buf.get(timeout=0)) == [('a', b'1'), ('b', b'1')]
+    producer.join(1)
+    assert not producer.is_alive()
+    assert topics(buf.get(timeout=0)) == [('a', b'3')]
+    assert buf.dropped == 0
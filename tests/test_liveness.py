@@ -0,0 +1,71 @@
+from liveness import Liveness, TimerWheel
+
+
+def test_timer_wheel_expires_in_order_across_levels():
+    wheel = TimerWheel(tick=1.0, levels=3, now=0.0)
+    for key, deadline in (('a', 5), ('b', 70), ('c', 5000), ('d', 300000)):
+        wheel.schedule(key, deadline)
+    assert wheel.advance(4) == []
+    assert wheel.advance(5) == ['a']
+    assert wheel.advance(69) == []
+    assert wheel.advance(70) == ['b']
+    assert wheel.advance(4999) == []
+    assert wheel.advance(5000) == ['c']
+    # Além do horizonte (64^3 ticks): reinserida até vencer
+    assert wheel.advance(299999) == []
+    assert wheel.advance(300000) == ['d']
+    assert len(wheel) == 0
+
+
+def test_past_deadline_fires_on_next_tick():
+    wheel = TimerWheel(tick=1.0, now=10.0)
+    wheel.schedule('a', 3.0)
+    assert wheel.advance(11.0) == ['a']
+
+
+def test_fixed_rule_goes_offline_and_back():
+    liveness = Liveness([{'pattern': 'casa/+/temp', 'interval': 5, 'timeout': 12}])
+    # Relógio do teste começa em 0 (a roda nasce em time.monotonic())
+    liveness.wheel = TimerWheel(liveness.tick, now=0.0)
+    liveness.observe('casa/sala/temp', 1000.0, now=0.0)
+    assert liveness.advance(now=11.0) == []
+    events = liveness.advance(now=12.0)
+    assert [(e['topic'], e['state']) for e in events] == [('casa/sala/temp', 'offline')]
+    assert liveness.offline == 1
+    liveness.observe('casa/sala/temp', 1020.0, now=20.0)
+    events = liveness.advance(now=21.0)
+    assert [(e['state'], e['timestamp']) for e in events] == [('online', 1020.0)]
+    assert liveness.offline == 0
+
+
+def test_learned_interval_reschedules_lazily():
+    liveness = Liveness(min_samples=3, factor=3.0, min_timeout=1.0)
+    liveness.wheel = TimerWheel(liveness.tick, now=0.0)
+    for i in range(4):
+        liveness.observe('s/a', 100.0 + i, now=float(i))
+    state = liveness.topics['s/a']
+    assert state.timeout == 3.0
+    # Mensagens antes do prazo só adiam a verificação
+    liveness.observe('s/a', 105.0, now=5.0)
+    assert liveness.advance(now=7.0) == []
+    assert [e['state'] for e in liveness.advance(now=9.0)] == ['offline']
+    assert liveness.status(online=False)[0]['topic'] == 's/a'
+
+
+def test_interval_uses_message_timestamps_within_a_batch():
+    liveness = Liveness(min_samples=3, factor=3.0, min_timeout=0.1)
+    liveness.wheel = TimerWheel(liveness.tick, now=0.0)
+    # Quatro mensagens do tópico no mesmo lote: mesmo now, recebidas a cada 0,5 s
+    for i in range(4):
+        liveness.observe('s/b', 100.0 + i * 0.5, now=10.0)
+    state = liveness.topics['s/b']
+    assert state.interval == 0.5
+    assert state.timeout == 1.5
+
+
+def test_dispatcher_batch_learns_interval(dashboard):
+    batcher = dashboard.Batcher()
+    batcher.add([('lote/a', str(i), 1000.0 + i * 2.0) for i in range(6)])
+    state = dashboard.liveness.topics['lote/a']
+    assert state.interval == 2.0
+    assert state.samples == 5
@@ -0,0 +1,41 @@
+from metrics import OTHER_TOPICS, RateMeter, Registry
+
+
+def test_render_counters_and_histogram():
+    registry = Registry()
+    counter = registry.counter('teste_total', 'Contador')
+    counter.inc(2)
+    histogram = registry.histogram('teste_seconds', 'Duração', (0.1, 1.0))
+    histogram.observe_many([0.05, 0.5, 5.0])
+    registry.gauge_callback('teste_fila', 'Fila', lambda: 3)
+    lines = registry.render().splitlines()
+    assert lines[:3] == ['# HELP teste_total Contador', '# TYPE teste_total counter', 'teste_total 2']
+    assert 'teste_seconds_bucket{le="0.1"} 1' in lines
+    assert 'teste_seconds_bucket{le="1.0"} 2' in lines
+    assert 'teste_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'teste_seconds_count 3' in lines
+    assert '# TYPE teste_fila gauge' in lines and 'teste_fila 3' in lines
+
+
+def test_labeled_counter_caps_series_and_escapes():
+    registry = Registry()
+    counter = registry.labeled_counter('teste_topico_total', 'Por tópico', 'topic', max_series=2)
+    counter.inc_many(['a', 'b"c', 'd', 'a'])
+    assert counter.values == {'a': 2, 'b"c': 1, OTHER_TOPICS: 1}
+    assert 'teste_topico_total{topic="b\\"c"} 1' in registry.render()
+
+
+def test_rate_meter_uses_window_ends():
+    meter = RateMeter(lambda: 0)
+    assert meter.rate() == 0.0
+    meter.samples.extend([(10.0, 100), (11.0, 150), (12.0, 300)])
+    assert meter.rate() == 100.0
+
+
+def test_metrics_endpoint(dashboard):
+    response = dashboard.app.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    body = response.get_data(as_text=True)
+    assert '# TYPE bifrost_messages_received_total counter' in body
+    assert 'bifrost_queue_capacity 50' in body
@@ -0,0 +1,39 @@
+import json
+
+from config_store import ConfigStore
+
+
+def test_config_store_batches_writes_atomically(tmp_path):
+    path = str(tmp_path / 'names.json')
+    store = ConfigStore(path, delay=0.01)
+    assert store.set_many({'casa/sala': 'Sala', 'casa/quarto': 'Quarto'}) == {'casa/sala': 'Sala', 'casa/quarto': 'Quarto'}
+    assert store.set('casa/sala', 'Sala') == {}
+    assert store.set('casa/quarto', '') == {'casa/quarto': None}
+    store.flush()
+    with open(path) as f:
+        assert json.load(f) == {'casa/sala': 'Sala'}
+    assert not (tmp_path / 'names.json.tmp').exists()
+    assert ConfigStore(path).get_many() == {'casa/sala': 'Sala'}
+
+
+def test_config_store_without_persist_never_writes(tmp_path):
+    path = tmp_path / 'names.json'
+    store = ConfigStore(str(path), persist=False)
+    store.set('casa/sala', 'Sala')
+    store.close()
+    assert not path.exists()
+
+
+def test_update_name_is_pushed_to_clients(dashboard, tmp_path, monkeypatch):
+    # Arquivo temporário: o names_store do app grava ao encerrar o processo
+    monkeypatch.setattr(dashboard, 'names_store', ConfigStore(str(tmp_path / 'names.json'), persist=False))
+    socket = dashboard.socketio.test_client(dashboard.app)
+    socket.get_received()
+    client = dashboard.app.test_client()
+    assert client.post('/update_name', json={'topic': 'nomes/sala', 'name': 'Sala'}).json == {'success': True}
+    events = [message['args'][0] for message in socket.get_received() if message['name'] == 'custom_names']
+    assert events == [{'names': {'nomes/sala': 'Sala'}}]
+    assert client.get('/names?topic=nomes/sala').json == {'names': {'nomes/sala': 'Sala'}}
+    assert client.post('/names', json={'names': 'x'}).status_code == 400
+    assert client.post('/names', json={'names': {'nomes/sala': ''}}).json == {'changed': {'nomes/sala': None}}
+    socket.disconnect()
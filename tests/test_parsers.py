@@ -0,0 +1,25 @@
+from parsers import Parsers, compile_rule
+
+
+def test_json_fields_with_keep_raw():
+    parse = compile_rule({'pattern': 'x', 'json': {'temp': 'a.temp', 'on': 'on'}, 'keep_raw': True})
+    payload = '{"a": {"temp": 21}, "on": true}'
+    assert parse(payload) == [(None, payload, payload), ('temp', 21.0, '21.0'), ('on', 1.0, '1.0')]
+
+
+def test_scalar_payload_is_converted_even_with_keep_raw():
+    # Sub-série reencaminhada ao worker dono chega como valor simples
+    parse = compile_rule({'pattern': 'x', 'json': {'temp': 'temp'}, 'keep_raw': True})
+    assert parse('21.5') == [(None, 21.5, '21.5')]
+    assert parse('ligado') == [(None, 'ligado', 'ligado')]
+
+
+def test_unit_and_map_conversion():
+    parse = compile_rule({'pattern': 'x', 'unit': '°C', 'map': {'alto': 1}})
+    assert parse('21.5 °C') == [(None, 21.5, '21.5 °C')]
+    assert parse('ALTO') == [(None, 1.0, 'ALTO')]
+
+
+def test_first_matching_rule_wins():
+    parsers = Parsers([{'pattern': 'casa/#', 'map': 'boolean'}, {'pattern': 'casa/+/luz', 'unit': 'W'}])
+    assert parsers.for_topic('casa/sala/luz')('on') == [(None, 1.0, 'on')]
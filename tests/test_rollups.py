@@ -0,0 +1,49 @@
+from rollups import Rollups, choose_tier, downsample, lttb
+
+
+class FakeSeries(list):
+    def append(self, *row):
+        super().append(row)
+
+
+def test_rollups_close_bucket_when_time_advances():
+    series = {name: FakeSeries() for name in ('1s', '1m', '1h')}
+    rollups = Rollups(series)
+    for timestamp, value in ((10.0, 1.0), (10.5, 3.0), (11.0, 5.0), (12.0, float('nan'))):
+        rollups.add(timestamp, value)
+    assert series['1s'] == [(10.0, 1.0, 3.0, 4.0, 2)]
+    assert series['1m'] == []
+    rollups.flush_open()
+    assert series['1m'] == [(0.0, 1.0, 5.0, 9.0, 3)]
+
+
+def test_choose_tier_picks_finest_that_fits():
+    assert choose_tier(0, 500, 1000) is None
+    assert choose_tier(0, 5000, 1000) == '1m'
+    assert choose_tier(0, 86400 * 365, 1000) == '1h'
+
+
+def test_lttb_keeps_endpoints_and_peak():
+    points = [(float(i), 100.0 if i == 50 else 0.0) for i in range(100)]
+    sampled = lttb(points, 10)
+    assert len(sampled) == 10
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert (50.0, 100.0) in sampled
+
+
+def test_downsample_text_rows_uniformly():
+    rows = [(float(i), str(i)) for i in range(10)]
+    assert downsample(rows, 5) == rows[::2]
+    assert downsample(rows, 20) == rows
+
+
+def test_get_history_with_resolution(dashboard):
+    dashboard.Batcher().add([('rollup/a', str(i), 1000.0 + i * 0.25) for i in range(8)])
+    client = dashboard.app.test_client()
+    body = client.get('/get_history?topic=rollup/a&resolution=1s&from=999&to=1003').json
+    assert body['resolution'] == '1s'
+    assert [row[0] for row in body['history']] == [1000.0, 1001.0]
+    assert body['history'][0][1:] == [1.5, 0.0, 3.0, 4]
+    body = client.get('/get_history?topic=rollup/a&max_points=3').json
+    assert len(body['history']) == 3
+    assert client.get('/get_history?topic=rollup/a&resolution=5m').status_code == 400
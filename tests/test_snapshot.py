@@ -0,0 +1,41 @@
+from history import LatestValues
+
+
+def sample(payload, seq):
+    return {'payload': payload, 'timestamp': 1000.0 + seq, 'seq': seq}
+
+
+def test_snapshot_returns_changes_after_cursor():
+    latest = LatestValues()
+    latest.update({'casa/sala': sample('20', 1), 'casa/quarto': sample('18', 1)})
+    seq, values = latest.snapshot(['casa/#'])
+    assert seq == 2 and len(values) == 2
+    latest.update({'casa/sala': sample('21', 2), 'rua/poste': sample('1', 1)})
+    seq, values = latest.snapshot(['casa/#'], since=2)
+    assert seq == 4
+    assert values == [['casa/sala', '21', 1002.0, 2]]
+
+
+def test_resync_with_known_epoch_is_incremental(dashboard):
+    dashboard.latest_values.update({'resync/a': sample('1', 1), 'resync/b': sample('2', 1)})
+    first = dashboard.snapshot_for(['resync/#'], None)
+    assert (first['full'], first['resync']) == (True, False)
+    assert sorted(value[0] for value in first['values']) == ['resync/a', 'resync/b']
+
+    dashboard.latest_values.update({'resync/b': sample('3', 2)})
+    again = dashboard.snapshot_for(['resync/#'], {first['epoch']: first['seq']})
+    assert (again['full'], again['resync']) == (False, True)
+    assert again['values'] == [['resync/b', '3', 1002.0, 2]]
+
+    # Cursor de outra execução: snapshot completo
+    other = dashboard.snapshot_for(['resync/#'], {'outro': first['seq']})
+    assert other['full'] and len(other['values']) == 2
+
+
+def test_subscribe_sends_snapshot(dashboard):
+    dashboard.latest_values.update({'resync/c': sample('7', 1)})
+    client = dashboard.socketio.test_client(dashboard.app)
+    client.emit('subscribe', {'topics': ['resync/c']})
+    snapshots = [message['args'][0] for message in client.get_received() if message['name'] == 'snapshot']
+    assert [value[:2] for value in snapshots[0]['values']] == [['resync/c', '7']]
+    client.disconnect()
@@ -0,0 +1,164 @@
+import math
+import os
+
+import pytest
+
+from rollups import ROLLUP_RECORD
+from storage import HistoryStore, Series
+
+
+def test_append_flush_query_round_trip(tmp_path):
+    series = Series(str(tmp_path / 's'), segment_span=100)
+    for i in range(10):
+        series.append(i * 30.0, float(i))
+    series.append(301.0, 'ligado')
+    assert series.flush() == 11
+    assert [segment.start for segment in series.segments] == [0.0, 120.0, 240.0]
+    assert list(series.query()) == [(i * 30.0, float(i)) for i in range(10)] + [(301.0, 'ligado')]
+    assert list(series.query(60.0, 120.0)) == [(60.0, 2.0), (90.0, 3.0), (120.0, 4.0)]
+    assert series.tail(2) == [(270.0, 9.0), (301.0, 'ligado')]
+
+
+def test_query_sees_pending_and_flushed_once(tmp_path):
+    series = Series(str(tmp_path / 's'))
+    series.append(1.0, 1.0)
+    series.flush()
+    series.append(2.0, 2.0)
+    assert list(series.query()) == [(1.0, 1.0), (2.0, 2.0)]
+
+
+def test_reload_skips_records_before_last(tmp_path):
+    directory = str(tmp_path / 's')
+    series = Series(directory)
+    assert series.append(1000.0, 1.0)
+    series.flush()
+    # Depois de reiniciar com o relógio atrasado em relação ao disco
+    series = Series(directory)
+    assert not series.append(500.0, 2.0)
+    assert series.append(1001.0, 3.0)
+    series.flush()
+    assert list(series.query()) == [(1000.0, 1.0), (1001.0, 3.0)]
+
+
+def test_raw_series_rejects_repeated_timestamp(tmp_path):
+    store = HistoryStore(str(tmp_path / 'h'))
+    assert store.append('t', 10.0, 1.0)
+    assert not store.append('t', 10.0, 5.0)
+    assert not store.append('t', 9.0, 7.0)
+    assert store.rejected == 2
+    # Valores recusados não entram no bucket aberto
+    assert store.rollups['t'].open['1s'].row() == (10.0, 1.0, 1.0, 1.0, 1)
+    store.close()
+    assert list(store.query('t')) == [(10.0, 1.0)]
+
+
+def test_partial_record_is_truncated_on_load(tmp_path):
+    directory = str(tmp_path / 's')
+    series = Series(directory)
+    series.append(1.0, 1.0)
+    series.flush()
+    with open(series.segments[0].path, 'ab') as f:
+        f.write(b'\x00' * 5)
+    assert list(Series(directory).query()) == [(1.0, 1.0)]
+
+
+def test_compaction_merges_small_segments(tmp_path):
+    series = Series(str(tmp_path / 's'), segment_span=10)
+    rows = [(i * 10.0 + 1, float(i) if i % 2 else f"t{i}") for i in range(6)]
+    for ts, value in rows:
+        series.append(ts, value)
+    series.flush()
+    assert len(series.segments) == 6
+    merged = series.compact(min_size=1024, max_size=1024 * 1024)
+    assert merged == 4
+    assert len(series.segments) == 2
+    assert list(series.query()) == rows
+    assert list(Series(series.directory, segment_span=10).query()) == rows
+
+
+def test_retention_drops_old_segments(tmp_path):
+    series = Series(str(tmp_path / 's'), segment_span=10)
+    for i in range(5):
+        series.append(i * 10.0, float(i))
+    series.flush()
+    assert series.enforce_retention(25.0) == 2
+    assert [ts for ts, _ in series.query()] == [20.0, 30.0, 40.0]
+
+
+def test_rollup_series_round_trip(tmp_path):
+    series = Series(str(tmp_path / 'r'), ROLLUP_RECORD, 3600)
+    series.append(60.0, 1.0, 3.0, 4.0, 2)
+    series.flush()
+    assert list(series.query()) == [(60.0, 1.0, 3.0, 4.0, 2)]
+
+
+def test_store_query_and_rollups(tmp_path):
+    store = HistoryStore(str(tmp_path / 'h'))
+    for i in range(3):
+        store.append('casa/sala', 100.0 + i, float(i))
+    store.close()
+    assert list(store.query('casa/sala')) == [(100.0, 0.0), (101.0, 1.0), (102.0, 2.0)]
+    assert list(store.query('outro')) == []
+    ts, mean, low, high, count = next(iter(store.rollup_query('casa/sala', '1m')))
+    assert (low, high, count) == (0.0, 2.0, 3) and math.isclose(mean, 1.0)
+
+
+def test_failed_flush_keeps_unwritten_rows(tmp_path, monkeypatch):
+    series = Series(str(tmp_path / 's'), segment_span=10)
+    rows = [(1.0, 1.0), (2.0, 2.0), (11.0, 3.0), (12.0, 4.0)]
+    for row in rows:
+        series.append(*row)
+    write = series._write
+
+    def fail_second_segment(segment, chunk):
+        if segment.start >= 10:
+            # Registro parcial antes da falha
+            with open(segment.path, 'ab') as f:
+                f.write(b'\x00' * 5)
+            raise OSError('disco cheio')
+        write(segment, chunk)
+
+    monkeypatch.setattr(series, '_write', fail_second_segment)
+    with pytest.raises(OSError):
+        series.flush()
+    assert series.pending == rows[2:]
+    assert list(series.query()) == rows
+    monkeypatch.setattr(series, '_write', write)
+    assert series.flush() == 2
+    assert list(Series(series.directory, segment_span=10).query()) == rows
+
+
+def test_compaction_keeps_files_until_readers_finish(tmp_path):
+    series = Series(str(tmp_path / 's'), segment_span=10)
+    rows = [(i * 10.0 + 1, float(i)) for i in range(6)]
+    for row in rows:
+        series.append(*row)
+    series.flush()
+    old_paths = [segment.path for segment in series.segments]
+    reader = series.query()
+    assert next(reader) == rows[0]
+    assert series.compact(min_size=1024, max_size=1024 * 1024) == 4
+    # A leitura começou antes da troca: continua nos arquivos antigos
+    assert all(os.path.exists(path) for path in old_paths)
+    assert list(reader) == rows[1:]
+    assert [os.path.exists(path) for path in old_paths] == [False] * 5 + [True]
+    assert list(series.query()) == rows
+
+
+def test_load_drops_originals_of_interrupted_compaction(tmp_path):
+    directory = str(tmp_path / 's')
+    series = Series(directory, segment_span=10)
+    rows = [(i * 10.0 + 1, float(i)) for i in range(4)]
+    for row in rows:
+        series.append(*row)
+    series.flush()
+    saved = {segment.path: open(segment.path, 'rb').read() for segment in series.segments}
+    series.compact(min_size=1024, max_size=1024 * 1024)
+    # Queda depois da fusão e antes de remover os originais
+    for path, data in saved.items():
+        with open(path, 'wb') as f:
+            f.write(data)
+    reloaded = Series(directory, segment_span=10)
+    assert list(reloaded.query()) == rows
+    assert len(reloaded.segments) == 2
+    assert sorted(os.listdir(directory)) == sorted(os.path.basename(s.path) for s in reloaded.segments)
@@ -0,0 +1,50 @@
+import time
+
+
+def received_entries(client, timeout=2.0, settle=0.3):
+    # Entradas de mqtt_batch recebidas até settle segundos depois do primeiro envio
+    entries = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for message in client.get_received():
+            if message['name'] == 'mqtt_batch':
+                entries += message['args'][0]
+        if entries:
+            deadline = min(deadline, time.monotonic() + settle)
+        time.sleep(0.01)
+    return entries
+
+
+def test_overlapping_patterns_deliver_each_topic_once(dashboard):
+    client = dashboard.socketio.test_client(dashboard.app)
+    client.emit('subscribe', {'topics': ['sobrepos/#', 'sobrepos/sala/temp']})
+    client.get_received()
+    dashboard.ingest_message('sobrepos/sala/temp', b'21.5')
+    dashboard.ingest_message('sobrepos/sala/umidade', b'40')
+    entries = received_entries(client)
+    assert sorted(topic for topic, _ in entries) == ['sobrepos/sala/temp', 'sobrepos/sala/umidade']
+
+    # Sem o curinga, só o tópico exato continua chegando
+    client.emit('unsubscribe', {'topics': ['sobrepos/#']})
+    client.get_received()
+    dashboard.ingest_message('sobrepos/sala/umidade', b'41')
+    dashboard.ingest_message('sobrepos/sala/temp', b'22')
+    entries = received_entries(client)
+    assert [topic for topic, _ in entries] == ['sobrepos/sala/temp']
+    client.disconnect()
+    assert not any('sobrepos/sala/temp' in group for group in dashboard.group_encodings)
+
+
+def test_clients_with_same_patterns_share_a_room(dashboard):
+    first = dashboard.socketio.test_client(dashboard.app)
+    second = dashboard.socketio.test_client(dashboard.app)
+    for client in (first, second):
+        client.emit('subscribe', {'topics': ['compart/b', 'compart/a']})
+    group = ('compart/a', 'compart/b')
+    assert dashboard.group_encodings[group]['json'] == 2
+    second.emit('subscribe', {'topics': ['compart/c']})
+    assert dashboard.group_encodings[group]['json'] == 1
+    assert dashboard.rooms_for_topic('compart/a') and len(dashboard.rooms_for_topic('compart/a')) == 2
+    first.disconnect()
+    second.disconnect()
+    assert group not in dashboard.group_encodings
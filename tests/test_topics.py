@@ -0,0 +1,42 @@
+from topics import TopicIndex, TopicTrie
+
+
+def build(topics):
+    index = TopicIndex()
+    for topic in topics:
+        index.update(topic, 1.0, 100.0)
+    return index
+
+
+def test_trie_wildcards_and_dollar_topics():
+    trie = TopicTrie(['casa/+/temp', 'energia/#'])
+    assert trie.matches('casa/sala/temp')
+    assert trie.matches('energia')
+    assert not trie.matches('casa/sala/umidade')
+    assert not TopicTrie(['#']).matches('$SYS/broker/uptime')
+
+
+def test_search_pages_in_navigation_order():
+    index = build(['b/2', 'a', 'b/10', 'a/x', 'c'])
+    topics, cursor = index.search(limit=2)
+    assert [t['topic'] for t in topics] == ['a', 'a/x'] and cursor == 'a/x'
+    topics, cursor = index.search(after=cursor, limit=2)
+    assert [t['topic'] for t in topics] == ['b/10', 'b/2'] and cursor == 'b/2'
+    topics, cursor = index.search(after=cursor, limit=2)
+    assert [t['topic'] for t in topics] == ['c'] and cursor is None
+
+
+def test_search_by_prefix_and_query():
+    index = build(['casa/sala/temp', 'casa/sala/luz', 'casa/quarto/temp', 'carro/temp'])
+    topics, _ = index.search(prefix='casa/', query='TEMP')
+    assert [t['topic'] for t in topics] == ['casa/quarto/temp', 'casa/sala/temp']
+    topics, _ = index.search(prefix='ca')
+    assert len(topics) == 4
+
+
+def test_children_paging():
+    index = build([f'n/{name}' for name in 'edcba'])
+    children, cursor = index.children('n', limit=2)
+    assert [c['name'] for c in children] == ['a', 'b'] and cursor == 'b'
+    children, cursor = index.children('n', after=cursor, limit=3)
+    assert [c['name'] for c in children] == ['c', 'd', 'e'] and cursor is None
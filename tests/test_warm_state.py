@@ -0,0 +1,46 @@
+import pytest
+
+from history import TopicHistory
+from warm_state import MAGIC, dump, load, snapshot
+
+
+def test_dump_and_load_round_trip(tmp_path):
+    history = TopicHistory(4)
+    for i in range(6):
+        history.append(1000.0 + i, float(i))
+    history.append(1006.0, 'ligado')
+    latest = {'casa/sala': {'payload': '5', 'timestamp': 1005.0, 'seq': 6},
+              'casa/porta': {'payload': 'aberta', 'timestamp': 1010.0, 'seq': 1}}
+    path = str(tmp_path / 'warm_state.bin')
+    assert dump(path, snapshot({'casa/sala': history}, latest.items())) == 2
+    assert not (tmp_path / 'warm_state.bin.tmp').exists()
+
+    records = {record[0]: record for record in load(path)}
+    _, seq, ts, values, text, data = records['casa/sala']
+    assert seq == 7 and list(ts) == [1002.0, 1003.0, 1004.0, 1005.0]
+    assert list(values) == [2.0, 3.0, 4.0, 5.0] and text == [(1006.0, 'ligado')]
+    assert data == latest['casa/sala']
+    _, seq, ts, values, text, data = records['casa/porta']
+    assert (seq, len(ts), len(values), text) == (0, 0, 0, [])
+    assert data == latest['casa/porta']
+
+    # Capacidade menor ao reiniciar: ficam os valores mais recentes
+    _, seq, ts, values, text, _ = records['casa/sala']
+    restored = TopicHistory(2)
+    restored.restore(ts, values, text, seq)
+    assert restored.seq == 7
+    assert list(restored.numeric()[1]) == [4.0, 5.0]
+
+
+def test_load_rejects_unknown_format(tmp_path):
+    path = tmp_path / 'warm_state.bin'
+    path.write_bytes(b'XXXX' + MAGIC)
+    with pytest.raises(ValueError):
+        list(load(str(path)))
+
+
+def test_reconnect_delay_is_bounded_with_jitter(dashboard):
+    for attempt in range(12):
+        expected = min(dashboard.MQTT_BACKOFF_MAX, dashboard.MQTT_BACKOFF_MIN * 2 ** attempt)
+        delay = dashboard.reconnect_delay(attempt)
+        assert expected / 2 <= delay <= expected
@@ -0,0 +1,120 @@
+import base64
+import json
+import math
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from wire import (DEFINITION, DOUBLE, ENTRY, ENTRY_WIDE, FRAME_HEADER, KIND_NUMBER, LENGTH,
+                  WIRE_VERSION, WIRE_VERSION_WIDE, TopicDictionary, encode_frame)
+
+DECODER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend', 'decoder.js')
+
+
+def decode(frame):
+    # Leitura de referência do formato descrito em wire.py
+    version, base, definition_count, entry_count = FRAME_HEADER.unpack_from(frame, 0)
+    offset = FRAME_HEADER.size
+    topics = {}
+    for _ in range(definition_count):
+        topic_id, length = DEFINITION.unpack_from(frame, offset)
+        offset += DEFINITION.size
+        topics[topic_id] = frame[offset:offset + length].decode()
+        offset += length
+    entries = []
+    for _ in range(entry_count):
+        if version == WIRE_VERSION_WIDE:
+            topic_id, seq, timestamp, kind = ENTRY_WIDE.unpack_from(frame, offset)
+            offset += ENTRY_WIDE.size
+        else:
+            topic_id, seq, delta, kind = ENTRY.unpack_from(frame, offset)
+            offset += ENTRY.size
+            timestamp = base + delta / 1e6
+        if kind == KIND_NUMBER:
+            value = DOUBLE.unpack_from(frame, offset)[0]
+            offset += DOUBLE.size
+        else:
+            length = LENGTH.unpack_from(frame, offset)[0]
+            value = frame[offset + LENGTH.size:offset + LENGTH.size + length].decode()
+            offset += LENGTH.size + length
+        entries.append((topics.get(topic_id), value, timestamp, seq))
+    assert offset == len(frame)
+    return version, entries
+
+
+def entry(payload, timestamp, seq=1):
+    return {'payload': payload, 'timestamp': timestamp, 'seq': seq}
+
+
+def test_round_trip_numbers_and_text():
+    frame = encode_frame([(0, entry('21.5', 1000.0, 3)), (1, entry('ligado', 1000.25, 7))],
+                         [(0, 'casa/temp'), (1, 'casa/luz')])
+    version, entries = decode(frame)
+    assert version == WIRE_VERSION
+    assert entries[0] == ('casa/temp', 21.5, 1000.0, 3)
+    assert entries[1][:2] == ('casa/luz', 'ligado')
+    assert math.isclose(entries[1][2], 1000.25)
+
+
+@pytest.mark.parametrize('payload', ['nan', 'inf', '1_000', ' 5 ', '0x10', '+1', '05', '1e999', ''])
+def test_only_json_numbers_are_numeric(payload):
+    _, entries = decode(encode_frame([(0, entry(payload, 1.0))], [(0, 't')]))
+    assert entries[0][1] == payload
+
+
+@pytest.mark.parametrize('payload,value', [('-0.5', -0.5), ('12', 12.0), ('1e3', 1000.0), ('0', 0.0)])
+def test_json_numbers(payload, value):
+    _, entries = decode(encode_frame([(0, entry(payload, 1.0))], [(0, 't')]))
+    assert entries[0][1] == value
+
+
+def test_wide_range_uses_absolute_timestamps():
+    frame = encode_frame([(0, entry('1', 1000.0)), (0, entry('2', 1000.0 + 7200.5))], [(0, 't')])
+    version, entries = decode(frame)
+    assert version == WIRE_VERSION_WIDE
+    assert [e[2] for e in entries] == [1000.0, 8200.5]
+
+
+def test_long_text_is_cut_on_a_character_boundary():
+    text = 'a' + 'é' * 40000
+    _, entries = decode(encode_frame([(0, entry(text, 1.0))], [(0, 't')]))
+    assert text.startswith(entries[0][1])
+    assert len(entries[0][1].encode()) <= 0xFFFF
+
+
+def test_topic_dictionary_ids_are_stable_and_disjoint():
+    first, second = TopicDictionary(0, 2), TopicDictionary(1, 2)
+    assert [first.get_id('a'), first.get_id('b'), first.get_id('a')] == [0, 2, 0]
+    assert second.get_id('a') == 1
+
+
+NODE_SCRIPT = """
+const fs = require('fs');
+const vm = require('vm');
+const out = [];
+const context = { self: { postMessage: (message) => out.push(message) }, TextDecoder, console };
+vm.runInNewContext(fs.readFileSync(process.argv[1], 'utf8'), context);
+const frames = JSON.parse(fs.readFileSync(0, 'utf8'));
+for (const frame of frames) {
+    const bytes = Buffer.from(frame, 'base64');
+    const buffer = bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.length);
+    context.self.onmessage({ data: { type: 'frame', buffer } });
+}
+process.stdout.write(JSON.stringify(out.map((message) => message.entries)));
+"""
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node não instalado')
+def test_browser_decoder_round_trip():
+    frames = [
+        encode_frame([(0, entry('21.5', 1000.0, 3)), (1, entry('ligação', 1000.5, 4))],
+                     [(0, 'casa/temp'), (1, 'casa/luz')]),
+        encode_frame([(0, entry('nan', 1000.0, 5)), (1, entry('2', 9000.0, 6))]),
+    ]
+    result = subprocess.run(['node', '-e', NODE_SCRIPT, DECODER], check=True, capture_output=True,
+                            input=json.dumps([base64.b64encode(frame).decode() for frame in frames]).encode())
+    first, second = json.loads(result.stdout)
+    assert first == [['casa/temp', 21.5, 1000.0, 3], ['casa/luz', 'ligação', 1000.5, 4]]
+    assert second == [['casa/temp', 'nan', 1000.0, 5], ['casa/luz', 2, 9000.0, 6]]
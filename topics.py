@@ -0,0 +1,303 @@
+# Padrões MQTT (+ e #) compilados em uma árvore por nível, filtro
+# include/exclude, controle das assinaturas feitas no broker e índice
+# hierárquico dos tópicos vistos (busca e navegação paginadas)
+import bisect
+import math
+import threading
+import time
+
+# Tópicos com resultado de filtro guardado em cache
+FILTER_CACHE_LIMIT = 100000
+
+
+class TopicTrie:
+    # Cada nó é um dict nível -> nó; a chave None guarda os valores dos
+    # padrões que terminam no nó. Casar um tópico custa O(níveis), não O(padrões).
+    __slots__ = ('root', 'size')
+
+    def __init__(self, patterns=()):
+        self.root = {}
+        self.size = 0
+        for pattern in patterns:
+            self.add(pattern)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, pattern, value=None):
+        node = self.root
+        for level in pattern.split('/'):
+            node = node.setdefault(level, {})
+        values = node.setdefault(None, set())
+        if not values:
+            self.size += 1
+        values.add(pattern if value is None else value)
+
+    def _walk(self, topic):
+        # Conjuntos de valores dos padrões que casam com o tópico
+        levels = topic.split('/')
+        last = len(levels)
+        # Tópicos $... (ex.: $SYS) não casam com curingas no primeiro nível
+        wildcards = not topic.startswith('$')
+        stack = [(self.root, 0)]
+        while stack:
+            node, i = stack.pop()
+            if wildcards or i:
+                rest = node.get('#')
+                if rest is not None and None in rest:
+                    yield rest[None]
+            if i == last:
+                if None in node:
+                    yield node[None]
+                continue
+            child = node.get(levels[i])
+            if child is not None:
+                stack.append((child, i + 1))
+            if wildcards or i:
+                child = node.get('+')
+                if child is not None:
+                    stack.append((child, i + 1))
+
+    def match(self, topic):
+        found = set()
+        for values in self._walk(topic):
+            found |= values
+        return found
+
+    def matches(self, topic):
+        for _ in self._walk(topic):
+            return True
+        return False
+
+
+class TopicFilter:
+    # Tópico aceito se casar com algum include e com nenhum exclude
+    def __init__(self, include=('#',), exclude=()):
+        self.include = TopicTrie(include)
+        self.exclude = TopicTrie(exclude)
+        self.cache = {}
+        self.rejected = 0
+
+    def allows(self, topic):
+        allowed = self.cache.get(topic)
+        if allowed is None:
+            allowed = self.include.matches(topic) and not self.exclude.matches(topic)
+            if len(self.cache) < FILTER_CACHE_LIMIT:
+                self.cache[topic] = allowed
+        if not allowed:
+            self.rejected += 1
+        return allowed
+
+
+def parse_patterns(value):
+    # Lista separada por vírgulas (variáveis de ambiente)
+    return [pattern.strip() for pattern in value.split(',') if pattern.strip()]
+
+
+class BrokerSubscriptions:
+    # Mantém no broker exatamente os filtros desejados, assinando e
+    # cancelando só a diferença a cada mudança
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self.desired = set()
+        self.active = set()
+        self.subscribe = None
+        self.unsubscribe = None
+        self.lock = threading.Lock()
+
+    def attach(self, subscribe, unsubscribe):
+        # Nova conexão com o broker: nenhuma assinatura ativa ainda
+        with self.lock:
+            self.subscribe = subscribe
+            self.unsubscribe = unsubscribe
+            self.active = set()
+        self.sync()
+
+    def detach(self):
+        with self.lock:
+            self.subscribe = None
+            self.unsubscribe = None
+            self.active = set()
+
+    def set(self, patterns):
+        with self.lock:
+            self.desired = set(patterns)
+        self.sync()
+
+    def sync(self):
+        with self.lock:
+            if self.subscribe is None:
+                return
+            for pattern in sorted(self.desired - self.active):
+                self.subscribe(self.prefix + pattern)
+            for pattern in sorted(self.active - self.desired):
+                self.unsubscribe(self.prefix + pattern)
+            self.active = set(self.desired)
+
+    def topics(self):
+        with self.lock:
+            return sorted(self.prefix + pattern for pattern in self.active)
+
+
+class TopicNode:
+    # Nó do índice: um nível do caminho. Nós que também são tópicos têm
+    # estatísticas (count > 0 ou last_seen definido).
+    __slots__ = ('name', 'path', 'parent', 'children', 'names', 'topics', 'is_topic',
+                 'last_seen', 'count', 'score', 'kind')
+
+    def __init__(self, name, path, parent):
+        self.name = name
+        self.path = path
+        self.parent = parent
+        self.children = {}
+        # Nomes dos filhos em ordem, mantidos na inserção; a lista é trocada
+        # (não alterada) para leitores a percorrerem sem o lock
+        self.names = []
+        # Tópicos na subárvore (incluindo o próprio nó)
+        self.topics = 0
+        self.is_topic = False
+        self.last_seen = None
+        self.count = 0
+        self.score = 0.0
+        self.kind = None
+
+
+class TopicIndex:
+    # Árvore dos tópicos por nível ('/'), com última mensagem, contagem, taxa
+    # e tipo do payload por tópico. A atualização é O(1) (nó em cache por
+    # tópico); listagens e buscas sem texto custam O(página) a partir do
+    # prefixo, buscas por texto O(nós visitados) (ver search).
+    def __init__(self, rate_window=60.0):
+        self.rate_window = rate_window
+        self.root = TopicNode('', '', None)
+        self.nodes = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def add(self, topic):
+        node = self.nodes.get(topic)
+        if node is not None:
+            return node
+        with self.lock:
+            node = self.root
+            for level in topic.split('/'):
+                child = node.children.get(level)
+                if child is None:
+                    path = level if node is self.root else f"{node.path}/{level}"
+                    child = node.children[level] = TopicNode(level, path, node)
+                    names = list(node.names)
+                    bisect.insort(names, level)
+                    node.names = names
+                node = child
+            if not node.is_topic:
+                node.is_topic = True
+                parent = node
+                while parent is not None:
+                    parent.topics += 1
+                    parent = parent.parent
+            self.nodes[topic] = node
+        return node
+
+    def update(self, topic, value, timestamp):
+        # Chamado só pelo dispatcher; leitores toleram valores de um instante antes
+        node = self.nodes.get(topic) or self.add(topic)
+        if node.last_seen is not None and timestamp > node.last_seen:
+            # Contador com decaimento exponencial: score / janela ~ mensagens/s
+            node.score *= math.exp((node.last_seen - timestamp) / self.rate_window)
+        node.score += 1
+        node.last_seen = timestamp
+        node.count += 1
+        node.kind = 'text' if isinstance(value, str) else 'number'
+
+    def rate(self, node, now):
+        if node.last_seen is None:
+            return 0.0
+        return node.score * math.exp(min(0.0, node.last_seen - now) / self.rate_window) / self.rate_window
+
+    def describe(self, node, now):
+        return {
+            'topic': node.path,
+            'last_seen': node.last_seen,
+            'count': node.count,
+            'rate': round(self.rate(node, now), 3),
+            'type': node.kind,
+        }
+
+    def _find(self, path):
+        node = self.root
+        for level in path.split('/') if path else ():
+            node = node.children.get(level)
+            if node is None:
+                return None
+        return node
+
+    def _sorted_children(self, node):
+        children = node.children
+        return [children[name] for name in node.names]
+
+    def search(self, prefix='', query='', after=None, limit=100, now=None):
+        # Tópicos sob o prefixo (o último nível pode ser parcial) que contêm
+        # query, em ordem de navegação (pré-ordem, filhos por nome). after é o
+        # último tópico da página anterior; retorna (tópicos, próximo cursor).
+        # A caminhada para ao completar a página: sem query custa O(página);
+        # com query, O(nós visitados até achar limit tópicos), que no pior
+        # caso (query rara) é a subárvore inteira sob o prefixo.
+        query = query.lower()
+        levels = prefix.split('/')
+        parent = self._find('/'.join(levels[:-1]))
+        if parent is None:
+            return [], None
+        partial = levels[-1]
+        cursor = after.split('/') if after else None
+        depth = len(levels) - 1
+
+        # Pilha de (nó, profundidade, no caminho do cursor?)
+        starts = [child for child in self._sorted_children(parent) if child.name.startswith(partial)]
+        stack = [(child, depth, cursor is not None) for child in reversed(starts)]
+        found = []
+        while stack:
+            node, depth, bound = stack.pop()
+            if bound:
+                # Subárvores antes do cursor são puladas inteiras; o cursor e
+                # seus ancestrais já foram entregues, seus descendentes não
+                if depth >= len(cursor) or node.name > cursor[depth]:
+                    bound = False
+                elif node.name < cursor[depth]:
+                    continue
+            if node.is_topic and not bound and (not query or query in node.path.lower()):
+                found.append(node)
+                if len(found) > limit:
+                    break
+            for child in reversed(self._sorted_children(node)):
+                stack.append((child, depth + 1, bound))
+
+        now = time.time() if now is None else now
+        more = len(found) > limit
+        found = found[:limit]
+        return [self.describe(node, now) for node in found], found[-1].path if more else None
+
+    def children(self, path='', after=None, limit=100, now=None):
+        # Filhos diretos de um nível, paginados por nome
+        node = self._find(path)
+        if node is None:
+            return [], None
+        names = node.names
+        start = bisect.bisect_right(names, after) if after is not None else 0
+        children = [node.children[name] for name in names[start:start + limit + 1]]
+        more = len(children) > limit
+        children = children[:limit]
+        now = time.time() if now is None else now
+        listing = []
+        for child in children:
+            entry = {
+                'name': child.name,
+                'path': child.path,
+                'topics': child.topics,
+                'has_children': bool(child.children),
+            }
+            if child.is_topic:
+                entry.update(self.describe(child, now))
+            listing.append(entry)
+        return listing, children[-1].name if more else None
@@ -0,0 +1,103 @@
+# Estado quente: histórico recente em memória e último valor de cada tópico,
+# gravados num arquivo binário (periodicamente e ao encerrar) e recarregados
+# ao iniciar, para o painel voltar com dados antes da primeira mensagem do
+# broker. A gravação é atômica (arquivo temporário + rename).
+# Formato: MAGIC e, por tópico, TOPIC seguido de tópico, payload do último
+# valor, timestamps e valores numéricos (array('d')) e registros de texto
+# (TEXT + texto).
+from array import array
+import os
+import struct
+import sys
+
+MAGIC = b'BFWS\x01'
+# Tamanho do tópico, seq do tópico, amostras numéricas, amostras de texto,
+# timestamp e seq do último valor, tamanho do payload (NO_LATEST = sem valor)
+TOPIC = struct.Struct('<HQHHdQI')
+TEXT = struct.Struct('<dI')
+NO_LATEST = 0xFFFFFFFF
+
+
+def _native(values):
+    # Arquivo sempre little-endian
+    if sys.byteorder != 'little':
+        values = array('d', values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(data):
+    values = array('d')
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def snapshot(histories, latest):
+    # Cópia do estado em memória: [(tópico, seq, timestamps, valores, textos,
+    # último valor ou None)]. Chamar com o lock do dispatcher; a gravação
+    # (dump) roda depois, fora dele.
+    latest = dict(latest)
+    records = []
+    for topic in histories.keys() | latest.keys():
+        history = histories.get(topic)
+        if history is not None:
+            ts, values = history.numeric()
+            records.append((topic, history.seq, ts, values, history.text_items(), latest.get(topic)))
+        else:
+            records.append((topic, 0, array('d'), array('d'), [], latest.get(topic)))
+    return records
+
+
+def dump(path, records):
+    # records: saída de snapshot()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        for topic, seq, ts, values, text, data in records:
+            topic_bytes = topic.encode()
+            payload = data['payload'].encode() if data is not None else b''
+            parts = [TOPIC.pack(len(topic_bytes), seq, len(ts), len(text),
+                                data['timestamp'] if data is not None else 0.0,
+                                data['seq'] if data is not None else 0,
+                                len(payload) if data is not None else NO_LATEST),
+                     topic_bytes, payload, _native(ts), _native(values)]
+            for timestamp, value in text:
+                value = value.encode()
+                parts.append(TEXT.pack(timestamp, len(value)))
+                parts.append(value)
+            f.write(b''.join(parts))
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+def load(path):
+    # Gera (tópico, seq, timestamps, valores, textos, último valor ou None)
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"formato desconhecido em {path}")
+    view = memoryview(data)
+    offset = len(MAGIC)
+    while offset < len(data):
+        topic_len, seq, numeric, texts, latest_ts, latest_seq, payload_len = TOPIC.unpack_from(data, offset)
+        offset += TOPIC.size
+        topic = bytes(view[offset:offset + topic_len]).decode()
+        offset += topic_len
+        latest = None
+        if payload_len != NO_LATEST:
+            latest = {'payload': bytes(view[offset:offset + payload_len]).decode(),
+                      'timestamp': latest_ts, 'seq': latest_seq}
+            offset += payload_len
+        ts = _from_bytes(view[offset:offset + 8 * numeric])
+        offset += 8 * numeric
+        values = _from_bytes(view[offset:offset + 8 * numeric])
+        offset += 8 * numeric
+        text = []
+        for _ in range(texts):
+            timestamp, length = TEXT.unpack_from(data, offset)
+            offset += TEXT.size
+            text.append((timestamp, bytes(view[offset:offset + length]).decode()))
+            offset += length
+        yield topic, seq, ts, values, text, latest
@@ -0,0 +1,91 @@
+# Formato binário compacto para o mqtt_batch (little-endian):
+#   cabeçalho: versão u8, timestamp base f64, nº de definições u16, nº de entradas u32
+#   definição: id u32, tamanho u16, tópico utf-8
+#   entrada:   id u32, seq u32, delta do timestamp em µs i32, tipo u8, valor
+#              (tipo 0: f64; tipo 1: tamanho u16 + texto utf-8)
+# Versão 2 (lote que cobre mais que ~35 min, fora do alcance do delta i32):
+# igual, mas cada entrada leva o timestamp absoluto em f64 no lugar do delta.
+# Só payloads que são números JSON válidos (como o front-end os trata no
+# modo JSON) viram tipo 0; o resto vai como texto.
+import math
+import re
+import struct
+import threading
+
+WIRE_VERSION = 1
+WIRE_VERSION_WIDE = 2
+FRAME_HEADER = struct.Struct('<BdHI')
+DEFINITION = struct.Struct('<IH')
+ENTRY = struct.Struct('<IIiB')
+ENTRY_WIDE = struct.Struct('<IIdB')
+MAX_DELTA = 0x7FFFFFFF
+NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?')
+DOUBLE = struct.Struct('<d')
+LENGTH = struct.Struct('<H')
+KIND_NUMBER = 0
+KIND_TEXT = 1
+
+
+class TopicDictionary:
+    # IDs numéricos estáveis por tópico durante a vida do processo
+    # (start/step permitem sequências disjuntas entre workers)
+    def __init__(self, start=0, step=1):
+        self.start = start
+        self.step = step
+        self.ids = {}
+        self.topics = []
+        self.lock = threading.Lock()
+
+    def get_id(self, topic):
+        topic_id = self.ids.get(topic)
+        if topic_id is None:
+            with self.lock:
+                topic_id = self.ids.get(topic)
+                if topic_id is None:
+                    topic_id = self.start + len(self.topics) * self.step
+                    self.topics.append(topic)
+                    self.ids[topic] = topic_id
+        return topic_id
+
+
+def _utf8(text, limit=0xFFFF):
+    data = text.encode()
+    if len(data) > limit:
+        # Corta sem deixar um caractere pela metade
+        data = data[:limit].decode(errors='ignore').encode()
+    return data
+
+
+def _number(payload):
+    if not NUMBER.fullmatch(payload):
+        return None
+    number = float(payload)
+    return number if math.isfinite(number) else None
+
+
+def encode_frame(entries, definitions=()):
+    # entries: [(id, {'payload', 'timestamp', 'seq'})]; definitions: [(id, tópico)]
+    base = min((data['timestamp'] for _, data in entries), default=0.0)
+    wide = any((data['timestamp'] - base) * 1e6 >= MAX_DELTA for _, data in entries)
+    parts = [FRAME_HEADER.pack(WIRE_VERSION_WIDE if wide else WIRE_VERSION, base, len(definitions), len(entries))]
+    for topic_id, topic in definitions:
+        data = _utf8(topic)
+        parts.append(DEFINITION.pack(topic_id, len(data)))
+        parts.append(data)
+    for topic_id, data in entries:
+        payload = data['payload']
+        seq = data.get('seq', 0) & 0xFFFFFFFF
+        number = _number(payload)
+        kind = KIND_TEXT if number is None else KIND_NUMBER
+        if wide:
+            parts.append(ENTRY_WIDE.pack(topic_id, seq, data['timestamp'], kind))
+        else:
+            delta = min(int(round((data['timestamp'] - base) * 1e6)), MAX_DELTA)
+            parts.append(ENTRY.pack(topic_id, seq, delta, kind))
+        if number is None:
+            text = _utf8(payload)
+            parts.append(LENGTH.pack(len(text)))
+            parts.append(text)
+        else:
+            parts.append(DOUBLE.pack(number))
+    return b''.join(parts)